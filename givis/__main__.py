@@ -1,6 +1,7 @@
 import os
 import sys
 import argparse
+import subprocess
 
 import glob
 import tqdm
@@ -16,10 +17,14 @@ try:
     from math import *
 
 except ImportError:
-    print(
-        "Module 'bpy' could not be imported. This probably means you are not using Blender to run this script."
-    )
-    sys.exit(1)
+    # Only the Blender backend needs bpy, checked after parsing arguments
+    bpy = None
+
+# Blender runs this file as a script, make the package importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from givis.normalize import LogNormalizer
+from givis.stats import VariableStats, SCALARS, compute_stats, stats_path
+from givis import raster, ply
 
 
 class Visualization:
@@ -37,6 +42,10 @@ class Visualization:
         x_res: int = 1920,
         y_res: int = 1080,
         cut: bool = False,
+        frames: str = None,
+        persistent: bool = False,
+        bin_edges: np.ndarray = None,
+        stats: VariableStats = None,
     ):
         """ """
         self.color_bins = color_bins
@@ -45,26 +54,48 @@ class Visualization:
         self.cores = cores
         self.x_res = x_res
         self.y_res = y_res
-        self.positions = np.load(positions, mmap_mode="r")
-        self.variable = np.load(variable, mmap_mode="r")
+        self.frames = None
+
+        if frames is not None:
+            # frame-major store, variable is the name of the field to color by
+            self.frames = FrameStore(frames)
+            self.var_name = self.frames.field_name(variable)
+        else:
+            self.positions = np.load(positions, mmap_mode="r")
+            self.variable = np.load(variable, mmap_mode="r")
+
         self.cmap = self.color_map(np.linspace(0, 1, self.color_bins))
         self.output = output
         self.cut = cut
+        self.persistent = persistent
+        self.bin_objects = []
+        self.normalizers = {}
+        self.stats = stats
+        if bin_edges is None and stats is not None:
+            bin_edges = stats.bin_edges(color_bins)
+        self.bin_edges = bin_edges
+
+    def normalizer(self, v_min, v_max, scalar=1.0):
+        """
+        LogNormalizer for a clamp range, its buffer is reused across frames
+        """
+        key = (v_min, v_max, scalar)
+        if key not in self.normalizers:
+            self.normalizers[key] = LogNormalizer(v_min, v_max, scalar=scalar)
+        return self.normalizers[key]
 
     def log_normalize(self, temp, T_min=100, T_max=6e3):
         """
         Normalize a temperature array
 
+        The returned array is a reused buffer, it is overwritten by the next
+        call with the same clamp range.
+
         Args:
 
             Temperature in eV
         """
-        T_ceiling = np.copy(temp) * 11604.0
-        T_ceiling[np.where(T_ceiling > T_max)] = T_max
-        T_ceiling[np.where(T_ceiling < T_min)] = T_min
-        log_T_ceiling = np.log10(T_ceiling) - np.log10(T_min)
-        log_T_ceiling_norm = log_T_ceiling / (np.log10(T_max) - np.log10(T_min))
-        return log_T_ceiling_norm
+        return self.normalizer(T_min, T_max, scalar=11604.0)(temp)
 
     def set_render_settings(self, anaglyph=True, cyan=False):
         """ """
@@ -89,44 +120,83 @@ class Visualization:
 
     def log_normalize_P(self, temp, T_min=1e8, T_max=5e12):
         """
-        Normalize a temperature array
+        Normalize a pressure array
+
+        The returned array is a reused buffer, it is overwritten by the next
+        call with the same clamp range.
 
         Args:
 
-            Temperature in eV
+            Pressure
         """
-        T_ceiling = np.copy(temp)
-        T_ceiling[np.where(T_ceiling > T_max)] = T_max
-        T_ceiling[np.where(T_ceiling < T_min)] = T_min
-        log_T_ceiling = np.log10(T_ceiling) - np.log10(T_min)
-        log_T_ceiling_norm = log_T_ceiling / (np.log10(T_max) - np.log10(T_min))
-        return log_T_ceiling_norm
+        return self.normalizer(T_min, T_max)(temp)
 
-    def bin_data(self, pos, temp):
+    def normalize(self, var):
+        """
+        Normalize the variable of a frame, with the global clamp limits if
+        statistics are available
+        """
+        if self.stats is not None:
+            stats = self.stats
+            return self.normalizer(*stats.clamp, scalar=stats.scalar)(var)
+        return self.log_normalize(var)
+
+    def bin_data(self, pos, temp, edges=None):
         """
         Bin data into separate color bins
 
+        Particles are sorted once by their bin index with a stable argsort
+        (np.argsort, kind="stable"), bin sizes from np.bincount give the
+        offsets, each bin is then a contiguous slice of the sorted positions.
+
         Arguments:
         ---------
             pos: (np.array)
                 Position array of the particles
             temp: (np.array)
                 Temperature array of the particles
-            bins: (int)
-                Number of bins
+            edges: (np.array)
+                Precomputed bin edges of the normalized variable, keeps the
+                color bins stable across frames. Falls back to self.bin_edges
+                and then to per-frame histogram edges if None. Must have
+                self.color_bins + 1 entries
 
         Returns:
         --------
+            particle_sets: (list)
+                Position arrays of the particles in each non-empty bin
+            idx: (np.array)
+                Color bin of each particle set
+
+        Raises:
+        -------
+            ValueError: edges do not match the number of color bins
         """
-        log_norm = self.log_normalize(temp)
-        counts, bins = np.histogram(log_norm, bins=self.color_bins)
-        idx = np.where(counts > 0)[0]
-        dig = np.digitize(x=log_norm, bins=bins) - 1
-        dig[dig == dig.max()] = dig.max() - 1
-        particle_sets = []
+        log_norm = self.normalize(temp)
+
+        if edges is None:
+            edges = self.bin_edges
+        if edges is None:
+            edges = np.histogram_bin_edges(log_norm, bins=self.color_bins)
+        elif len(edges) != self.color_bins + 1:
+            raise ValueError(
+                "{} bin edges given for {} color bins, expected {}".format(
+                    len(edges), self.color_bins, self.color_bins + 1
+                )
+            )
 
-        for d in np.sort(np.unique(dig)):
-            particle_sets.append(pos[np.where(d == dig)[0], :])
+        # the last bin is closed on the right like np.histogram, values outside
+        # of global edges end up in the first or last bin
+        dig = np.digitize(x=log_norm, bins=edges) - 1
+        np.clip(dig, 0, self.color_bins - 1, out=dig)
+
+        counts = np.bincount(dig, minlength=self.color_bins)
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        order = np.argsort(dig, kind="stable")
+        pos_sorted = np.asarray(pos)[order]
+
+        idx = np.nonzero(counts)[0]
+        particle_sets = [pos_sorted[offsets[j] : offsets[j + 1]] for j in idx]
 
         return particle_sets, idx
 
@@ -203,10 +273,82 @@ class Visualization:
         m.halo.hardness = 127
         obj.data.materials.append(m)
 
+    @property
+    def n_frames(self):
+        """ """
+        if self.frames is not None:
+            return len(self.frames)
+        return self.positions.shape[1]
+
+    def frame_data(self, i):
+        """
+        Positions and variable of a single snapshot
+
+        Arguments:
+        ---------
+            i: (int)
+                Snapshot index
+
+        Returns:
+        --------
+            pos: (np.array)
+                Position array of the particles, shape (N, 3)
+            var: (np.array)
+                Variable array of the particles, shape (N,)
+        """
+        if self.frames is not None:
+            return self.frames.read(i, self.var_name)
+        return self.positions[:, i, :], self.variable[:, i, 0]
+
+    def setup_bins(self):
+        """
+        Build one emitter object, halo material and particle system per color
+        bin. They persist across frames, update_bins only changes particle
+        counts and locations.
+        """
+        self.bin_objects = []
+
+        for j in range(self.color_bins):
+            obj_name = str(j).zfill(4)
+            self.add_particle_system(obj_name)
+            self.set_material_settings(
+                obj_name, i=j, halo_size=0.1, color=self.cmap[j][:3]
+            )
+            self.set_particle_settings(np.empty((0, 3)), obj_name, i=j)
+            self.bin_objects.append(obj_name)
+
+        bpy.context.scene.update()
+
+    def update_bins(self, sets, idx):
+        """
+        Push particle counts and locations of a frame to the persistent bins
+
+        Arguments:
+        ---------
+            sets: (list)
+                Position arrays of the particles in each non-empty bin
+            idx: (np.array)
+                Color bin of each set
+        """
+        counts = np.zeros(self.color_bins, dtype=int)
+        counts[idx] = [s.shape[0] for s in sets]
+
+        for j, obj_name in enumerate(self.bin_objects):
+            settings = bpy.data.objects[obj_name].particle_systems[0].settings
+            # changing the count resets the particle system, only do it if needed
+            if settings.count != counts[j]:
+                settings.count = int(counts[j])
+
+        bpy.context.scene.update()
+
+        for j, s in zip(idx, sets):
+            obj = bpy.data.objects[self.bin_objects[j]]
+            p = obj.particle_systems[0].particles
+            p.foreach_set("location", s[:, :3].ravel() / 7.5e7)
+
     def main_properties(self, i):
         """ """
-        data = self.positions[:, i, :]
-        temp = self.variable[:, i, 0]
+        data, temp = self.frame_data(i)
 
         if self.cut:
             idx = data[:, 2] < 0
@@ -214,6 +356,14 @@ class Visualization:
             temp = temp[idx]
 
         sets, idx = self.bin_data(data, temp)
+
+        if self.persistent:
+            bpy.context.scene.frame_set(i + 1)
+            self.update_bins(sets, idx)
+            bpy.context.scene.frame_set(i + 2)
+            self.render_frame(frame_filename(i))
+            return
+
         obj_list = []
 
         bpy.context.scene.frame_set(i + 1)
@@ -223,7 +373,7 @@ class Visualization:
             obj_list.append(obj_name)
             self.add_particle_system(obj_name)
             self.set_material_settings(
-                obj_name, i=j, halo_size=0.1, color=self.cmap[j][:3]
+                obj_name, i=j, halo_size=0.1, color=self.cmap[idx[j]][:3]
             )
             self.set_particle_settings(s[:, :3] / 7.5e7, obj_name, i=j)
 
@@ -236,17 +386,243 @@ class Visualization:
             p.foreach_set("location", pos[:, :3].ravel() / 7.5e7)
 
         bpy.context.scene.frame_set(i + 2)
-        self.render_frame("{}.png".format(str(i).zfill(4)))
+        self.render_frame(frame_filename(i))
         self.clear_scene()
 
-    def render(self):
-        """ """
+    def render(self, frames=None):
+        """
+        Render frames serially in this Blender process
+
+        Arguments:
+        ---------
+            frames: (list)
+                Frame indices to render, all frames if None
+        """
         self.set_render_settings(anaglyph=False, cyan=False)
         self.clear_scene()
 
-        for i in tqdm.tqdm(np.arange(self.positions.shape[1])):
+        if self.persistent:
+            self.setup_bins()
+
+        if frames is None:
+            frames = np.arange(self.n_frames)
+
+        for i in tqdm.tqdm(frames):
             self.main_properties(i)
 
+    def render_parallel(self, worker_args, retries=2):
+        """
+        Render all frames across self.cores headless Blender processes
+
+        Arguments:
+        ---------
+            worker_args: (list)
+                Command line arguments passed to every worker after '--'
+            retries: (int)
+                Number of times frames that failed are scheduled again
+
+        Returns:
+        --------
+            failed: (list)
+                Frame indices that are still missing after all retries
+        """
+        scheduler = FrameScheduler(self.output, cores=self.cores, retries=retries)
+        return scheduler.run(range(self.n_frames), worker_args)
+
+
+class FrameScheduler:
+    """
+    Split a frame range across headless Blender worker processes
+
+    Every worker runs this script with `blender -b` on a disjoint subset of
+    the frames and writes into the same output directory. Frames whose PNG
+    already exists are skipped, frames that are still missing once all
+    workers exit are scheduled again.
+    """
+
+    def __init__(
+        self,
+        output: str,
+        cores: int = 4,
+        retries: int = 2,
+        blender: str = "blender",
+        script: str = None,
+    ):
+        """ """
+        self.output = output
+        self.cores = max(1, cores)
+        self.retries = retries
+        self.blender = blender
+        self.script = script or os.path.abspath(__file__)
+
+    def pending(self, frames):
+        """
+        Frames that do not have a rendered PNG in the output directory yet
+        """
+        return [
+            int(i)
+            for i in frames
+            if not os.path.exists(os.path.join(self.output, frame_filename(i)))
+        ]
+
+    def split(self, frames):
+        """
+        Interleave frames across workers so that each gets a similar share of
+        early (compact) and late (spread out) snapshots
+        """
+        return [c for c in (frames[k :: self.cores] for k in range(self.cores)) if c]
+
+    def command(self, frames, worker_args):
+        """ """
+        return (
+            [self.blender, "-b", "-P", self.script, "--"]
+            + list(worker_args)
+            + ["--frame_list", ",".join(str(i) for i in frames)]
+        )
+
+    def run(self, frames, worker_args):
+        """
+        Render frames in parallel, retrying the ones that fail
+
+        Returns:
+        --------
+            failed: (list)
+                Frame indices that are still missing after all retries
+        """
+        todo = self.pending(frames)
+
+        for attempt in range(self.retries + 1):
+            if not todo:
+                break
+
+            if attempt > 0:
+                print("Retrying {} failed frames".format(len(todo)))
+
+            workers = [
+                subprocess.Popen(self.command(chunk, worker_args))
+                for chunk in self.split(todo)
+            ]
+            for w in workers:
+                w.wait()
+
+            todo = self.pending(todo)
+
+        if todo:
+            print("Failed to render frames: {}".format(todo))
+
+        return todo
+
+
+class FrameStore:
+    """
+    Frame-major snapshot store
+
+    The simulation output is particle-major, i.e. positions are stored with
+    shape (N, T, 3), so reading one snapshot from a memory-mapped array touches
+    pages across the whole file. The store keeps every snapshot contiguous as
+    a structured array of shape (T, N) with the positions and the variables
+    side by side, so reading a frame is one sequential read.
+    """
+
+    suffix = "_frames.npy"
+
+    def __init__(self, path: str):
+        """ """
+        self.path = path
+        self.data = np.load(path, mmap_mode="r")
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    @property
+    def variables(self):
+        """ """
+        return [n for n in self.data.dtype.names if n != "pos"]
+
+    def field_name(self, var):
+        """
+        Map a command line variable name (e.g. 'pressure', 'p') to a field
+        """
+        name = var[0].upper()
+        if name not in self.variables:
+            raise KeyError(
+                "Variable {} not found in frame store {}".format(var, self.path)
+            )
+        return name
+
+    def read(self, i, var):
+        """
+        Read a single snapshot
+
+        Arguments:
+        ---------
+            i: (int)
+                Snapshot index
+            var: (str)
+                Field name of the variable
+
+        Returns:
+        --------
+            pos: (np.array)
+                Position array of the particles, shape (N, 3)
+            var: (np.array)
+                Variable array of the particles, shape (N,)
+        """
+        frame = np.asarray(self.data[i])
+        return frame["pos"], frame[var]
+
+    @classmethod
+    def convert(cls, path, variables=("T", "P"), chunk_size=65536):
+        """
+        Convert particle-major simulation output into a frame-major store
+
+        Arguments:
+        ---------
+            path: (str)
+                Data folder containing the *_pos.npy and *_<var>.npy files
+            variables: (tuple)
+                Variables written next to the positions, missing ones are
+                skipped
+            chunk_size: (int)
+                Number of particles converted at a time, the input is read
+                sequentially in blocks of particles
+
+        Returns:
+        --------
+            output: (str)
+                Path of the frame store
+        """
+        pos_file = find_var(path, "pos")
+        positions = np.load(pos_file, mmap_mode="r")
+        n_particles, n_frames = positions.shape[:2]
+
+        arrays = {}
+        for var in variables:
+            files = glob.glob(os.path.join(path, "*_" + var + ".npy"))
+            if files:
+                arrays[var] = np.load(files[0], mmap_mode="r")
+
+        dtype = [("pos", positions.dtype, (3,))]
+        dtype += [(var, arr.dtype) for var, arr in arrays.items()]
+
+        output = pos_file[: -len("_pos.npy")] + cls.suffix
+        tmp = output + ".part"
+        out = np.lib.format.open_memmap(
+            tmp, mode="w+", dtype=np.dtype(dtype), shape=(n_frames, n_particles)
+        )
+
+        for start in tqdm.tqdm(range(0, n_particles, chunk_size)):
+            stop = min(start + chunk_size, n_particles)
+            block = out[:, start:stop]
+            block["pos"] = np.swapaxes(positions[start:stop, :, :3], 0, 1)
+            for var, arr in arrays.items():
+                block[var] = arr[start:stop, :, 0].T
+
+        out.flush()
+        del out
+        os.replace(tmp, output)
+        return output
+
 
 """
 
@@ -348,6 +724,22 @@ def is_variable(var):
     return var
 
 
+def is_bool(value):
+    """ """
+    if isinstance(value, bool):
+        return value
+    if value.lower() in ["true", "yes", "1", "y"]:
+        return True
+    if value.lower() in ["false", "no", "0", "n"]:
+        return False
+    raise argparse.ArgumentTypeError("{} is an invalid boolean".format(value))
+
+
+def split_frames(frames):
+    """ """
+    return [int(i) for i in frames.split(",") if i]
+
+
 def split_res(res):
     """ """
     res = res.lower()
@@ -360,6 +752,37 @@ def find_var(path, var="P"):
     return glob.glob(os.path.join(path, "*_" + var + ".npy"))[0]
 
 
+def find_frames(path):
+    """
+    Path of the frame-major store in the data folder, None if it does not exist
+    """
+    files = glob.glob(os.path.join(path, "*" + FrameStore.suffix))
+    return files[0] if files else None
+
+
+def load_stats(path, var):
+    """
+    Load the global statistics of a variable, computing the sidecar file first
+    if it does not exist
+    """
+    name = var[0].upper()
+    var_file = find_var(path, name)
+    sidecar = stats_path(var_file)
+
+    if not os.path.exists(sidecar):
+        values = np.load(var_file, mmap_mode="r")
+        stats = compute_stats(values, scalar=SCALARS[name])
+        stats.save(sidecar)
+        return stats
+
+    return VariableStats.load(sidecar)
+
+
+def frame_filename(i):
+    """ """
+    return "{}.png".format(str(i).zfill(4))
+
+
 def set_output(path):
     """ """
     output = os.path.join(os.path.dirname(os.path.dirname(path)), "render")
@@ -370,75 +793,235 @@ def set_output(path):
 
 # CLI
 prog_name = "Giant Impact Visualization Tool"
-if "--" not in sys.argv:
-    print(
-        prog_name
-        + "No '--' found in command line arguments. '--' is needed to pass arguments to this script."
-    )
-    sys.exit(1)
-
-# Parse arguments
-arguments = sys.argv  # [sys.argv.index("--") + 1 :]
-
-parser = argparse.ArgumentParser(description="Create captions")
-parser.add_argument(
-    "--data_path",
-    "-p",
-    type=is_path,
-    default="/Users/Projects/givis/assets/",
-    help="Path to the data folder",
-)
-parser.add_argument("--variable", "-v", type=is_variable, default="P", help="Variable")
-parser.add_argument(
-    "--size", "-s", default="640x320", help="Resolution size of the render"
-)
-parser.add_argument(
-    "--colorbar", "-cb", default=False, type=bool, help="Add a colorbar to the frame"
-)
-parser.add_argument("--bins", "-b", default=100, type=int, help="Number of color bins")
-parser.add_argument(
-    "--multiprocessing", "-mp", type=str, default=False, help="Use multiprocessing"
-)
-parser.add_argument(
-    "--cores", "-c", type=int, default=2, help="Number of cores used in multiprocessing"
-)
-parser.add_argument("--cut", "-cut", type=bool, default=False, help="Sliced view")
-
-args = parser.parse_args(arguments)
-data_path = args.data_path
-variable = args.variable
-size = args.size
-colorbar = args.colorbar
-color_bins = args.bins
-mp = args.multiprocessing
-cores = args.cores
-cut = args.cut
-
-pos_file = find_var(data_path, "pos")
-var_file = find_var(data_path, variable[0].upper())
-output = set_output(data_path)
-x_res, y_res = split_res(size)
 
 
-if __name__ == "__main__":
-    # Set the rendering settings
-    vis = Visualization(
-        pos_file=pos_file,
-        var_file=var_file,
-        output=output,
-        x_res=x_res,
-        y_res=y_res,
-        mp=mp,
-        cores=cores,
-        color_bins=color_bins,
-        cut=cut,
+def main(argv=None):
+    """
+    Command line entry point, arguments follow '--' as Blender passes them
+    to the script
+    """
+    if argv is None:
+        argv = sys.argv
+    if "--" not in argv:
+        print(
+            prog_name
+            + "No '--' found in command line arguments. '--' is needed to pass arguments to this script."
+        )
+        sys.exit(1)
+
+    # Parse arguments
+    arguments = argv[argv.index("--") + 1 :]
+
+    parser = argparse.ArgumentParser(description="Create captions")
+    parser.add_argument(
+        "--data_path",
+        "-p",
+        type=is_path,
+        default="/Users/Projects/givis/assets/",
+        help="Path to the data folder",
+    )
+    parser.add_argument(
+        "--variable", "-v", type=is_variable, default="P", help="Variable"
     )
-    vis.render()
+    parser.add_argument(
+        "--size", "-s", default="640x320", help="Resolution size of the render"
+    )
+    parser.add_argument(
+        "--colorbar",
+        "-cb",
+        default=False,
+        type=bool,
+        help="Add a colorbar to the frame",
+    )
+    parser.add_argument(
+        "--bins", "-b", default=100, type=int, help="Number of color bins"
+    )
+    parser.add_argument(
+        "--multiprocessing",
+        "-mp",
+        type=is_bool,
+        default=False,
+        help="Use multiprocessing",
+    )
+    parser.add_argument(
+        "--cores",
+        "-c",
+        type=int,
+        default=2,
+        help="Number of cores used in multiprocessing",
+    )
+    parser.add_argument("--cut", "-cut", type=bool, default=False, help="Sliced view")
+    parser.add_argument(
+        "--convert",
+        action="store_true",
+        help="Convert the data to a frame-major store before rendering",
+    )
+    parser.add_argument(
+        "--persistent",
+        action="store_true",
+        help="Build the color bin objects once and only update particles per frame",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Normalize with global statistics of the variable (computed once)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["blender", "numpy"],
+        default="blender",
+        help="Render with Blender or with the headless NumPy point rasterizer",
+    )
+    parser.add_argument(
+        "--point_size",
+        type=float,
+        default=4,
+        help="Point size in pixels of the numpy backend",
+    )
+    parser.add_argument(
+        "--ply",
+        type=make_path,
+        default=None,
+        help="Write one binary PLY per snapshot to this folder instead of rendering",
+    )
+    parser.add_argument(
+        "--ply_format",
+        choices=["ply", "pcv"],
+        default="ply",
+        help="Format of the --ply files, pcv is the compact quantized format",
+    )
+    parser.add_argument(
+        "--frame_list",
+        type=split_frames,
+        default=None,
+        help="Comma separated frames to render, used by multiprocessing workers",
+    )
+
+    args = parser.parse_args(arguments)
+    data_path = args.data_path
+    variable = args.variable
+    size = args.size
+    colorbar = args.colorbar
+    color_bins = args.bins
+    mp = args.multiprocessing
+    cores = args.cores
+    cut = args.cut
+    frame_list = args.frame_list
+    persistent = args.persistent
+    use_stats = args.stats
+    backend = args.backend
+    ply_path = args.ply
+    ply_format = args.ply_format
+
+    if bpy is None and backend != "numpy" and ply_path is None:
+        print(
+            "Module 'bpy' could not be imported. This probably means you are not using Blender to run this script."
+            " Use '--backend numpy' or '--ply' to run without Blender."
+        )
+        sys.exit(1)
+
+    if args.convert:
+        FrameStore.convert(data_path)
+
+    frames_file = find_frames(data_path)
+    if frames_file is None:
+        pos_file = find_var(data_path, "pos")
+        var_file = find_var(data_path, variable[0].upper())
+    else:
+        pos_file, var_file = None, variable
+    output = set_output(data_path)
+    x_res, y_res = split_res(size)
+
+    stats = None
+    if use_stats:
+        stats = load_stats(data_path, variable)
+
+    if ply_path is not None:
+        # Snapshots to a PLY sequence for the point cloud visualizer
+        limits = None
+        if stats is not None:
+            limits = (stats.clamp[0], stats.clamp[1], stats.scalar)
+
+        ply.convert_to_ply(
+            ply_path,
+            var_file,
+            positions=pos_file,
+            frames=frames_file,
+            var=variable[0].upper(),
+            frame_list=frame_list,
+            cores=cores if mp else 1,
+            limits=limits,
+            fmt=ply_format,
+        )
 
-    # Add a color bar to the frames
-    if colorbar:
-        cb = Colorbar()
-        cb.set_colorbar()
-        cb.apply_colorbar()
+    elif backend == "numpy":
+        # No Blender rendering, frames are rasterized by a pool of processes
+        limits = None
+        if stats is not None:
+            limits = (stats.clamp[0], stats.clamp[1], stats.scalar)
+
+        raster.render_sequence(
+            output,
+            var_file,
+            positions=pos_file,
+            frames=frames_file,
+            var=variable[0].upper(),
+            frame_list=frame_list,
+            cores=cores if mp else 1,
+            color_bins=color_bins,
+            limits=limits,
+            cut=cut,
+            width=x_res,
+            height=y_res,
+            point_size=args.point_size,
+        )
 
-    # Frames to video
+    else:
+        # Set the rendering settings
+        vis = Visualization(
+            positions=pos_file,
+            variable=var_file,
+            frames=frames_file,
+            output=output,
+            x_res=x_res,
+            y_res=y_res,
+            mp=mp,
+            cores=cores,
+            color_bins=color_bins,
+            cut=cut,
+            persistent=persistent,
+            stats=stats,
+        )
+
+        if mp and frame_list is None:
+            worker_args = [
+                "--data_path",
+                data_path,
+                "--variable",
+                variable,
+                "--size",
+                size,
+                "--bins",
+                str(color_bins),
+            ]
+            if cut:
+                worker_args += ["--cut", "1"]
+            if persistent:
+                worker_args += ["--persistent"]
+            if use_stats:
+                worker_args += ["--stats"]
+            vis.render_parallel(worker_args)
+        else:
+            vis.render(frames=frame_list)
+
+        # Add a color bar to the frames
+        if colorbar:
+            cb = Colorbar()
+            cb.set_colorbar()
+            cb.apply_colorbar()
+
+        # Frames to video
+
+
+if __name__ == "__main__":
+    main()
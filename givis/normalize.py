@@ -0,0 +1,125 @@
+"""
+Log-normalization kernels
+
+Normalizing a variable for the color map clamps it to a range and maps the
+log of the clamped values to [0, 1]. The kernels here work in place on an
+output buffer so that no full size temporaries are allocated per frame, and
+can walk a (memory-mapped) array chunk by chunk so that the temporaries do
+not grow with the particle count.
+"""
+import numpy as np
+
+
+# default (min, max, scalar) of the normalization per variable, temperature is
+# in eV and clamped in K
+LIMITS = {"T": (100, 6e3, 11604.0), "P": (1e8, 5e12, 1.0)}
+
+
+def log_normalize(values, v_min, v_max, scalar=1.0, out=None):
+    """
+    Clamp values to [v_min, v_max] and normalize them on a log scale
+
+    Args:
+        values: array of the variable
+        v_min: minimum value in the normalization
+        v_max: maximum value in the normalization
+        scalar: scalar applied to the data before clamping (e.g. eV to K)
+        out: output array with the same shape as values, allocated if None
+
+    Returns:
+        out: normalized array in [0, 1]
+    """
+    values = np.asarray(values)
+    if out is None:
+        out = np.empty(values.shape, dtype=np.float64)
+
+    np.multiply(values, scalar, out=out)
+    np.clip(out, v_min, v_max, out=out)
+    np.log10(out, out=out)
+    out -= np.log10(v_min)
+    out *= 1.0 / (np.log10(v_max) - np.log10(v_min))
+    return out
+
+
+class LogNormalizer:
+    """
+    Log-normalization with a reusable output buffer
+
+    One instance is meant to be kept per worker, the buffer grows to the
+    largest frame seen and is reused afterwards. The array returned by a call
+    is a view of that buffer and is overwritten by the next call.
+    """
+
+    def __init__(
+        self,
+        v_min: float,
+        v_max: float,
+        scalar: float = 1.0,
+        chunk_size: int = 1 << 20,
+        dtype=np.float64,
+    ):
+        """
+        Args:
+            v_min: minimum value in the normalization
+            v_max: maximum value in the normalization
+            scalar: scalar applied to the data before clamping
+            chunk_size: number of values read from the input at a time
+            dtype: dtype of the output buffer
+        """
+        self.v_min = v_min
+        self.v_max = v_max
+        self.scalar = scalar
+        self.chunk_size = chunk_size
+        self.dtype = dtype
+        self.buffer = np.empty(0, dtype=dtype)
+
+    def _reserve(self, n):
+        if self.buffer.shape[0] < n:
+            self.buffer = np.empty(n, dtype=self.dtype)
+        return self.buffer[:n]
+
+    def __call__(self, values):
+        """
+        Normalize a 1D array (or mmap slice) into the reusable buffer
+
+        Args:
+            values: 1D array of the variable
+
+        Returns:
+            out: view of the buffer holding the normalized values
+        """
+        n = values.shape[0]
+        out = self._reserve(n)
+        for start in range(0, n, self.chunk_size):
+            stop = min(start + self.chunk_size, n)
+            log_normalize(
+                values[start:stop],
+                self.v_min,
+                self.v_max,
+                scalar=self.scalar,
+                out=out[start:stop],
+            )
+        return out
+
+    def iter_chunks(self, values):
+        """
+        Normalize a 1D array chunk by chunk, peak memory is one chunk
+
+        Args:
+            values: 1D array of the variable
+
+        Yields:
+            start: index of the first value of the chunk
+            out: view of the buffer holding the normalized chunk
+        """
+        n = values.shape[0]
+        buffer = self._reserve(min(n, self.chunk_size))
+        for start in range(0, n, self.chunk_size):
+            stop = min(start + self.chunk_size, n)
+            yield start, log_normalize(
+                values[start:stop],
+                self.v_min,
+                self.v_max,
+                scalar=self.scalar,
+                out=buffer[: stop - start],
+            )
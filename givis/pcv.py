@@ -3,6 +3,7 @@ import tqdm
 import numpy as np
 import matplotlib.pyplot as plt
 from .space_view3d_point_cloud_visualizer import PCVControl, PCV_OT_render
+from .normalize import LogNormalizer
 import os
 
 # Load in Data
@@ -15,12 +16,26 @@ class PointCloudVisualizer:
     """
 
     def __init__(
-        self, positions: str, temperature: str, blend_file: str = "untitled.blend"
+        self,
+        positions: str,
+        temperature: str,
+        blend_file: str = "untitled.blend",
+        frames: str = None,
     ):
         """
+        Args:
+            positions: path of the particle-major positions array
+            temperature: path of the particle-major variable array, or the
+                field name of the variable when a frame store is used
+            frames: optional path of a frame-major store (*_frames.npy)
         """
-        self.positions = np.load(positions, mmap_mode="r")
-        self.temperature = np.load(temperature, mmap_mode="r")
+        self.frames = None
+        if frames is not None:
+            self.frames = np.load(frames, mmap_mode="r")
+            self.var_name = temperature
+        else:
+            self.positions = np.load(positions, mmap_mode="r")
+            self.temperature = np.load(temperature, mmap_mode="r")
 
         bpy.ops.wm.save_as_mainfile(filepath=blend_file)
         o = bpy.context.active_object
@@ -29,6 +44,7 @@ class PointCloudVisualizer:
         self.pcv.render_path = os.path.join(os.getcwd(), "render/####")
         self.pcv.render_point_size = 4
         self.pcv.alpha_radius = 0.75
+        self.normalizers = {}
 
     def log_normalize(
         self,
@@ -46,14 +62,13 @@ class PointCloudVisualizer:
             scalar: scalar applied to data post normalization
 
         Returns:
-            log_T_ceiling_norm: normalized array
+            log_T_ceiling_norm: normalized array, a buffer that is reused by
+                the next call with the same arguments
         """
-        T_ceiling = np.copy(temperature) * 11604.0
-        T_ceiling[np.where(T_ceiling > T_max)] = T_max
-        T_ceiling[np.where(T_ceiling < T_min)] = T_min
-        log_T_ceiling = np.log10(T_ceiling) - np.log10(T_min)
-        log_T_ceiling_norm = log_T_ceiling / (np.log10(T_max) - np.log10(T_min))
-        return log_T_ceiling_norm
+        key = (T_min, T_max, scalar)
+        if key not in self.normalizers:
+            self.normalizers[key] = LogNormalizer(T_min, T_max, scalar=scalar)
+        return self.normalizers[key](temperature)
 
     def set_render_settings(
         self,
@@ -90,8 +105,14 @@ class PointCloudVisualizer:
     def render_frame(self, i: int, scalar: float = 7.5e7):
         """
         """
-        vs = self.positions[:, i, :] / scalar
-        cs = plt.cm.inferno(temp[:, i, 0])[:, :3]
+        if self.frames is not None:
+            # one sequential read of the whole snapshot
+            frame = np.asarray(self.frames[i])
+            vs = frame["pos"] / scalar
+            cs = plt.cm.inferno(frame[self.var_name])[:, :3]
+        else:
+            vs = self.positions[:, i, :] / scalar
+            cs = plt.cm.inferno(temp[:, i, 0])[:, :3]
         c.draw(vs, None, cs)
         bpy.context.scene.frame_current = i
         bpy.ops.point_cloud_visualizer.render()
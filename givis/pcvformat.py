@@ -0,0 +1,128 @@
+"""
+Compact binary point cloud container (.pcv)
+
+Layout (little endian): 64 bytes header with magic, version, flags, point
+count, bounding box minimum and per-axis scale, then uint16 quantized
+positions (n, 3), optional uint16 octahedral encoded normals (n, 2) and
+optional uint8 colors (n, 3). 6 to 13 bytes per point instead of 40 bytes of
+float32 xyz, normals and rgba.
+
+Shared by the PLY converter (ply.py) and the reader and writers of the point
+cloud visualizer add-on, needs NumPy only.
+"""
+import struct
+
+import numpy as np
+
+
+MAGIC = b"PCVC"
+VERSION = 1
+# magic, version, flags, count, bounding box min, per-axis scale
+HEADER = struct.Struct("<4sHHQ3d3d")
+NORMALS = 1
+COLORS = 2
+
+
+def pack_header(flags, count, v_min, scale):
+    """
+    Header bytes of a file with count points
+    """
+    return HEADER.pack(MAGIC, VERSION, flags, count, *v_min, *scale)
+
+
+def unpack_header(data):
+    """
+    Parse the header at the start of data
+
+    Returns:
+        flags: NORMALS and COLORS bits
+        count: number of points
+        v_min: bounding box minimum (3,) float64
+        scale: per-axis scale (3,) float64
+
+    Raises:
+        TypeError: not a pcv file or unsupported version
+    """
+    magic, version, flags, count, *box = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise TypeError("not a pcv file")
+    if version != VERSION:
+        raise TypeError("unsupported pcv file version")
+    return flags, count, np.array(box[:3]), np.array(box[3:])
+
+
+def offsets(count, flags):
+    """
+    Byte offsets of the positions, normals and colors sections
+    """
+    n = HEADER.size + count * 6
+    return HEADER.size, n, n + (count * 4 if flags & NORMALS else 0)
+
+
+def bounds(v_min, v_max):
+    """
+    Bounding box minimum and per-axis scale mapping it to uint16, flat axes
+    get scale 1.0
+    """
+    v_min = np.array(v_min, dtype=np.float64)
+    scale = (np.array(v_max, dtype=np.float64) - v_min) / 65535
+    scale[scale == 0] = 1.0
+    return v_min, scale
+
+
+def quantize(vs, v_min, scale):
+    """
+    Positions (n, 3) to little endian uint16 over the bounding box
+    """
+    q = np.round((np.asarray(vs) - v_min) / scale)
+    return np.clip(q, 0, 65535).astype("<u2")
+
+
+def dequantize(q, v_min, scale, out=None):
+    """
+    Quantized positions (n, 3) to float32, decoded in float32 only
+
+    Args:
+        q: uint16 positions (n, 3)
+        v_min: bounding box minimum (3,)
+        scale: per-axis scale (3,)
+        out: float32 array (n, 3) to decode into, allocated if None
+    """
+    if out is None:
+        out = np.empty(q.shape, dtype=np.float32)
+    np.multiply(q, np.asarray(scale, dtype=np.float32), out=out)
+    out += np.asarray(v_min, dtype=np.float32)
+    return out
+
+
+def oct_encode(ns):
+    """
+    Unit normals (n, 3) to octahedral uint16 (n, 2)
+    """
+    ns = np.asarray(ns, dtype=np.float64)
+    ns = ns / np.maximum(np.sum(np.abs(ns), axis=1), 1e-20)[:, None]
+    x = ns[:, 0]
+    y = ns[:, 1]
+    lower = ns[:, 2] < 0
+    sx = np.where(x >= 0, 1.0, -1.0)
+    sy = np.where(y >= 0, 1.0, -1.0)
+    ex = np.where(lower, (1.0 - np.abs(y)) * sx, x)
+    ey = np.where(lower, (1.0 - np.abs(x)) * sy, y)
+    e = np.column_stack((ex, ey))
+    return np.round((e * 0.5 + 0.5) * 65535).astype("<u2")
+
+
+def oct_decode(e):
+    """
+    Octahedral uint16 (n, 2) to float32 unit normals (n, 3)
+    """
+    e = e.astype(np.float32) * np.float32(2 / 65535) - np.float32(1)
+    x = e[:, 0]
+    y = e[:, 1]
+    z = 1.0 - np.abs(x) - np.abs(y)
+    t = np.maximum(-z, 0.0)
+    x -= np.where(x >= 0, t, -t)
+    y -= np.where(y >= 0, t, -t)
+    ns = np.column_stack((x, y, z))
+    ns /= np.linalg.norm(ns, axis=1)[:, None]
+    return ns.astype(np.float32)
@@ -0,0 +1,216 @@
+"""
+Simulation snapshots to PLY sequences
+
+Writes one binary PLY per timestep from the *_pos.npy/*_T.npy/*_P.npy arrays
+(or the frame-major store), with positions scaled like the renderer and the
+chosen variable color mapped to uint8 colors. Files are numbered from 1 so
+that the point cloud visualizer sequence player loads them directly, the
+viewport and the batch renderer then share one on-disk format.
+"""
+import os
+import multiprocessing
+
+import numpy as np
+
+from . import pcvformat, snapshots
+
+
+PLY_DTYPE = np.dtype(
+    [
+        ("x", "<f4"),
+        ("y", "<f4"),
+        ("z", "<f4"),
+        ("red", "u1"),
+        ("green", "u1"),
+        ("blue", "u1"),
+    ]
+)
+
+
+def write_ply(path, points):
+    """
+    Write a structured array as binary little endian PLY
+
+    The file is written next to path first and renamed when complete.
+
+    Args:
+        path: output path
+        points: structured array, fields are written as vertex properties
+    """
+    types = {"B": "uchar", "b": "char", "H": "ushort", "h": "short"}
+    types.update({"I": "uint", "i": "int", "f": "float", "d": "double"})
+
+    header = "ply\nformat binary_little_endian 1.0\n"
+    header += "element vertex {}\n".format(len(points))
+    for name in points.dtype.names:
+        header += "property {} {}\n".format(types[points.dtype[name].char], name)
+    header += "end_header\n"
+
+    tmp = path + ".part"
+    with open(tmp, "wb") as f:
+        f.write(header.encode("ascii"))
+        f.write(np.ascontiguousarray(points).tobytes())
+    os.replace(tmp, path)
+
+
+def write_pcv(path, points):
+    """
+    Write positions and colors as compact .pcv file
+
+    Positions are quantized to uint16 over the bounding box and colors are
+    kept as uint8, 9 bytes per point instead of 15 of the PLY.
+
+    Args:
+        path: output path
+        points: structured array with PLY_DTYPE fields
+    """
+    vs = np.column_stack((points["x"], points["y"], points["z"])).astype(np.float64)
+    if len(vs):
+        v_min, scale = pcvformat.bounds(vs.min(axis=0), vs.max(axis=0))
+    else:
+        v_min, scale = pcvformat.bounds(np.zeros(3), np.zeros(3))
+    cs = np.column_stack((points["red"], points["green"], points["blue"]))
+
+    tmp = path + ".part"
+    with open(tmp, "wb") as f:
+        f.write(pcvformat.pack_header(pcvformat.COLORS, len(vs), v_min, scale))
+        f.write(pcvformat.quantize(vs, v_min, scale).tobytes())
+        f.write(np.ascontiguousarray(cs, dtype=np.uint8).tobytes())
+    os.replace(tmp, path)
+
+
+WRITERS = {"ply": write_ply, "pcv": write_pcv}
+
+
+def ply_filename(prefix, i, fmt="ply"):
+    """
+    Name of the file of snapshot i, sequence numbers start at 1
+    """
+    return "{}_{}.{}".format(prefix, str(i + 1).zfill(4), fmt)
+
+
+_worker = {}
+
+
+def _init_worker(config):
+    """
+    Open the data and build the color lookup table once per process
+    """
+    snapshots.open_data(_worker, config)
+    lut = snapshots.color_table(config["color_map"], config["levels"])
+    _worker["lut"] = (lut * 255 + 0.5).astype(np.uint8)
+
+
+def _convert_worker(i):
+    """
+    Write the PLY of snapshot i in a pool process, returns its path
+    """
+    config = _worker["config"]
+    fmt = config["format"]
+    path = os.path.join(config["output"], ply_filename(config["prefix"], i, fmt))
+    if os.path.exists(path):
+        return path
+
+    pos, var = snapshots.snapshot(_worker, i)
+
+    levels = config["levels"]
+    norm = _worker["normalizer"](var)
+    idx = np.minimum((norm * levels).astype(np.int64), levels - 1)
+    colors = _worker["lut"][idx]
+
+    points = np.empty(len(pos), dtype=PLY_DTYPE)
+    scale = 1.0 / config["scale"]
+    points["x"] = pos[:, 0] * scale
+    points["y"] = pos[:, 1] * scale
+    points["z"] = pos[:, 2] * scale
+    points["red"] = colors[:, 0]
+    points["green"] = colors[:, 1]
+    points["blue"] = colors[:, 2]
+
+    WRITERS[fmt](path, points)
+    return path
+
+
+def convert_to_ply(
+    output: str,
+    variable: str,
+    positions: str = None,
+    frames: str = None,
+    var: str = "P",
+    prefix: str = "snapshot",
+    frame_list: list = None,
+    cores: int = 4,
+    color_map: str = "inferno",
+    levels: int = 256,
+    limits: tuple = None,
+    scale: float = 7.5e7,
+    fmt: str = "ply",
+):
+    """
+    Write one binary PLY (or compact .pcv) per timestep with a pool of processes
+
+    Args:
+        output: directory of the PLY files
+        variable: path of the particle-major variable array
+        positions: path of the particle-major positions array
+        frames: path of a frame-major store, used instead of positions and
+            variable if given
+        var: variable name ('T' or 'P') used for colors
+        prefix: file name prefix, files are named <prefix>_0001.ply, ...
+        frame_list: snapshots to convert, all if None. Existing files are
+            skipped
+        cores: number of processes
+        color_map: name of the matplotlib color map
+        levels: number of colors of the color map lookup table
+        limits: (min, max, scalar) of the normalization, the default of the
+            variable if None
+        scale: positions are divided by scale
+        fmt: 'ply' or 'pcv', the compact format with quantized positions
+
+    Returns:
+        paths: paths of the written files
+    """
+    if not os.path.exists(output):
+        os.makedirs(output)
+
+    if frame_list is None:
+        frame_list = range(snapshots.frame_count(positions, frames))
+
+    config = {
+        "output": output,
+        "positions": positions,
+        "variable": variable,
+        "frames": frames,
+        "var": var,
+        "prefix": prefix,
+        "color_map": color_map,
+        "levels": levels,
+        "limits": limits,
+        "scale": scale,
+        "format": fmt,
+    }
+
+    if cores <= 1:
+        _init_worker(config)
+        return [_convert_worker(i) for i in frame_list]
+
+    with multiprocessing.Pool(cores, _init_worker, (config,)) as pool:
+        return pool.map(_convert_worker, frame_list, chunksize=1)
+
+
+if __name__ == "__main__":
+    parser = snapshots.parser("Convert snapshots to PLY files")
+    parser.add_argument("--output", "-o", required=True, help="Output folder")
+    parser.add_argument("--format", "-f", default="ply", choices=sorted(WRITERS))
+    args = parser.parse_args()
+
+    var, variable, positions, frames = snapshots.data_files(args)
+    convert_to_ply(
+        args.output,
+        variable,
+        positions=positions,
+        frames=frames,
+        var=var,
+        cores=args.cores,
+        fmt=args.format,
+    )
@@ -0,0 +1,137 @@
+"""
+8 bit RGBA PNG files from NumPy arrays
+
+Encoder and background writer shared by the headless rasterizer (raster.py)
+and the render operators of the point cloud visualizer add-on, needs NumPy
+only. Frames are written next to the target first and renamed when complete,
+so an interrupted render never leaves a truncated PNG behind.
+"""
+import os
+import time
+import zlib
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def _chunk(tag, data):
+    return (
+        struct.pack(">I", len(data))
+        + tag
+        + data
+        + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+    )
+
+
+def write_png(path, image, compress_level=6, flip=False):
+    """
+    Write an RGBA uint8 image as PNG
+
+    The file is written to <path>.part and moved to path with os.replace, the
+    temp file is removed if writing fails.
+
+    Args:
+        path: output path
+        image: (height, width, 4) uint8 array, top row first
+        compress_level: zlib compression level 0-9
+        flip: rows are bottom to top (as read from a framebuffer), flip them
+    """
+    h, w = image.shape[:2]
+    if flip:
+        image = image[::-1]
+    # each scanline is prefixed with the filter type byte, 0 is no filter
+    raw = np.zeros((h, w * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = image.reshape(h, w * 4)
+
+    tmp = path + ".part"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n")
+            f.write(_chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 6, 0, 0, 0)))
+            f.write(_chunk(b"IDAT", zlib.compress(raw.tobytes(), compress_level)))
+            f.write(_chunk(b"IEND", b""))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class PNGWriterPool:
+    """
+    Background PNG encoding with a bounded number of frames in flight
+
+    submit returns immediately unless max_in_flight frames are already
+    waiting, in which case it blocks until one of them is written. zlib
+    releases the GIL, so threads encode in parallel. Write errors are
+    collected in errors as (path, exception), report is called after every
+    frame.
+    """
+
+    def __init__(self, workers: int = 2, max_in_flight: int = 4, compress_level=6):
+        """
+        Args:
+            workers: number of writer threads
+            max_in_flight: maximum number of frames waiting to be written
+            compress_level: default zlib compression level of submit
+        """
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.lock = threading.Lock()
+        self.compress_level = compress_level
+        self.backlog = 0
+        self.written = 0
+        self.encode_time = 0.0
+        self.errors = []
+
+    def submit(self, path, image, compress_level=None, flip=False):
+        """
+        Queue an RGBA uint8 image for writing, the image must not be modified
+        afterwards
+        """
+        if compress_level is None:
+            compress_level = self.compress_level
+        self.slots.acquire()
+        with self.lock:
+            self.backlog += 1
+        self.executor.submit(self._write, path, image, compress_level, flip)
+
+    def _write(self, path, image, compress_level, flip):
+        t = time.time()
+        error = None
+        try:
+            write_png(path, image, compress_level, flip)
+        except Exception as e:
+            error = e
+            with self.lock:
+                self.errors.append((path, e))
+        finally:
+            with self.lock:
+                self.backlog -= 1
+                self.written += 1
+                self.encode_time += time.time() - t
+            self.slots.release()
+        self.report(path, error)
+
+    def report(self, path, error):
+        """
+        Called from the writer thread after each frame, error is None if the
+        frame was written
+        """
+        pass
+
+    def average_encode_time(self):
+        """
+        Mean seconds per written frame
+        """
+        with self.lock:
+            if self.written == 0:
+                return 0.0
+            return self.encode_time / self.written
+
+    def close(self):
+        """
+        Wait for all frames to be written
+        """
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,384 @@
+"""
+Headless point rasterizer
+
+Pure NumPy render backend that needs neither Blender nor a GPU. It
+reproduces the look of the simple point shader of the point cloud visualizer
+(vertex_shader_simple/fragment_shader_simple): perspective projection, depth
+test, round points of a fixed pixel size with an alpha_radius cutoff and a
+global alpha. Frames are rendered by a pool of processes and written as PNG
+by a pool of background threads.
+"""
+import os
+import collections
+import multiprocessing
+
+import numpy as np
+
+from . import snapshots
+from .pngfile import PNGWriterPool, write_png
+
+
+class Camera:
+    """
+    Perspective camera with Blender conventions
+
+    Defaults match the camera placed by Visualization.set_render_settings on
+    the default scene camera.
+    """
+
+    def __init__(
+        self,
+        location: tuple = (40, -20, 20),
+        rotation: tuple = (np.deg2rad(63.43), 0, np.deg2rad(63.43)),
+        lens: float = 35.0,
+        sensor: float = 32.0,
+        clip_start: float = 0.1,
+        clip_end: float = 100.0,
+    ):
+        """
+        Args:
+            location: camera location in world space
+            rotation: XYZ euler rotation in radians
+            lens: focal length in mm
+            sensor: sensor size in mm, fitted to the larger image dimension
+            clip_start: near clipping distance
+            clip_end: far clipping distance
+        """
+        self.location = np.asarray(location, dtype=np.float64)
+        self.rotation = np.asarray(rotation, dtype=np.float64)
+        self.lens = lens
+        self.sensor = sensor
+        self.clip_start = clip_start
+        self.clip_end = clip_end
+
+    @property
+    def rotation_matrix(self):
+        """
+        Camera to world rotation, Blender 'XYZ' euler order
+        """
+        x, y, z = self.rotation
+        rx = np.array(
+            [[1, 0, 0], [0, np.cos(x), -np.sin(x)], [0, np.sin(x), np.cos(x)]]
+        )
+        ry = np.array(
+            [[np.cos(y), 0, np.sin(y)], [0, 1, 0], [-np.sin(y), 0, np.cos(y)]]
+        )
+        rz = np.array(
+            [[np.cos(z), -np.sin(z), 0], [np.sin(z), np.cos(z), 0], [0, 0, 1]]
+        )
+        return rz @ ry @ rx
+
+    def project(self, points, width, height):
+        """
+        Project world space points to pixel coordinates
+
+        Args:
+            points: (N, 3) array of positions
+            width: image width in pixels
+            height: image height in pixels
+
+        Returns:
+            x: column coordinate of each point
+            y: row coordinate of each point, rows go from top to bottom
+            depth: distance from the camera along the view direction
+            visible: mask of points between the clipping planes
+        """
+        pc = (np.asarray(points, dtype=np.float64) - self.location) @ self.rotation_matrix
+        depth = -pc[:, 2]
+        visible = (depth > self.clip_start) & (depth < self.clip_end)
+        depth = np.where(visible, depth, 1.0)
+
+        f = self.lens / self.sensor * max(width, height)
+        x = width / 2.0 + f * pc[:, 0] / depth
+        y = height / 2.0 - f * pc[:, 1] / depth
+        return x, y, depth, visible
+
+
+class PointRasterizer:
+    """
+    Depth-tested rasterizer of round, fixed size points
+
+    The depth and color buffers are allocated once and reused for every
+    frame rendered with the same instance.
+    """
+
+    def __init__(
+        self,
+        width: int = 1920,
+        height: int = 1080,
+        point_size: float = 4,
+        alpha_radius: float = 0.75,
+        global_alpha: float = 1.0,
+        camera: Camera = None,
+        background: tuple = (0.0, 0.0, 0.0, 0.0),
+        chunk_size: int = 1 << 18,
+    ):
+        """
+        Args:
+            width: image width in pixels
+            height: image height in pixels
+            point_size: point diameter in pixels
+            alpha_radius: squared radius in point coordinates beyond which
+                fragments are discarded, like in fragment_shader_simple
+            global_alpha: alpha of every point
+            camera: Camera, the default camera if None
+            background: RGBA background color
+            chunk_size: number of points rasterized at a time
+        """
+        self.width = width
+        self.height = height
+        self.point_size = point_size
+        self.alpha_radius = alpha_radius
+        self.global_alpha = global_alpha
+        self.camera = camera or Camera()
+        self.background = np.asarray(background, dtype=np.float32)
+        self.chunk_size = chunk_size
+
+        self.dx, self.dy = self._footprint()
+        self.depth = np.empty(width * height, dtype=np.float64)
+        self.color = np.empty((width * height, 3), dtype=np.float32)
+
+    def _footprint(self):
+        """
+        Pixel offsets covered by a point, relative to its first pixel
+        """
+        s = max(1, int(round(self.point_size)))
+        k = np.arange(s)
+        dy, dx = np.meshgrid(k, k, indexing="ij")
+        # gl_PointCoord of each pixel center mapped to [-1, 1]
+        cx = 2.0 * (dx + 0.5) / s - 1.0
+        cy = 2.0 * (dy + 0.5) / s - 1.0
+        keep = cx ** 2 + cy ** 2 <= self.alpha_radius
+        return dx[keep], dy[keep]
+
+    def render(self, points, colors):
+        """
+        Render points into an RGBA image
+
+        Args:
+            points: (N, 3) array of world space positions
+            colors: (N, 3) or (N, 4) array of colors in [0, 1]
+
+        Returns:
+            image: (height, width, 4) uint8 array, top row first
+        """
+        w, h = self.width, self.height
+        s = max(1, int(round(self.point_size)))
+        self.depth.fill(np.inf)
+
+        for start in range(0, len(points), self.chunk_size):
+            pts = points[start : start + self.chunk_size]
+            cs = np.asarray(colors[start : start + self.chunk_size])[:, :3]
+
+            x, y, z, visible = self.camera.project(pts, w, h)
+            x0 = np.floor(x[visible] - s / 2.0 + 0.5).astype(np.int64)
+            y0 = np.floor(y[visible] - s / 2.0 + 0.5).astype(np.int64)
+            z = z[visible]
+            cs = cs[visible]
+
+            px = x0[:, None] + self.dx[None, :]
+            py = y0[:, None] + self.dy[None, :]
+            inside = (px >= 0) & (px < w) & (py >= 0) & (py < h)
+
+            pix = (py * w + px)[inside]
+            d = np.broadcast_to(z[:, None], px.shape)[inside]
+            src = np.broadcast_to(np.arange(len(z))[:, None], px.shape)[inside]
+
+            # nearest fragment per pixel within the chunk
+            order = np.lexsort((d, pix))
+            pix, d, src = pix[order], d[order], src[order]
+            first = np.ones(len(pix), dtype=bool)
+            first[1:] = pix[1:] != pix[:-1]
+            pix, d, src = pix[first], d[first], src[first]
+
+            # depth test against the previous chunks
+            closer = d < self.depth[pix]
+            pix = pix[closer]
+            self.depth[pix] = d[closer]
+            self.color[pix] = cs[src[closer]]
+
+        hit = np.isfinite(self.depth)
+        image = np.empty((w * h, 4), dtype=np.float32)
+        image[:] = self.background
+        # points are blended over the background with the global alpha
+        a = self.global_alpha
+        image[hit, :3] = self.color[hit] * a + self.background[:3] * (1.0 - a)
+        image[hit, 3] = a + self.background[3] * (1.0 - a)
+
+        np.clip(image, 0.0, 1.0, out=image)
+        image *= 255.0
+        image += 0.5
+        return image.astype(np.uint8).reshape(h, w, 4)
+
+
+_worker = {}
+
+
+def _init_worker(config):
+    """
+    Open the data and allocate the rasterizer once per process
+    """
+    snapshots.open_data(_worker, config)
+    _worker["cmap"] = snapshots.color_table(
+        config["color_map"], config["color_bins"]
+    ).astype(np.float32)
+    _worker["rasterizer"] = PointRasterizer(**config["raster"])
+
+
+def _render_worker(i):
+    """
+    Render frame i in a pool process
+
+    Returns:
+        path: path of the PNG
+        image: rendered RGBA image, None if the PNG already exists
+    """
+    config = _worker["config"]
+    path = os.path.join(config["output"], "{}.png".format(str(i).zfill(4)))
+    if os.path.exists(path):
+        return path, None
+
+    pos, var = snapshots.snapshot(_worker, i)
+
+    if config["cut"]:
+        idx = pos[:, 2] < 0
+        pos, var = pos[idx], var[idx]
+
+    bins = config["color_bins"]
+    norm = _worker["normalizer"](var)
+    dig = np.minimum((norm * bins).astype(np.int64), bins - 1)
+    colors = _worker["cmap"][dig]
+
+    return path, _worker["rasterizer"].render(pos / config["scale"], colors)
+
+
+def render_sequence(
+    output: str,
+    variable: str,
+    positions: str = None,
+    frames: str = None,
+    var: str = "P",
+    frame_list: list = None,
+    cores: int = 4,
+    color_bins: int = 100,
+    color_map: str = "inferno",
+    limits: tuple = None,
+    cut: bool = False,
+    scale: float = 7.5e7,
+    writer_threads: int = None,
+    max_in_flight: int = None,
+    **raster
+):
+    """
+    Render a simulation to PNG frames with a pool of processes
+
+    Frames are rasterized by the processes and handed off to a pool of writer
+    threads for PNG encoding, so rendering never waits for compression unless
+    the encode backlog is full.
+
+    Args:
+        output: directory of the rendered frames
+        variable: path of the particle-major variable array
+        positions: path of the particle-major positions array
+        frames: path of a frame-major store, used instead of positions and
+            variable if given
+        var: variable name ('T' or 'P'), field of the frame store
+        frame_list: frames to render, all frames if None. Frames whose PNG
+            already exists are skipped
+        cores: number of processes
+        color_bins: number of color bins
+        color_map: name of the matplotlib color map
+        limits: (min, max, scalar) of the normalization, the default of the
+            variable if None
+        cut: only render particles with z < 0
+        scale: positions are divided by scale
+        writer_threads: number of PNG writer threads, cores if None
+        max_in_flight: maximum number of rendered frames waiting for encoding,
+            2 * cores if None
+        raster: keyword arguments of PointRasterizer
+
+    Returns:
+        paths: paths of the rendered frames
+    """
+    if not os.path.exists(output):
+        os.makedirs(output)
+
+    if frame_list is None:
+        frame_list = range(snapshots.frame_count(positions, frames))
+
+    config = {
+        "output": output,
+        "positions": positions,
+        "variable": variable,
+        "frames": frames,
+        "var": var,
+        "color_bins": color_bins,
+        "color_map": color_map,
+        "limits": limits,
+        "cut": cut,
+        "scale": scale,
+        "raster": raster,
+    }
+
+    cores = max(1, cores)
+    writer = PNGWriterPool(
+        workers=writer_threads or cores, max_in_flight=max_in_flight or 2 * cores
+    )
+    paths = []
+
+    def write(path, image):
+        paths.append(path)
+        if image is not None:
+            writer.submit(path, image)
+
+    try:
+        if cores == 1:
+            _init_worker(config)
+            for i in frame_list:
+                write(*_render_worker(i))
+            return paths
+
+        # at most 2 * cores frames are queued in the processes, results are
+        # collected in order and handed to the writer
+        with multiprocessing.Pool(cores, _init_worker, (config,)) as pool:
+            queued = collections.deque()
+            for i in frame_list:
+                queued.append(pool.apply_async(_render_worker, (i,)))
+                if len(queued) >= 2 * cores:
+                    write(*queued.popleft().get())
+            while queued:
+                write(*queued.popleft().get())
+        return paths
+    finally:
+        writer.close()
+        if writer.errors:
+            raise writer.errors[0][1]
+
+
+if __name__ == "__main__":
+    parser = snapshots.parser("Render frames without Blender")
+    parser.add_argument("--size", "-s", default="1920x1080", help="Resolution")
+    parser.add_argument("--bins", "-b", default=100, type=int, help="Color bins")
+    parser.add_argument("--point_size", default=4, type=float, help="Point size")
+    parser.add_argument("--cut", action="store_true", help="Sliced view")
+    args = parser.parse_args()
+
+    var, variable, positions, frames = snapshots.data_files(args)
+    x_res, y_res = [int(v) for v in args.size.lower().split("x")]
+    output = os.path.join(os.path.dirname(os.path.dirname(args.data_path)), "render")
+    if not os.path.exists(output):
+        os.makedirs(output)
+
+    render_sequence(
+        output,
+        variable,
+        positions=positions,
+        frames=frames,
+        var=var,
+        cores=args.cores,
+        color_bins=args.bins,
+        cut=args.cut,
+        width=x_res,
+        height=y_res,
+        point_size=args.point_size,
+    )
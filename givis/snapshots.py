@@ -0,0 +1,107 @@
+"""
+Snapshot access shared by the headless tools
+
+Data loading of the pool workers, snapshot lookup and the command line of the
+NumPy rasterizer (raster.py) and the PLY converter (ply.py). Snapshots come
+either from the frame-major store or from the particle-major *_pos.npy and
+variable arrays, all opened memory-mapped.
+"""
+import os
+import glob
+import argparse
+
+import numpy as np
+
+from .normalize import LIMITS, LogNormalizer
+
+
+def open_data(worker, config):
+    """
+    Open the arrays and the normalizer of the variable once per process
+
+    Args:
+        worker: dict of the process, gets 'frames' (or 'positions' and
+            'variable'), 'normalizer' and 'config'
+        config: dict with 'frames', 'positions', 'variable', 'var' and
+            'limits'
+    """
+    if config["frames"] is not None:
+        worker["frames"] = np.load(config["frames"], mmap_mode="r")
+    else:
+        worker["frames"] = None
+        worker["positions"] = np.load(config["positions"], mmap_mode="r")
+        worker["variable"] = np.load(config["variable"], mmap_mode="r")
+
+    v_min, v_max, scalar = config["limits"] or LIMITS[config["var"]]
+    worker["normalizer"] = LogNormalizer(v_min, v_max, scalar=scalar)
+    worker["config"] = config
+
+
+def snapshot(worker, i):
+    """
+    Positions and variable of snapshot i from the arrays of open_data
+
+    Returns:
+        pos: positions (n, 3)
+        var: variable (n,)
+    """
+    if worker["frames"] is not None:
+        frame = np.asarray(worker["frames"][i])
+        return frame["pos"], frame[worker["config"]["var"]]
+    return worker["positions"][:, i, :3], worker["variable"][:, i, 0]
+
+
+def color_table(color_map, levels):
+    """
+    RGB colors (levels, 3) in 0-1 sampled evenly from a matplotlib color map
+    """
+    import matplotlib.pyplot as plt
+
+    return plt.get_cmap(color_map)(np.linspace(0, 1, levels))[:, :3]
+
+
+def frame_count(positions=None, frames=None):
+    """
+    Number of snapshots of the frame-major store, or of the positions array
+    """
+    if frames is not None:
+        return np.load(frames, mmap_mode="r").shape[0]
+    return np.load(positions, mmap_mode="r").shape[1]
+
+
+def find(path, suffix):
+    """
+    First file in path ending with suffix, None if there is none
+    """
+    files = glob.glob(os.path.join(path, "*" + suffix))
+    return files[0] if files else None
+
+
+def parser(description):
+    """
+    Argument parser with the data folder, variable and process count
+    """
+    p = argparse.ArgumentParser(description=description)
+    p.add_argument("--data_path", "-p", required=True, help="Data folder")
+    p.add_argument("--variable", "-v", default="P", help="Variable")
+    p.add_argument("--cores", "-c", default=4, type=int, help="Processes")
+    return p
+
+
+def data_files(args):
+    """
+    Files of the data folder given on the command line
+
+    Returns:
+        var: variable name ('T' or 'P')
+        variable: path of the particle-major variable array
+        positions: path of the particle-major positions array
+        frames: path of the frame-major store, None if there is none
+    """
+    var = args.variable[0].upper()
+    return (
+        var,
+        find(args.data_path, "_" + var + ".npy"),
+        find(args.data_path, "_pos.npy"),
+        find(args.data_path, "_frames.npy"),
+    )
@@ -29,6 +29,7 @@ bl_info = {"name": "Point Cloud Visualizer",
 
 
 import os
+import io
 import struct
 import uuid
 import time
@@ -40,6 +41,16 @@ import shutil
 import sys
 import random
 import statistics
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    # compact .pcv format and png writer shared with the headless tools, next to this file when installed as single module
+    from . import pcvformat, pngfile
+except ImportError:
+    import pcvformat
+    import pngfile
 
 import bpy
 import bmesh
@@ -927,13 +938,115 @@ class PCParticles():
         log("completed in {}.".format(_d), 1)
 
 
-class BinPlyPointCloudReader():
-    def __init__(self, path, ):
+class PlyElementLayout():
+    """Byte layout of elements of binary ply file, shared by readers
+    
+    Needs path, mmap, _header_length, _endianness and _elements (dicts with 'type', 'count' and 'props' as (name, type) or (name, count type, type) for lists) set by reader.
+    """
+    
+    def _element_layout(self, f, offset, element, ):
+        # dtype of element rows and size of element in bytes, dtype is None if list properties have different lengths in different rows
+        e = self._endianness
+        props = element['props']
+        c = element['count']
+        if(all([len(p) == 2 for p in props])):
+            dt = np.dtype([(p[0], '{}{}'.format(e, p[1]), ) for p in props])
+            return dt, c * dt.itemsize
+        if(c == 0):
+            return None, 0
+        
+        # list properties, take list lengths from first row (e.g. triangles only) and verify all rows have the same, touches only count fields
+        f.seek(offset)
+        dtp = []
+        for p in props:
+            if(len(p) == 2):
+                n, t = p
+                dtp.append((n, '{}{}'.format(e, t), ))
+                f.seek(np.dtype(t).itemsize, 1)
+            else:
+                n, ct, t = p
+                cdt = np.dtype('{}{}'.format(e, ct))
+                k = int(np.frombuffer(f.read(cdt.itemsize), dtype=cdt, )[0])
+                dtp.append(('{}_count'.format(n), cdt.str, ))
+                dtp.append((n, '{}{}'.format(e, t), (k, ), ))
+                f.seek(k * np.dtype(t).itemsize, 1)
+        dt = np.dtype(dtp)
+        
+        uniform = (offset + c * dt.itemsize <= os.path.getsize(self.path))
+        if(uniform):
+            m = np.memmap(self.path, dtype=dt, mode='r', offset=offset, shape=(c, ), )
+            for p in props:
+                if(len(p) == 3):
+                    n = p[0]
+                    if(not np.all(m['{}_count'.format(n)] == dt[n].shape[0])):
+                        uniform = False
+                        break
+            del m
+        if(uniform):
+            return dt, c * dt.itemsize
+        
+        # variable length lists, walk rows
+        f.seek(offset)
+        size = 0
+        for _ in range(c):
+            for p in props:
+                if(len(p) == 2):
+                    b = np.dtype(p[1]).itemsize
+                    f.seek(b, 1)
+                    size += b
+                else:
+                    n, ct, t = p
+                    cdt = np.dtype('{}{}'.format(e, ct))
+                    k = int(np.frombuffer(f.read(cdt.itemsize), dtype=cdt, )[0])
+                    b = k * np.dtype(t).itemsize
+                    f.seek(b, 1)
+                    size += cdt.itemsize + b
+        return None, size
+    
+    def _element_offsets(self, last=None, ):
+        # exact byte offset, size and row dtype of each element up to and including last (all if None), elements after it are not sized, walking a variable length face list would cost a python loop over all faces
+        with open(self.path, mode='rb') as f:
+            o = self._header_length
+            for element in self._elements:
+                if('offset' not in element):
+                    dt, size = self._element_layout(f, o, element, )
+                    element['offset'] = o
+                    element['size'] = size
+                    element['dtype'] = dt
+                o = element['offset'] + element['size']
+                if(element is last):
+                    break
+    
+    def read_element(self, element, ):
+        """Read element data from binary file, seeks directly to element offset
+        
+        Args:
+            element: element dict from self._elements
+        
+        Returns:
+            structured array, read-only np.memmap in mmap mode
+        
+        """
+        if('offset' not in element):
+            self._element_offsets(element)
+        dt = element['dtype']
+        if(dt is None):
+            raise TypeError("element '{}' has list properties with variable length".format(element['type']))
+        if(self.mmap):
+            return np.memmap(self.path, dtype=dt, mode='r', offset=element['offset'], shape=(element['count'], ), )
+        with open(self.path, mode='rb') as f:
+            f.seek(element['offset'])
+            return np.fromfile(f, dtype=dt, count=element['count'], )
+
+
+class BinPlyPointCloudReader(PlyElementLayout):
+    def __init__(self, path, mmap=False, ):
         log("{}:".format(self.__class__.__name__), 0)
         if(os.path.exists(path) is False or os.path.isdir(path) is True):
             raise OSError("did you point me to an imaginary file? ('{0}')".format(path))
         
         self.path = path
+        self.mmap = mmap
         self._stream = open(self.path, "rb")
         log("reading header..", 1)
         self._header()
@@ -989,17 +1102,17 @@ class BinPlyPointCloudReader():
                 _comments.append(l[8:])
             if(l.startswith('element ')):
                 a = l.split(' ')
-                _elements.append({'name': a[1], 'properties': [], 'count': int(a[2]), })
+                _elements.append({'type': a[1], 'props': [], 'count': int(a[2]), })
                 _current_element = len(_elements) - 1
             if(l.startswith('property ')):
                 a = l[9:].split(' ')
                 if(a[0] != 'list'):
-                    _elements[_current_element]['properties'].append((a[1], _types[a[0]]))
+                    _elements[_current_element]['props'].append((a[1], _types[a[0]]))
                 else:
-                    c = _types[a[2]]
+                    c = _types[a[1]]
                     t = _types[a[2]]
                     n = a[3]
-                    _elements[_current_element]['properties'].append((n, c, t))
+                    _elements[_current_element]['props'].append((n, c, t))
             if(i == len(h) - 1 and l == 'end_header'):
                 continue
         
@@ -1015,26 +1128,19 @@ class BinPlyPointCloudReader():
     
     def _data_np(self):
         self.data = {}
-        for i, d in enumerate(self._elements):
-            nm = d['name']
-            if(nm != 'vertex'):
-                # read only vertices
-                continue
-            props = d['properties']
-            dtp = [None] * len(props)
-            e = self._endianness
-            for i, p in enumerate(props):
-                n, t = p
-                dtp[i] = (n, '{}{}'.format(e, t))
-            dt = np.dtype(dtp)
-            self._stream.seek(self._header_length)
+        vertices = [d for d in self._elements if d['type'] == 'vertex']
+        if(len(vertices) == 0):
+            return
+        # exact element offsets, elements declared before vertices are stepped over, elements after are not sized
+        self._element_offsets(vertices[-1], )
+        for d in vertices:
+            nm = d['type']
             c = d['count']
-            log("reading {} {} elements..".format(c, nm), 2)
-            a = np.fromfile(self._stream, dtype=dt, count=c, )
-            self.data[nm] = a
+            log("{} {} {} elements..".format("mapping" if self.mmap else "reading", c, nm), 2)
+            self.data[nm] = self.read_element(d, )
 
 
-class PlyPointCloudReader():
+class PlyPointCloudReader(PlyElementLayout):
     _supported_formats = ('binary_little_endian', 'binary_big_endian', 'ascii', )
     _supported_versions = ('1.0', )
     _byte_order = {'binary_little_endian': '<', 'binary_big_endian': '>', 'ascii': None, }
@@ -1059,12 +1165,18 @@ class PlyPointCloudReader():
         'string': 's',
     }
     
-    def __init__(self, path, ):
+    def __init__(self, path, mmap=False, ):
+        """
+        Args:
+            path: path to ply file
+            mmap: binary files only, points are read-only np.memmap view of vertex data in file instead of being read to memory, field selection and renaming are views as well
+        """
         log("{}:".format(self.__class__.__name__), 0)
         if(os.path.exists(path) is False or os.path.isdir(path) is True):
             raise OSError("did you point me to an imaginary file? ('{}')".format(path))
         
         self.path = path
+        self.mmap = mmap
         log("will read file at: '{}'".format(self.path), 1)
         log("reading header..", 1)
         self._header()
@@ -1075,22 +1187,8 @@ class PlyPointCloudReader():
             self._data_binary()
         log("loaded {} vertices".format(len(self.points)), 1)
         
-        # remove alpha if present (meshlab adds it)
-        self.points = self.points[[b for b in list(self.points.dtype.names) if b != 'alpha']]
-        
-        # rename diffuse_rgb to rgb, if present
-        user_rgb = ('diffuse_red', 'diffuse_green', 'diffuse_blue', )
-        names = self.points.dtype.names
-        ls = list(names)
-        if(set(user_rgb).issubset(names)):
-            for ci, uc in enumerate(user_rgb):
-                for i, v in enumerate(ls):
-                    if(v == uc):
-                        ls[i] = ls[i].replace('diffuse_', '', )
-        self.points.dtype.names = tuple(ls)
-        
-        # remove anything that is not (x, y, z, nx, ny, nz, red, green, blue) to prevent problems later
-        self.points = self.points[[b for b in list(self.points.dtype.names) if b in ('x', 'y', 'z', 'nx', 'ny', 'nz', 'red', 'green', 'blue', )]]
+        # rename diffuse_rgb to rgb, if present, and remove anything that is not (x, y, z, nx, ny, nz, red, green, blue) to prevent problems later (alpha added by meshlab for example)
+        self.points = self._select_fields(self.points)
         
         # some info
         nms = self.points.dtype.names
@@ -1109,6 +1207,30 @@ class PlyPointCloudReader():
         
         log("done.", 1)
     
+    @staticmethod
+    def _select_fields(points, ):
+        # single pass field selection and renaming, result is a view of points with dtype using original offsets, nothing is copied
+        names = points.dtype.names
+        user_rgb = ('diffuse_red', 'diffuse_green', 'diffuse_blue', )
+        rename = set(user_rgb).issubset(names)
+        keep = ('x', 'y', 'z', 'nx', 'ny', 'nz', 'red', 'green', 'blue', )
+        
+        ns = []
+        fs = []
+        offs = []
+        for n in names:
+            f, o = points.dtype.fields[n][:2]
+            if(rename and n in user_rgb):
+                n = n.replace('diffuse_', '', )
+            if(n not in keep):
+                continue
+            ns.append(n)
+            fs.append(f)
+            offs.append(o)
+        
+        dt = np.dtype({'names': ns, 'formats': fs, 'offsets': offs, 'itemsize': points.dtype.itemsize, })
+        return points.view(dt)
+    
     def _header(self):
         raw = []
         h = []
@@ -1166,65 +1288,138 @@ class PlyPointCloudReader():
             else:
                 log('unknown header line: {}'.format(l))
         
-        if(self._ply_format == 'ascii'):
-            skip = False
-            flen = 0
-            hlen = 0
-            with open(self.path, mode='r', encoding='utf-8') as f:
-                for i, l in enumerate(f):
-                    flen += 1
-                    if(skip):
-                        continue
-                    hlen += 1
-                    if(l.rstrip() == 'end_header'):
-                        skip = True
-            self._header_length = hlen
-            self._file_length = flen
-        else:
-            self._header_length = sum([len(i) for i in raw])
+        # header length in bytes, for ascii files as well, data is read from there in blocks
+        self._header_length = sum([len(i) for i in raw])
     
     def _data_binary(self):
         self.points = []
         
-        read_from = self._header_length
-        for ie, element in enumerate(self._elements):
-            if(element['type'] != 'vertex'):
-                continue
-            
-            dtp = []
-            for i, p in enumerate(element['props']):
-                n, t = p
-                dtp.append((n, '{}{}'.format(self._endianness, t), ))
-            dt = np.dtype(dtp)
-            with open(self.path, mode='rb') as f:
-                f.seek(read_from)
-                a = np.fromfile(f, dtype=dt, count=element['count'], )
-            
-            self.points = a
-            read_from += element['count']
-    
-    def _data_ascii(self):
+        vertices = [element for element in self._elements if element['type'] == 'vertex']
+        if(len(vertices)):
+            self._element_offsets(vertices[-1])
+        blocks = [self.read_element(element) for element in vertices]
+        if(len(blocks) == 0):
+            return
+        if(len(blocks) == 1):
+            self.points = blocks[0]
+            return
+        
+        # more vertex blocks, join them on properties they have in common
+        names = [n for n in blocks[0].dtype.names if all([n in b.dtype.names for b in blocks])]
+        a = np.empty(sum([len(b) for b in blocks]), dtype=[(n, blocks[0].dtype[n]) for n in names], )
+        i = 0
+        for b in blocks:
+            for n in names:
+                a[n][i:i + len(b)] = b[n]
+            i += len(b)
+        self.points = a
+    
+    def _data_ascii(self, block_size=2 ** 24, workers=2, ):
+        # file is read in large blocks cut at line ends, blocks are parsed in bulk by np.loadtxt in worker threads while next blocks are being read. parsing holds gil, so more than a couple of workers do not parse faster, they only keep more blocks in memory
         self.points = []
         
-        skip_header = self._header_length
-        skip_footer = self._file_length - self._header_length
-        for ie, element in enumerate(self._elements):
-            if(element['type'] != 'vertex'):
-                continue
-            
-            skip_footer = skip_footer - element['count']
-            with open(self.path, mode='r', encoding='utf-8') as f:
-                a = np.genfromtxt(f, dtype=np.dtype(element['props']), skip_header=skip_header, skip_footer=skip_footer, )
-            self.points = a
-            skip_header += element['count']
+        workers = max(1, min(workers, os.cpu_count() or 1, 4, ))
+        
+        # lines to skip before vertex element
+        skip = 0
+        element = None
+        for e in self._elements:
+            if(e['type'] == 'vertex'):
+                element = e
+                break
+            skip += e['count']
+        if(element is None):
+            return
+        
+        for p in element['props']:
+            if(len(p) != 2):
+                raise TypeError("list properties in vertex element are not supported in ascii ply files")
+        
+        count = element['count']
+        dt = np.dtype(element['props'])
+        n = len(element['props'])
+        points = np.empty(count, dtype=dt, )
+        
+        # blank lines are dropped before lines are counted, so counts match rows parsed by np.loadtxt
+        blank = re.compile(rb'^[ \t\r]*\n', re.M, )
+        
+        def parse(block, start, rows, ):
+            a = np.loadtxt(io.BytesIO(block), dtype=np.float64, comments=None, ndmin=2, )
+            a = a.reshape(-1, n)
+            if(len(a) != rows):
+                raise ValueError("ascii ply block at vertex {} has {} rows, expected {}".format(start, len(a), rows))
+            for i, name in enumerate(dt.names):
+                points[name][start:start + len(a)] = a[:, i]
+            return len(a)
+        
+        futures = []
+        parsed = 0
+        with ThreadPoolExecutor(max_workers=workers, ) as executor:
+            with open(self.path, mode='rb') as f:
+                f.seek(self._header_length)
+                rest = b''
+                lines = 0
+                while(lines < count):
+                    b = f.read(block_size)
+                    eof = (len(b) < block_size)
+                    b = rest + b
+                    if(not eof):
+                        # cut at last line end, remainder goes to next block
+                        i = b.rfind(b'\n') + 1
+                        b, rest = b[:i], b[i:]
+                    else:
+                        rest = b''
+                        if(len(b) and not b.endswith(b'\n')):
+                            b += b'\n'
+                    b = blank.sub(b'', b, )
+                    
+                    if(skip):
+                        # lines of elements before vertices
+                        c = b.count(b'\n')
+                        if(c <= skip):
+                            skip -= c
+                            b = b''
+                        else:
+                            i = -1
+                            for _ in range(skip):
+                                i = b.find(b'\n', i + 1)
+                            b = b[i + 1:]
+                            skip = 0
+                    
+                    c = b.count(b'\n')
+                    if(lines + c > count):
+                        # lines of elements after vertices
+                        i = -1
+                        for _ in range(count - lines):
+                            i = b.find(b'\n', i + 1)
+                        b = b[:i + 1]
+                        c = count - lines
+                    
+                    if(c):
+                        # limit blocks waiting in memory
+                        while(len(futures) >= workers * 2):
+                            parsed += futures.pop(0).result()
+                        futures.append(executor.submit(parse, b, lines, c, ))
+                        lines += c
+                    
+                    if(eof):
+                        break
+        
+        parsed += sum([f.result() for f in futures])
+        if(parsed != count):
+            raise ValueError("ascii ply file contains {} vertices, expected {}".format(parsed, count))
+        self.points = points
 
 
-class BinPlyPointCloudWriter():
-    """Save binary ply file from data numpy array
+class BinPlyPointCloudStreamWriter():
+    """Save binary ply file from chunks of data, for data larger than memory
+    
+    Header with final count is written upon opening, chunks are appended as they come and temp file is renamed to path on close. Use as context manager, if exception is raised, temp file is removed and path is left untouched.
     
     Args:
         path: path to ply file
-        points: strucured array of points as (x, y, z, nx, ny, nz, red, green, blue) (normals and colors are optional)
+        dtype: structured dtype of points as (x, y, z, nx, ny, nz, red, green, blue) (normals and colors are optional)
+        count: total number of points that will be written
     
     Attributes:
         path (str): real path to ply file
@@ -1235,56 +1430,364 @@ class BinPlyPointCloudWriter():
     _byte_order = {'little': 'binary_little_endian', 'big': 'binary_big_endian', }
     _comment = "created with Point Cloud Visualizer"
     
-    def __init__(self, path, points, ):
+    def __init__(self, path, dtype, count, ):
         log("{}:".format(self.__class__.__name__), 0)
         self.path = os.path.realpath(path)
+        # declare only named fields, padding of views from field selection is not part of the file
+        dt = np.dtype(dtype)
+        self.dtype = np.dtype([(n, dt[n]) for n in dt.names])
+        self.count = count
+        self.written = 0
         
-        # write
         log("will write to: {}".format(self.path), 1)
         # write to temp file first
         n = os.path.splitext(os.path.split(self.path)[1])[0]
         t = "{}.temp.ply".format(n)
-        p = os.path.join(os.path.dirname(self.path), t)
-        
-        l = len(points)
+        self._temp = os.path.join(os.path.dirname(self.path), t)
+        self._stream = open(self._temp, 'wb')
         
-        with open(p, 'wb') as f:
-            # write header
-            log("writing header..", 2)
-            dt = points.dtype
-            h = "ply\n"
-            # x should be a float of some kind, therefore we can get endianess
-            bo = dt['x'].byteorder
-            if(bo != '='):
-                # not native byteorder
-                if(bo == '>'):
-                    h += "format {} 1.0\n".format(self._byte_order['big'])
-                else:
-                    h += "format {} 1.0\n".format(self._byte_order['little'])
+        log("writing header..", 2)
+        self._stream.write(self._header().encode('ascii'))
+    
+    def _header(self):
+        dt = self.dtype
+        h = "ply\n"
+        # x should be a float of some kind, therefore we can get endianess
+        bo = dt['x'].byteorder
+        if(bo != '='):
+            # not native byteorder
+            if(bo == '>'):
+                h += "format {} 1.0\n".format(self._byte_order['big'])
             else:
-                # byteorder was native, use what sys.byteorder says..
-                h += "format {} 1.0\n".format(self._byte_order[sys.byteorder])
-            h += "element vertex {}\n".format(l)
-            # construct header from data names/types in points array
-            for n in dt.names:
-                t = self._types[dt[n].char]
-                h += "property {} {}\n".format(t, n)
-            h += "comment {}\n".format(self._comment)
-            h += "end_header\n"
-            f.write(h.encode('ascii'))
-            
-            # write data
-            log("writing data.. ({} points)".format(l), 2)
-            f.write(points.tobytes())
-        
-        # remove original file (if needed) and rename temp
-        if(os.path.exists(self.path)):
-            os.remove(self.path)
-        shutil.move(p, self.path)
+                h += "format {} 1.0\n".format(self._byte_order['little'])
+        else:
+            # byteorder was native, use what sys.byteorder says..
+            h += "format {} 1.0\n".format(self._byte_order[sys.byteorder])
+        h += "element vertex {}\n".format(self.count)
+        # construct header from data names/types in points array
+        for n in dt.names:
+            t = self._types[dt[n].char]
+            h += "property {} {}\n".format(t, n)
+        h += "comment {}\n".format(self._comment)
+        h += "end_header\n"
+        return h
+    
+    def write(self, points, ):
+        dt = points.dtype
+        if(dt.itemsize != self.dtype.itemsize or dt.fields != self.dtype.fields):
+            # e.g. padded view from field selection, pack it
+            a = np.empty(len(points), dtype=self.dtype, )
+            for n in self.dtype.names:
+                a[n] = points[n]
+            points = a
+        if(self.written + len(points) > self.count):
+            raise ValueError("writing more points than declared in header ({})".format(self.count))
+        log("writing data.. ({} points)".format(len(points)), 2)
+        self._stream.write(np.ascontiguousarray(points).tobytes())
+        self.written += len(points)
+    
+    def close(self):
+        self._stream.close()
+        if(self.written != self.count):
+            os.remove(self._temp)
+            raise ValueError("written {} points, but header declares {}".format(self.written, self.count))
+        # replace original file (if any) with temp in one step
+        os.replace(self._temp, self.path)
+        log("done.", 1)
+    
+    def abort(self):
+        self._stream.close()
+        if(os.path.exists(self._temp)):
+            os.remove(self._temp)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback, ):
+        if(exc_type is None):
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class BinPlyPointCloudWriter():
+    """Save binary ply file from data numpy array
+    
+    Args:
+        path: path to ply file
+        points: strucured array of points as (x, y, z, nx, ny, nz, red, green, blue) (normals and colors are optional)
+    
+    Attributes:
+        path (str): real path to ply file
+    
+    """
+    
+    def __init__(self, path, points, ):
+        log("{}:".format(self.__class__.__name__), 0)
+        with BinPlyPointCloudStreamWriter(path, points.dtype, len(points), ) as w:
+            w.write(points)
+        self.path = w.path
+
+
+class PCVCompactStreamWriter():
+    """Save compact binary point cloud file from chunks of data
+    
+    File layout is in pcvformat. Quantization needs bounding box upfront, positions are mapped to it. Sections are placed at offsets known from count, so each chunk is written to all sections at once. Use as context manager, if exception is raised, temp file is removed and path is left untouched.
+    
+    Args:
+        path: path to pcv file
+        count: total number of points that will be written
+        vmin: bounding box minimum (3, )
+        vmax: bounding box maximum (3, )
+        normals: normals will be written
+        colors: colors will be written
+    
+    Attributes:
+        path (str): real path to pcv file
+    
+    """
+    
+    def __init__(self, path, count, vmin, vmax, normals=False, colors=False, ):
+        log("{}:".format(self.__class__.__name__), 0)
+        self.path = os.path.realpath(path)
+        self.count = count
+        self.written = 0
+        self.normals = normals
+        self.colors = colors
+        
+        self.vmin, self.scale = pcvformat.bounds(vmin, vmax, )
+        
+        flags = 0
+        if(normals):
+            flags |= pcvformat.NORMALS
+        if(colors):
+            flags |= pcvformat.COLORS
+        
+        self._offsets = pcvformat.offsets(count, flags, )
+        
+        log("will write to: {}".format(self.path), 1)
+        n = os.path.splitext(os.path.split(self.path)[1])[0]
+        t = "{}.temp.pcv".format(n)
+        self._temp = os.path.join(os.path.dirname(self.path), t)
+        self._stream = open(self._temp, 'wb')
+        self._stream.write(pcvformat.pack_header(flags, count, self.vmin, self.scale, ))
+    
+    def write(self, vs, ns=None, cs=None, ):
+        """Write chunk of points, vs float (n, 3), ns float (n, 3), cs uint8 (n, 3) or float in 0.0-1.0 (n, 3+)"""
+        l = len(vs)
+        if(self.written + l > self.count):
+            raise ValueError("writing more points than declared in header ({})".format(self.count))
+        log("writing data.. ({} points)".format(l), 2)
+        f = self._stream
+        
+        f.seek(self._offsets[0] + self.written * 6)
+        f.write(pcvformat.quantize(vs, self.vmin, self.scale, ).tobytes())
+        if(self.normals):
+            f.seek(self._offsets[1] + self.written * 4)
+            f.write(pcvformat.oct_encode(ns).tobytes())
+        if(self.colors):
+            cs = np.asarray(cs)[:, :3]
+            if(cs.dtype != np.uint8):
+                cs = np.round(np.clip(cs, 0.0, 1.0, ) * 255).astype(np.uint8)
+            f.seek(self._offsets[2] + self.written * 3)
+            f.write(np.ascontiguousarray(cs).tobytes())
+        self.written += l
+    
+    def close(self):
+        self._stream.close()
+        if(self.written != self.count):
+            os.remove(self._temp)
+            raise ValueError("written {} points, but header declares {}".format(self.written, self.count))
+        # replace original file (if any) with temp in one step
+        os.replace(self._temp, self.path)
+        log("done.", 1)
+    
+    def abort(self):
+        self._stream.close()
+        if(os.path.exists(self._temp)):
+            os.remove(self._temp)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback, ):
+        if(exc_type is None):
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class PCVCompactWriter():
+    """Save point cloud to compact binary file
+    
+    Args:
+        path: path to pcv file
+        vs: float array of positions (n, 3)
+        ns: float array of normals (n, 3) or None
+        cs: colors (n, 3+), float in 0.0-1.0 or uint8, or None
+    
+    Attributes:
+        path (str): real path to pcv file
+    
+    """
+    
+    def __init__(self, path, vs, ns=None, cs=None, ):
+        log("{}:".format(self.__class__.__name__), 0)
+        vs = np.asarray(vs)
+        if(len(vs)):
+            vmin = vs.min(axis=0)
+            vmax = vs.max(axis=0)
+        else:
+            vmin = vmax = np.zeros(3)
+        with PCVCompactStreamWriter(path, len(vs), vmin, vmax, ns is not None, cs is not None, ) as w:
+            w.write(vs, ns, cs, )
+        self.path = w.path
+
+
+class PCVCompactReader():
+    """Read compact binary point cloud file, quantized data are kept as they are and decoded on request straight to arrays used for display
+    
+    Args:
+        path: path to pcv file
+        mmap: map quantized data instead of reading them to memory
+    
+    Attributes:
+        path (str): path to pcv file
+        count (int): number of points
+        has_normals (bool): normals are stored in file
+        has_colors (bool): colors are stored in file
+    
+    """
+    
+    def __init__(self, path, mmap=False, ):
+        log("{}:".format(self.__class__.__name__), 0)
+        if(os.path.exists(path) is False or os.path.isdir(path) is True):
+            raise OSError("did you point me to an imaginary file? ('{}')".format(path))
+        self.path = path
+        
+        with open(path, 'rb') as f:
+            flags, l, self.vmin, self.scale = pcvformat.unpack_header(f.read(pcvformat.HEADER.size))
+        
+        self.count = l
+        self.has_normals = bool(flags & pcvformat.NORMALS)
+        self.has_colors = bool(flags & pcvformat.COLORS)
+        
+        o = pcvformat.HEADER.size
+        blocks = [('q', '<u2', 3, ), ]
+        if(self.has_normals):
+            blocks.append(('n', '<u2', 2, ))
+        if(self.has_colors):
+            blocks.append(('c', 'u1', 3, ))
         
+        self.data = {}
+        for n, t, k in blocks:
+            if(mmap):
+                a = np.memmap(path, dtype=t, mode='r', offset=o, shape=(l, k, ), )
+            else:
+                with open(path, 'rb') as f:
+                    f.seek(o)
+                    a = np.fromfile(f, dtype=t, count=l * k, ).reshape(l, k)
+            self.data[n] = a
+            o += l * k * np.dtype(t).itemsize
+        
+        log("loaded {} points".format(l), 1)
+    
+    def vertices(self, ):
+        # decoded in float32 straight to the output array, no float64 intermediate of the whole cloud
+        return pcvformat.dequantize(self.data['q'], self.vmin, self.scale, )
+    
+    def normals(self, ):
+        if(not self.has_normals):
+            return None
+        return pcvformat.oct_decode(self.data['n'])
+    
+    def colors(self, ):
+        # float32 rgba as used for display, alpha is always 1.0
+        if(not self.has_colors):
+            return None
+        cs = np.ones((self.count, 4), dtype=np.float32, )
+        cs[:, :3] = self.data['c'] * np.float32(1 / 255)
+        return cs
+    
+    @property
+    def points(self):
+        # structured array as from PlyPointCloudReader
+        dt = [('x', '<f4', ), ('y', '<f4', ), ('z', '<f4', ), ]
+        if(self.has_normals):
+            dt += [('nx', '<f4', ), ('ny', '<f4', ), ('nz', '<f4', ), ]
+        if(self.has_colors):
+            dt += [('red', 'u1', ), ('green', 'u1', ), ('blue', 'u1', ), ]
+        a = np.empty(self.count, dtype=dt, )
+        vs = self.vertices()
+        a['x'] = vs[:, 0]
+        a['y'] = vs[:, 1]
+        a['z'] = vs[:, 2]
+        if(self.has_normals):
+            ns = self.normals()
+            a['nx'] = ns[:, 0]
+            a['ny'] = ns[:, 1]
+            a['nz'] = ns[:, 2]
+        if(self.has_colors):
+            c = self.data['c']
+            a['red'] = c[:, 0]
+            a['green'] = c[:, 1]
+            a['blue'] = c[:, 2]
+        return a
+
+
+def read_points(path, mmap=False, ):
+    # structured array of points from ply or pcv file
+    if(path.lower().endswith('.pcv')):
+        return PCVCompactReader(path, mmap=mmap, ).points
+    return PlyPointCloudReader(path, mmap=mmap, ).points
+
+
+class PNGWriter():
+    """Save 8bit RGBA png file from numpy array, encoder is shared with headless renderer (pngfile), file is written to temp file and replaces path when complete
+    
+    Args:
+        path: path to png file
+        pixels: uint8 array of shape (height, width, 4)
+        compress_level: zlib compression level 0-9
+        flip: rows are bottom to top (as read from framebuffer), flip them
+    
+    Attributes:
+        path (str): real path to png file
+    
+    """
+    
+    def __init__(self, path, pixels, compress_level=6, flip=True, ):
+        log("{}:".format(self.__class__.__name__), 0)
+        self.path = os.path.realpath(path)
+        pngfile.write_png(self.path, pixels, compress_level, flip, )
         log("done.", 1)
 
 
+class PNGWriterPool(pngfile.PNGWriterPool):
+    """Write png files in background threads
+    
+    Render loop hands off pixels and continues, at most max_in_flight frames are waiting for encoding, submit blocks when backlog is full. zlib releases gil while compressing, so threads are enough. Failed frames are collected in errors.
+    
+    Args:
+        workers: number of writer threads
+        max_in_flight: maximum number of submitted and not yet written frames
+    
+    Attributes:
+        active (PNGWriterPool): pool used by render operator, if None images are written synchronously
+    
+    """
+    
+    active = None
+    
+    def report(self, path, error, ):
+        if(error is None):
+            log("image '{}' saved".format(path))
+        else:
+            log("error: {}".format(error))
+
+
 class PCVShaders():
     vertex_shader_illumination = '''
         in vec3 position;
@@ -1303,6 +1806,7 @@ class PCVShaders():
         uniform float point_size;
         uniform float alpha_radius;
         uniform float global_alpha;
+        uniform int display_length;
         
         out vec4 f_color;
         out float f_alpha_radius;
@@ -1318,6 +1822,9 @@ class PCVShaders():
         void main()
         {
             gl_Position = perspective_matrix * object_matrix * vec4(position, 1.0f);
+            if(gl_VertexID >= display_length){
+                gl_Position = vec4(2.0, 0.0, 0.0, 1.0);
+            }
             gl_PointSize = point_size;
             f_normal = normal;
             // f_color = color;
@@ -1389,11 +1896,15 @@ class PCVShaders():
         uniform float point_size;
         uniform float alpha_radius;
         uniform float global_alpha;
+        uniform int display_length;
         out vec4 f_color;
         out float f_alpha_radius;
         void main()
         {
             gl_Position = perspective_matrix * object_matrix * vec4(position, 1.0f);
+            if(gl_VertexID >= display_length){
+                gl_Position = vec4(2.0, 0.0, 0.0, 1.0);
+            }
             gl_PointSize = point_size;
             // f_color = color;
             f_color = vec4(color[0], color[1], color[2], global_alpha);
@@ -2823,6 +3334,108 @@ class PCVShaders():
     '''
 
 
+class PCVShaderRegistry():
+    """Process wide registry of compiled shaders, each program is compiled once and the same GPUShader is returned for the same sources. Uniforms are set before each draw, so shaders are safely shared between cache items."""
+    shaders = {}
+    hits = 0
+    misses = 0
+    
+    @classmethod
+    def get(cls, vertexcode, fragcode, geocode=None, ):
+        k = (vertexcode, fragcode, geocode, )
+        shader = cls.shaders.get(k)
+        if(shader is not None):
+            cls.hits += 1
+            return shader
+        cls.misses += 1
+        if(geocode is None):
+            shader = GPUShader(vertexcode, fragcode, )
+        else:
+            shader = GPUShader(vertexcode, fragcode, geocode=geocode, )
+        cls.shaders[k] = shader
+        return shader
+    
+    @classmethod
+    def clear(cls):
+        cls.shaders = {}
+        cls.hits = 0
+        cls.misses = 0
+
+
+class PCVVertexBuffers():
+    """Point cloud kept on GPU, each attribute (position, color, normal) is uploaded once to its own vertex buffer
+    
+    Cloud is split to blocks, each block has own buffers and batch with all attributes, so the same batch is drawn with simple and illumination shader. Display length is a draw range, blocks past it are not drawn and the last one is cut in vertex shader with 'display_length' uniform. Updates re-upload only blocks of attributes where data differ.
+    
+    Args:
+        vs: float32 positions (n, 3)
+        ns: float32 normals (n, 3)
+        cs: float32 colors (n, 4)
+        block_size: number of points in block
+    
+    """
+    
+    attributes = (('position', 3, ), ('color', 4, ), ('normal', 3, ), )
+    block_size = 2 ** 20
+    
+    def __init__(self, vs, ns, cs, block_size=None, ):
+        if(block_size is not None):
+            self.block_size = block_size
+        self.length = len(vs)
+        self.uploaded = 0
+        self.formats = {}
+        for n, k in self.attributes:
+            f = GPUVertFormat()
+            f.attr_add(id=n, comp_type='F32', len=k, fetch_mode='FLOAT', )
+            self.formats[n] = f
+        
+        self.blocks = []
+        for a in range(0, self.length, self.block_size):
+            self.blocks.append({'start': a, 'end': min(a + self.block_size, self.length), 'buffers': {}, 'batch': None, })
+        for n, d in zip(('position', 'color', 'normal', ), (vs, cs, ns, )):
+            for b in self.blocks:
+                self._upload(b, n, d, )
+    
+    def _upload(self, block, name, data, ):
+        a = block['start']
+        b = block['end']
+        vbo = GPUVertBuf(self.formats[name], b - a, )
+        vbo.attr_fill(id=name, data=np.ascontiguousarray(data[a:b], dtype=np.float32, ), )
+        block['buffers'][name] = vbo
+        # batch only references buffers, rebuild is cheap and happens on next draw
+        block['batch'] = None
+        self.uploaded += b - a
+    
+    def update(self, vs, ns, cs, old=None, ):
+        """Upload changed data of the same length, if old (vs, ns, cs) arrays are given, only blocks where they differ are uploaded. Returns number of uploaded blocks."""
+        if(old is None):
+            old = (None, None, None, )
+        n = 0
+        for name, d, o in zip(('position', 'color', 'normal', ), (vs, cs, ns, ), (old[0], old[2], old[1], )):
+            for b in self.blocks:
+                a = b['start']
+                e = b['end']
+                # same array might have been edited in place, then it can't be compared, lists (e.g. empty sequence frames) are always uploaded
+                if(isinstance(o, np.ndarray) and isinstance(d, np.ndarray) and o is not d and o.shape == d.shape and np.array_equal(o[a:e], d[a:e])):
+                    continue
+                self._upload(b, name, d, )
+                n += 1
+        return n
+    
+    def draw(self, shader, length, ):
+        """Draw first length points with bound shader"""
+        for b in self.blocks:
+            if(b['start'] >= length):
+                break
+            if(b['batch'] is None):
+                batch = GPUBatch(type='POINTS', buf=b['buffers']['position'], )
+                batch.vertbuf_add(b['buffers']['color'])
+                batch.vertbuf_add(b['buffers']['normal'])
+                b['batch'] = batch
+            shader.uniform_int("display_length", length - b['start'])
+            b['batch'].draw(shader)
+
+
 class PCVManager():
     cache = {}
     handle = None
@@ -2852,11 +3465,13 @@ class PCVManager():
         log('load data..')
         _t = time.time()
         
-        # FIXME ply loading might not work with all ply files, for example, file spec seems does not forbid having two or more blocks of vertices with different props, currently i load only first block of vertices. maybe construct some messed up ply and test how for example meshlab behaves
+        # NOTE binary ply files with more blocks of vertices are joined on properties all blocks have, ascii files load only first block of vertices
         points = []
         try:
             # points = BinPlyPointCloudReader(filepath).points
-            points = PlyPointCloudReader(filepath).points
+            preferences = bpy.context.preferences
+            addon_prefs = preferences.addons[__name__].preferences
+            points = read_points(filepath, mmap=addon_prefs.mmap_ply, )
         except Exception as e:
             if(operator is not None):
                 operator.report({'ERROR'}, str(e))
@@ -2874,8 +3489,13 @@ class PCVManager():
         
         preferences = bpy.context.preferences
         addon_prefs = preferences.addons[__name__].preferences
+        order = None
         if(addon_prefs.shuffle_points):
-            np.random.shuffle(points)
+            if(isinstance(points, np.memmap)):
+                # read-only mapping stays as it is, permutation is applied to display arrays built from it below, shuffled copy of all points would be loaded to memory
+                order = np.random.permutation(len(points))
+            else:
+                np.random.shuffle(points)
         
         _d = datetime.timedelta(seconds=time.time() - _t)
         log("completed in {}.".format(_d))
@@ -2945,6 +3565,11 @@ class PCVManager():
                                   np.full(n, col[2], dtype=np.float32, ),
                                   np.ones(n, dtype=np.float32, ), ))
         
+        if(order is not None):
+            vs = vs[order]
+            ns = ns[order]
+            cs = cs[order]
+        
         u = str(uuid.uuid1())
         o = context.object
         
@@ -2972,14 +3597,12 @@ class PCVManager():
         ienabled = pcv.illumination
         d['illumination'] = ienabled
         if(ienabled):
-            shader = GPUShader(PCVShaders.vertex_shader_illumination, PCVShaders.fragment_shader_illumination)
-            batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], "normal": ns[:l], })
+            shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_illumination, PCVShaders.fragment_shader_illumination)
         else:
-            shader = GPUShader(PCVShaders.vertex_shader_simple, PCVShaders.fragment_shader_simple)
-            batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], })
+            shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_simple, PCVShaders.fragment_shader_simple)
         
         d['shader'] = shader
-        d['batch'] = batch
+        d['buffers'] = PCVVertexBuffers(vs, ns, cs, )
         d['ready'] = True
         d['object'] = o
         d['name'] = o.name
@@ -3005,24 +3628,15 @@ class PCVManager():
         bgl.glEnable(bgl.GL_DEPTH_TEST)
         bgl.glEnable(bgl.GL_BLEND)
         
-        # TODO: replace all 'batch_for_shader' (2.80/scripts/modules/gpu_extras/batch.py) calls with something custom made and keep buffer cached. faster shader switching, less memory used, etc..
+        # TODO: replace all 'batch_for_shader' (2.80/scripts/modules/gpu_extras/batch.py) calls with something custom made and keep buffer cached. faster shader switching, less memory used, etc.. (done for default shader, see PCVVertexBuffers, extra shaders are still using it)
         
         ci = PCVManager.cache[uuid]
         
         shader = ci['shader']
-        batch = ci['batch']
+        buffers = ci['buffers']
         
-        if(ci['current_display_length'] != ci['display_length']):
-            l = ci['display_length']
-            ci['current_display_length'] = l
-            vs = ci['vertices']
-            cs = ci['colors']
-            ns = ci['normals']
-            if(ci['illumination']):
-                batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], "normal": ns[:l], })
-            else:
-                batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], })
-            ci['batch'] = batch
+        # display length is just a draw range of uploaded buffers
+        ci['current_display_length'] = ci['display_length']
         
         o = ci['object']
         try:
@@ -3054,20 +3668,14 @@ class PCVManager():
             return
         
         if(ci['illumination'] != pcv.illumination):
-            vs = ci['vertices']
-            cs = ci['colors']
-            ns = ci['normals']
-            l = ci['current_display_length']
+            # buffers contain all attributes, only shader is swapped
             if(pcv.illumination):
-                shader = GPUShader(PCVShaders.vertex_shader_illumination, PCVShaders.fragment_shader_illumination)
-                batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], "normal": ns[:l], })
+                shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_illumination, PCVShaders.fragment_shader_illumination)
                 ci['illumination'] = True
             else:
-                shader = GPUShader(PCVShaders.vertex_shader_simple, PCVShaders.fragment_shader_simple)
-                batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], })
+                shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_simple, PCVShaders.fragment_shader_simple)
                 ci['illumination'] = False
             ci['shader'] = shader
-            ci['batch'] = batch
         
         shader.bind()
         pm = bpy.context.region_data.perspective_matrix
@@ -3114,7 +3722,7 @@ class PCVManager():
         
         if(not pcv.override_default_shader):
             # NOTE: just don't draw default shader, quick and easy solution, other shader will be drawn instead, would better to not create it..
-            batch.draw(shader)
+            buffers.draw(shader, ci['current_display_length'], )
             
             # # remove extra if present, will be recreated if needed and if left stored it might cause problems
             # if('extra' in ci.keys()):
@@ -3126,7 +3734,7 @@ class PCVManager():
                 vs = ci['vertices'][:l]
                 ns = ci['normals'][:l]
                 
-                shader = GPUShader(PCVShaders.normals_vertex_shader, PCVShaders.normals_fragment_shader, geocode=PCVShaders.normals_geometry_shader, )
+                shader = PCVShaderRegistry.get(PCVShaders.normals_vertex_shader, PCVShaders.normals_fragment_shader, geocode=PCVShaders.normals_geometry_shader, )
                 batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "normal": ns[:l], }, )
                 
                 d = {'shader': shader,
@@ -3188,13 +3796,13 @@ class PCVManager():
             
             if(not use_stored):
                 if(pcv.illumination):
-                    shader = GPUShader(PCVShaders.depth_vertex_shader_illumination, PCVShaders.depth_fragment_shader_illumination, )
+                    shader = PCVShaderRegistry.get(PCVShaders.depth_vertex_shader_illumination, PCVShaders.depth_fragment_shader_illumination, )
                     batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "normal": ns[:l], })
                 elif(pcv.dev_depth_false_colors):
-                    shader = GPUShader(PCVShaders.depth_vertex_shader_false_colors, PCVShaders.depth_fragment_shader_false_colors, )
+                    shader = PCVShaderRegistry.get(PCVShaders.depth_vertex_shader_false_colors, PCVShaders.depth_fragment_shader_false_colors, )
                     batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], })
                 else:
-                    shader = GPUShader(PCVShaders.depth_vertex_shader_simple, PCVShaders.depth_fragment_shader_simple, )
+                    shader = PCVShaderRegistry.get(PCVShaders.depth_vertex_shader_simple, PCVShaders.depth_fragment_shader_simple, )
                     batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], })
                 
                 if('extra' not in ci.keys()):
@@ -3287,7 +3895,7 @@ class PCVManager():
                             break
             
             if(not use_stored):
-                shader = GPUShader(PCVShaders.normal_colors_vertex_shader, PCVShaders.normal_colors_fragment_shader, )
+                shader = PCVShaderRegistry.get(PCVShaders.normal_colors_vertex_shader, PCVShaders.normal_colors_fragment_shader, )
                 batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "normal": ns[:l], })
                 
                 if('extra' not in ci.keys()):
@@ -3325,7 +3933,7 @@ class PCVManager():
                             break
             
             if(not use_stored):
-                shader = GPUShader(PCVShaders.position_colors_vertex_shader, PCVShaders.position_colors_fragment_shader, )
+                shader = PCVShaderRegistry.get(PCVShaders.position_colors_vertex_shader, PCVShaders.position_colors_fragment_shader, )
                 batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], })
                 
                 if('extra' not in ci.keys()):
@@ -3349,7 +3957,7 @@ class PCVManager():
         if(pcv.dev_selection_shader_display):
             vs = ci['vertices']
             l = ci['current_display_length']
-            shader = GPUShader(PCVShaders.selection_vertex_shader, PCVShaders.selection_fragment_shader, )
+            shader = PCVShaderRegistry.get(PCVShaders.selection_vertex_shader, PCVShaders.selection_fragment_shader, )
             batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], })
             shader.bind()
             pm = bpy.context.region_data.perspective_matrix
@@ -3378,7 +3986,7 @@ class PCVManager():
                             break
             
             if(not use_stored):
-                shader = GPUShader(PCVShaders.vertex_shader_color_adjustment, PCVShaders.fragment_shader_color_adjustment, )
+                shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_color_adjustment, PCVShaders.fragment_shader_color_adjustment, )
                 batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], })
                 
                 if('extra' not in ci.keys()):
@@ -3422,7 +4030,7 @@ class PCVManager():
                         break
             
             if(not use_stored):
-                shader = GPUShader(PCVShaders.bbox_vertex_shader, PCVShaders.bbox_fragment_shader, geocode=PCVShaders.bbox_geometry_shader, )
+                shader = PCVShaderRegistry.get(PCVShaders.bbox_vertex_shader, PCVShaders.bbox_fragment_shader, geocode=PCVShaders.bbox_geometry_shader, )
                 batch = batch_for_shader(shader, 'POINTS', {"position": [(0.0, 0.0, 0.0, )], }, )
                 
                 if('extra' not in ci.keys()):
@@ -3503,7 +4111,7 @@ class PCVManager():
                             break
             
             if(not use_stored):
-                shader = GPUShader(PCVShaders.vertex_shader_minimal, PCVShaders.fragment_shader_minimal, )
+                shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_minimal, PCVShaders.fragment_shader_minimal, )
                 batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], })
                 
                 if('extra' not in ci.keys()):
@@ -3559,7 +4167,7 @@ class PCVManager():
                             sizesf = ci['extra'][k]['sizesf']
                             break
                 
-                shader = GPUShader(PCVShaders.vertex_shader_minimal_variable_size, PCVShaders.fragment_shader_minimal_variable_size, )
+                shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_minimal_variable_size, PCVShaders.fragment_shader_minimal_variable_size, )
                 batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], "size": sizes[:l], })
                 # batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], })
                 
@@ -3618,7 +4226,7 @@ class PCVManager():
                             sizesf = ci['extra'][k]['sizesf']
                             break
                 
-                shader = GPUShader(PCVShaders.vertex_shader_minimal_variable_size_and_depth, PCVShaders.fragment_shader_minimal_variable_size_and_depth, )
+                shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_minimal_variable_size_and_depth, PCVShaders.fragment_shader_minimal_variable_size_and_depth, )
                 batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], "size": sizes[:l], })
                 
                 if('extra' not in ci.keys()):
@@ -3681,7 +4289,7 @@ class PCVManager():
                             break
             
             if(not use_stored):
-                shader = GPUShader(PCVShaders.billboard_vertex, PCVShaders.billboard_fragment, geocode=PCVShaders.billboard_geometry, )
+                shader = PCVShaderRegistry.get(PCVShaders.billboard_vertex, PCVShaders.billboard_fragment, geocode=PCVShaders.billboard_geometry, )
                 # shader = GPUShader(PCVShaders.billboard_vertex, PCVShaders.billboard_fragment, geocode=PCVShaders.billboard_geometry_disc, )
                 batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], })
                 
@@ -3738,7 +4346,7 @@ class PCVManager():
                             sizesf = ci['extra'][k]['sizesf']
                             break
                 
-                shader = GPUShader(PCVShaders.billboard_vertex_with_depth_and_size, PCVShaders.billboard_fragment_with_depth_and_size, geocode=PCVShaders.billboard_geometry_with_depth_and_size, )
+                shader = PCVShaderRegistry.get(PCVShaders.billboard_vertex_with_depth_and_size, PCVShaders.billboard_fragment_with_depth_and_size, geocode=PCVShaders.billboard_geometry_with_depth_and_size, )
                 batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], "sizef": sizesf[:l], })
                 
                 if('extra' not in ci.keys()):
@@ -3823,7 +4431,7 @@ class PCVManager():
                             sizesf = ci['extra'][k]['sizesf']
                             break
                 
-                shader = GPUShader(PCVShaders.billboard_vertex_with_no_depth_and_size, PCVShaders.billboard_fragment_with_no_depth_and_size, geocode=PCVShaders.billboard_geometry_with_no_depth_and_size, )
+                shader = PCVShaderRegistry.get(PCVShaders.billboard_vertex_with_no_depth_and_size, PCVShaders.billboard_fragment_with_no_depth_and_size, geocode=PCVShaders.billboard_geometry_with_no_depth_and_size, )
                 batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], "sizef": sizesf[:l], })
                 
                 if('extra' not in ci.keys()):
@@ -3863,7 +4471,7 @@ class PCVManager():
                             break
             
             if(not use_stored):
-                shader = GPUShader(PCVShaders.phong_vs, PCVShaders.phong_fs, )
+                shader = PCVShaderRegistry.get(PCVShaders.phong_vs, PCVShaders.phong_fs, )
                 batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "normal": ns[:l], "color": cs[:l], })
                 
                 if('extra' not in ci.keys()):
@@ -3918,7 +4526,7 @@ class PCVManager():
                             break
             
             if(not use_stored):
-                shader = GPUShader(PCVShaders.vertex_shader_simple_clip, PCVShaders.fragment_shader_simple_clip, )
+                shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_simple_clip, PCVShaders.fragment_shader_simple_clip, )
                 batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], })
                 
                 if('extra' not in ci.keys()):
@@ -3996,7 +4604,7 @@ class PCVManager():
                 use_geocode = PCVShaders.billboard_phong_fast_gs
                 if(pcv.billboard_phong_circles):
                     use_geocode = PCVShaders.billboard_phong_circles_gs
-                shader = GPUShader(PCVShaders.billboard_phong_vs, PCVShaders.billboard_phong_fs, geocode=use_geocode, )
+                shader = PCVShaderRegistry.get(PCVShaders.billboard_phong_vs, PCVShaders.billboard_phong_fs, geocode=use_geocode, )
                 batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "normal": ns[:l], "color": cs[:l], })
                 
                 if('extra' not in ci.keys()):
@@ -4049,7 +4657,7 @@ class PCVManager():
                 indices = np.indices((len(vs), ), dtype=np.int, )
                 indices.shape = (-1, )
                 
-                shader = GPUShader(PCVShaders.vertex_shader_simple_skip_point_vertices, PCVShaders.fragment_shader_simple_skip_point_vertices, )
+                shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_simple_skip_point_vertices, PCVShaders.fragment_shader_simple_skip_point_vertices, )
                 batch = batch_for_shader(shader, 'POINTS', {"position": vs[:], "color": cs[:], "index": indices[:], })
                 
                 if('extra' not in ci.keys()):
@@ -4090,7 +4698,7 @@ class PCVManager():
                 pcv.filter_remove_color_selection = False
                 del ci['selection_indexes']
             
-            shader = GPUShader(PCVShaders.selection_vertex_shader, PCVShaders.selection_fragment_shader, )
+            shader = PCVShaderRegistry.get(PCVShaders.selection_vertex_shader, PCVShaders.selection_fragment_shader, )
             batch = batch_for_shader(shader, 'POINTS', {"position": vs[:], })
             shader.bind()
             pm = bpy.context.region_data.perspective_matrix
@@ -4122,7 +4730,13 @@ class PCVManager():
             cls.gc()
     
     @classmethod
-    def update(cls, uuid, vs, ns=None, cs=None, ):
+    def default_color(cls, ):
+        # default vertex color from preferences, gamma corrected as displayed
+        col = bpy.context.preferences.addons[__name__].preferences.default_vertex_color[:]
+        return tuple([c ** (1 / 2.2) for c in col]) + (1.0, )
+    
+    @classmethod
+    def update(cls, uuid, vs, ns=None, cs=None, partial=True, ):
         if(uuid not in PCVManager.cache):
             raise KeyError("uuid '{}' not in cache".format(uuid))
         # if(len(vs) == 0):
@@ -4138,13 +4752,14 @@ class PCVManager():
                                   np.full(l, 1.0, dtype=np.float32, ), ))
         
         if(cs is None):
-            col = bpy.context.preferences.addons[__name__].preferences.default_vertex_color[:]
-            col = tuple([c ** (1 / 2.2) for c in col]) + (1.0, )
+            col = cls.default_color()
             cs = np.column_stack((np.full(l, col[0], dtype=np.float32, ),
                                   np.full(l, col[1], dtype=np.float32, ),
                                   np.full(l, col[2], dtype=np.float32, ),
                                   np.ones(l, dtype=np.float32, ), ))
         
+        old = (c['vertices'], c['normals'], c['colors'], )
+        
         # store data
         c['vertices'] = vs
         c['normals'] = ns
@@ -4161,16 +4776,22 @@ class PCVManager():
         c['display_length'] = nl
         c['current_display_length'] = nl
         
-        # setup new shaders
+        # shader matches illumination state (render swaps it when changed), compile only if there is none yet, then only vertex buffers are uploaded
         ienabled = c['illumination']
-        if(ienabled):
-            shader = GPUShader(PCVShaders.vertex_shader_illumination, PCVShaders.fragment_shader_illumination)
-            batch = batch_for_shader(shader, 'POINTS', {"position": vs[:nl], "color": cs[:nl], "normal": ns[:nl], })
-        else:
-            shader = GPUShader(PCVShaders.vertex_shader_simple, PCVShaders.fragment_shader_simple)
-            batch = batch_for_shader(shader, 'POINTS', {"position": vs[:nl], "color": cs[:nl], })
+        shader = c['shader']
+        if(not shader):
+            if(ienabled):
+                shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_illumination, PCVShaders.fragment_shader_illumination)
+            else:
+                shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_simple, PCVShaders.fragment_shader_simple)
         c['shader'] = shader
-        c['batch'] = batch
+        
+        buffers = c.get('buffers')
+        if(buffers is not None and buffers.length == l):
+            # same length, re-upload only blocks that changed (unless told otherwise)
+            buffers.update(vs, ns, cs, old if partial else None, )
+        else:
+            c['buffers'] = PCVVertexBuffers(vs, ns, cs, )
         
         # redraw all viewports
         for area in bpy.context.screen.areas:
@@ -4201,6 +4822,8 @@ class PCVManager():
         for k, v in cls.cache.items():
             v['kill'] = True
         cls.gc()
+        # render depth orders reference vertex arrays
+        PCV_OT_render.depth_order_cache.clear()
         
         bpy.types.SpaceView3D.draw_handler_remove(cls.handle, 'WINDOW')
         cls.handle = None
@@ -4223,7 +4846,7 @@ class PCVManager():
                 'current_display_length': None,
                 'illumination': False,
                 'shader': False,
-                'batch': False,
+                'buffers': None,
                 'ready': False,
                 'draw': False,
                 'kill': False,
@@ -4377,13 +5000,11 @@ class PCVControl():
         d['current_display_length'] = l
         d['illumination'] = pcv.illumination
         if(pcv.illumination):
-            shader = GPUShader(PCVShaders.vertex_shader_illumination, PCVShaders.fragment_shader_illumination)
-            batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], "normal": ns[:l], })
+            shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_illumination, PCVShaders.fragment_shader_illumination)
         else:
-            shader = GPUShader(PCVShaders.vertex_shader_simple, PCVShaders.fragment_shader_simple)
-            batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], })
+            shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_simple, PCVShaders.fragment_shader_simple)
         d['shader'] = shader
-        d['batch'] = batch
+        d['buffers'] = PCVVertexBuffers(vs, ns, cs, )
         d['ready'] = True
         d['draw'] = False
         d['kill'] = False
@@ -4438,13 +5059,11 @@ class PCVControl():
         d['current_display_length'] = l
         d['illumination'] = pcv.illumination
         if(pcv.illumination):
-            shader = GPUShader(PCVShaders.vertex_shader_illumination, PCVShaders.fragment_shader_illumination)
-            batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], "normal": ns[:l], })
+            shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_illumination, PCVShaders.fragment_shader_illumination)
         else:
-            shader = GPUShader(PCVShaders.vertex_shader_simple, PCVShaders.fragment_shader_simple)
-            batch = batch_for_shader(shader, 'POINTS', {"position": vs[:l], "color": cs[:l], })
+            shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_simple, PCVShaders.fragment_shader_simple)
         d['shader'] = shader
-        d['batch'] = batch
+        d['buffers'] = PCVVertexBuffers(vs, ns, cs, )
         
         pcv.has_normals = has_normals
         pcv.has_vcols = has_colors
@@ -4501,6 +5120,143 @@ class PCVControl():
         self._redraw()
 
 
+class PCVSequenceFrameCache():
+    """Sequence frames loaded on demand, decoded frames are kept in LRU bounded by memory budget, upcoming frames are loaded in background thread
+    
+    Frames are decoded to contiguous float32 arrays with default normals and colors filled in, ready to be uploaded to vertex buffers, so frame change handler does not do any conversion on main thread.
+    
+    Args:
+        items: list of sequence items as {'index', 'name', 'path'}
+        budget: memory budget in bytes
+        prefetch: number of frames loaded ahead in playback direction
+        default_color: rgba used for frames without colors
+    
+    """
+    
+    def __init__(self, items, budget, prefetch, default_color=(1.0, 1.0, 1.0, 1.0, ), ):
+        self.items = items
+        self.default_color = default_color
+        self.budget = budget
+        self.prefetch = prefetch
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._frames = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, )
+        self._closed = False
+    
+    def __len__(self):
+        return len(self._frames)
+    
+    @staticmethod
+    def load(path, ):
+        # vs, ns, cs as float32 arrays, ns and cs are None if not in file
+        if(path.lower().endswith('.pcv')):
+            r = PCVCompactReader(path)
+            return r.vertices(), r.normals(), r.colors()
+        
+        points = PlyPointCloudReader(path).points
+        if(len(points) == 0):
+            raise ValueError("No vertices loaded from file at {}".format(path))
+        if(not set(('x', 'y', 'z')).issubset(points.dtype.names)):
+            raise ValueError("Loaded data seems to miss vertex locations.")
+        
+        l = len(points)
+        vs = np.empty((l, 3), dtype=np.float32, )
+        vs[:, 0] = points['x']
+        vs[:, 1] = points['y']
+        vs[:, 2] = points['z']
+        ns = None
+        if(set(('nx', 'ny', 'nz')).issubset(points.dtype.names)):
+            ns = np.empty((l, 3), dtype=np.float32, )
+            ns[:, 0] = points['nx']
+            ns[:, 1] = points['ny']
+            ns[:, 2] = points['nz']
+        cs = None
+        if(set(('red', 'green', 'blue')).issubset(points.dtype.names)):
+            cs = np.ones((l, 4), dtype=np.float32, )
+            cs[:, 0] = points['red']
+            cs[:, 1] = points['green']
+            cs[:, 2] = points['blue']
+            cs[:, :3] *= np.float32(1 / 255)
+        return vs, ns, cs
+    
+    def decode(self, i, ):
+        """Load frame at position i as (vs, ns, cs) float32 arrays ready for upload"""
+        vs, ns, cs = self.load(self.items[i]['path'])
+        l = len(vs)
+        vs = np.ascontiguousarray(vs, dtype=np.float32, )
+        if(ns is None):
+            ns = np.zeros((l, 3), dtype=np.float32, )
+            ns[:, 2] = 1.0
+        else:
+            ns = np.ascontiguousarray(ns, dtype=np.float32, )
+        if(cs is None):
+            cs = np.empty((l, 4), dtype=np.float32, )
+            cs[:] = self.default_color
+        else:
+            cs = np.ascontiguousarray(cs, dtype=np.float32, )
+        return vs, ns, cs
+    
+    def _store(self, i, data, ):
+        n = sum([a.nbytes for a in data if a is not None])
+        with self._lock:
+            if(self._closed):
+                return data
+            if(i in self._frames):
+                return self._frames[i]
+            self._frames[i] = data
+            self.nbytes += n
+            # evict least recently used, but always keep the frame just stored
+            while(self.nbytes > self.budget and len(self._frames) > 1):
+                _, d = self._frames.popitem(last=False)
+                self.nbytes -= sum([a.nbytes for a in d if a is not None])
+        return data
+    
+    def _job(self, i, ):
+        try:
+            return self._store(i, self.decode(i), )
+        finally:
+            with self._lock:
+                self._pending.pop(i, None)
+    
+    def get(self, i, ):
+        """Decoded frame at position i as (vs, ns, cs), waits for background load if frame is being prefetched"""
+        with self._lock:
+            if(i in self._frames):
+                self._frames.move_to_end(i)
+                self.hits += 1
+                return self._frames[i]
+            f = self._pending.get(i)
+            self.misses += 1
+        if(f is not None):
+            return f.result()
+        return self._store(i, self.decode(i), )
+    
+    def schedule(self, positions, ):
+        """Load frames at positions in background"""
+        for i in positions:
+            with self._lock:
+                if(self._closed or i in self._frames or i in self._pending):
+                    continue
+                self._pending[i] = self._executor.submit(self._job, i, )
+    
+    def close(self):
+        with self._lock:
+            self._closed = True
+            pending = list(self._pending.values())
+        for f in pending:
+            f.cancel()
+        # running job must finish before frames are dropped, it takes the lock when done, so wait outside of it
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._frames.clear()
+            self._pending.clear()
+            self.nbytes = 0
+
+
 class PCVSequence():
     cache = {}
     initialized = False
@@ -4511,6 +5267,7 @@ class PCVSequence():
         for k, v in cls.cache.items():
             pcv = v['pcv']
             if(pcv.uuid != k):
+                v['frames'].close()
                 del cls.cache[k]
                 if(len(cls.cache.items()) == 0):
                     cls.deinit()
@@ -4529,11 +5286,29 @@ class PCVSequence():
             ld = len(v['data'])
             if(pcv.sequence_use_cyclic):
                 cf = cf % ld
+            
+            frames = v['frames']
+            frames.budget = pcv.sequence_cache_size * 1024 * 1024
+            frames.prefetch = pcv.sequence_prefetch
+            # playback direction from last displayed frame, step is taken modulo sequence length so wrap around in cycle counts as forward
+            d = -1 if(0 < (v['current'] - cf) % ld <= ld // 2) else 1
+            v['current'] = cf
+            
+            # queue upcoming frames first, background thread decodes them while this one is uploaded
+            ahead = [cf - 1 + d * j for j in range(1, frames.prefetch + 1)]
+            if(pcv.sequence_use_cyclic):
+                ahead = [j % ld for j in ahead]
+            frames.schedule([j for j in ahead if 0 <= j < ld])
+            
             if(cf > ld):
                 PCVManager.update(k, [], None, None, )
             else:
-                data = v['data'][cf - 1]
-                PCVManager.update(k, data['vs'], data['ns'], data['cs'], )
+                try:
+                    vs, ns, cs = frames.get((cf - 1) % ld)
+                except Exception as e:
+                    log("sequence frame {}: {}".format(cf, e))
+                    vs, ns, cs = [], None, None
+                PCVManager.update(k, vs, ns, cs, partial=False, )
     
     @classmethod
     def init(cls):
@@ -4548,6 +5323,8 @@ class PCVSequence():
             return
         bpy.app.handlers.frame_change_post.remove(PCVSequence.handler)
         cls.initialized = False
+        for k, v in cls.cache.items():
+            v['frames'].close()
         cls.cache = {}
 
 
@@ -5376,6 +6153,605 @@ class PCVRandomVolumeSampler():
         self.cs = cs[:]
 
 
+class PCVVoxelSampler():
+    """Simplify point cloud to number of samples by keeping one random point per voxel
+    
+    Voxel size is searched so that number of occupied voxels is just above number of samples, surplus voxels are dropped randomly. Search runs on random subset of points, only final pass hashes all points.
+    
+    Args:
+        vs: positions (n, 3)
+        num_samples: number of samples
+        subset: max number of points used to search voxel size
+    
+    Attributes:
+        indices (np.ndarray): indices of samples in vs
+        size (float): voxel size
+    
+    """
+    
+    def __init__(self, vs, num_samples, subset=2000000, ):
+        log("{}:".format(self.__class__.__name__), 0)
+        l = len(vs)
+        num_samples = min(num_samples, l)
+        order = np.random.permutation(l)
+        vmin, vmax = self.bounds(vs)
+        
+        sub = vs[np.sort(order[:max(subset, num_samples * 2)])]
+        
+        def occupied(h, ):
+            return self.count(self.keys(sub, vmin, vmax, h, ))
+        
+        # bracket voxel size in log space, then bisect, occupancy falls with size
+        lo = hi = self.size_estimate(vmin, vmax, num_samples, )
+        n = occupied(lo)
+        h = lo
+        stalled = 0
+        while(n < num_samples):
+            h /= 4
+            try:
+                m = occupied(h)
+            except ValueError:
+                # grid would not fit into keys
+                m = -1
+            if(m > n):
+                hi = lo
+                lo = h
+                n = m
+                stalled = 0
+                continue
+            stalled += 1
+            if(m < 0 or stalled >= 2):
+                # occupancy stopped growing, there are fewer distinct positions than samples, keep one point per position
+                log("only {} distinct positions found".format(n), 1)
+                num_samples = n
+                break
+        while(occupied(hi) >= num_samples):
+            lo = hi
+            hi *= 4
+        for i in range(8):
+            h = math.sqrt(lo * hi)
+            if(occupied(h) >= num_samples):
+                lo = h
+            else:
+                hi = h
+        self.size = lo
+        log("voxel size: {}".format(self.size), 1)
+        
+        # first point of each voxel in shuffled order is a random one
+        k = self.keys(vs[order], vmin, vmax, self.size, )
+        _, first = np.unique(k, return_index=True, )
+        indices = order[first]
+        if(len(indices) > num_samples):
+            indices = np.random.choice(indices, num_samples, replace=False, )
+        self.indices = np.sort(indices)
+        log("samples: {}".format(len(self.indices)), 1)
+    
+    @staticmethod
+    def bounds(vs, chunk_size=1000000, ):
+        vmin = np.full(3, np.inf, )
+        vmax = np.full(3, -np.inf, )
+        for i in range(0, len(vs), chunk_size):
+            v = vs[i:i + chunk_size]
+            vmin = np.minimum(vmin, v.min(axis=0), )
+            vmax = np.maximum(vmax, v.max(axis=0), )
+        return vmin, vmax
+    
+    @staticmethod
+    def count(keys, ):
+        # number of distinct keys, sorting is cheaper than hashing here
+        if(not len(keys)):
+            return 0
+        k = np.sort(keys)
+        return 1 + int(np.count_nonzero(k[1:] != k[:-1]))
+    
+    @staticmethod
+    def size_estimate(vmin, vmax, n, ):
+        # cell size of n cells filling bounding box, flat axes are given 1/1000 of largest extent
+        e = vmax - vmin
+        m = max(float(e.max()), 1e-9)
+        e = np.maximum(e, m / 1000)
+        return float(np.prod(e) / max(n, 1)) ** (1 / 3)
+    
+    @staticmethod
+    def dims(vmin, vmax, h, ):
+        # cells per axis with one spare cell on each side for neighbour lookups
+        return (np.floor((vmax - vmin) / h).astype(np.int64) + 3)
+    
+    @classmethod
+    def cells(cls, vs, vmin, h, ):
+        # integer cell coordinates, shifted by one for the spare cell
+        return (np.floor((np.asarray(vs, dtype=np.float64, ) - vmin) / h)).astype(np.int64) + 1
+    
+    @classmethod
+    def keys(cls, vs, vmin, vmax, h, ):
+        d = cls.dims(vmin, vmax, h, )
+        if(np.prod(d.astype(np.float64)) >= 2 ** 62):
+            raise ValueError("voxel size {} is too small for point cloud extent".format(h))
+        c = cls.cells(vs, vmin, h, )
+        return (c[:, 0] * d[1] + c[:, 1]) * d[2] + c[:, 2]
+
+
+class PCVBestCandidateSampler():
+    """Simplify point cloud to number of evenly distributed samples with best candidate sampling
+    
+    Samples are accepted in batches, for each new sample a set of candidates is tested against already accepted samples and the most distant one is taken. Accepted samples are stored in uniform hash grid with cell of about sample spacing, nearest sample is searched in 2x2x2 cells around candidate with vectorized distance queries. Candidates further than half a cell are equally good. Batch grows with number of accepted samples, samples within one batch are not tested against each other.
+    
+    Args:
+        vs: positions (n, 3)
+        num_samples: number of samples
+        candidates: number of candidates per sample
+        slots: max number of samples stored per grid cell
+        growth: batch size as fraction of already accepted samples
+        query_size: max number of candidates queried at once, limits temporary memory
+    
+    Attributes:
+        indices (np.ndarray): indices of samples in vs
+    
+    """
+    
+    def __init__(self, vs, num_samples, candidates=10, slots=2, growth=0.1, query_size=65536, ):
+        log("{}:".format(self.__class__.__name__), 0)
+        l = len(vs)
+        num_samples = min(num_samples, l)
+        vs = np.asarray(vs, dtype=np.float32, )
+        order = np.random.permutation(l)
+        
+        vmin, vmax = PCVVoxelSampler.bounds(vs)
+        h = self._cell_size(vs[order[:2000000]], vmin, vmax, num_samples, )
+        log("grid cell: {}".format(h), 1)
+        self._vmin = vmin
+        self._h = h
+        self._dims = PCVVoxelSampler.dims(vmin, vmax, h, )
+        
+        # compact grid of cells occupied by any point, samples can only land there
+        keys = PCVVoxelSampler.keys(vs, vmin, vmax, h, )
+        self._cell_keys, point_cell = np.unique(keys, return_inverse=True, )
+        del keys
+        nc = len(self._cell_keys)
+        # key to cell lookup table if it is not much larger than grid itself, binary search otherwise
+        self._lookup = None
+        t = int(np.prod(self._dims))
+        if(t <= max(nc * 8, 2 ** 22)):
+            self._lookup = np.full(t, nc, dtype=np.int64, )
+            self._lookup[self._cell_keys] = np.arange(nc)
+        # sample positions per cell, empty slots and extra last cell (for neighbours without points) are at infinity, so they never are nearest
+        self._grid = np.full((3, nc + 1, slots), np.inf, dtype=np.float32, )
+        fill = np.zeros(nc, dtype=np.int64, )
+        
+        def insert(w, ):
+            c = point_cell[w]
+            o = np.argsort(c, kind='stable', )
+            w = w[o]
+            c = c[o]
+            # rank of sample within its cell in this batch
+            first = np.searchsorted(c, c, side='left', )
+            s = fill[c] + np.arange(len(c)) - first
+            ok = s < slots
+            self._grid[:, c[ok], s[ok]] = vs[w[ok]].T
+            np.add.at(fill, c, 1, )
+        
+        accepted = [order[:1]]
+        n = 1
+        insert(order[:1])
+        stream = order[1:]
+        cursor = 0
+        losers = []
+        
+        log("sampling:", 1)
+        prgs = Progress(num_samples, indent=2, prefix="> ")
+        prgs.step()
+        while(n < num_samples):
+            if(cursor >= len(stream)):
+                # fresh points are used up, recycle rejected candidates
+                if(not len(losers)):
+                    break
+                stream = np.concatenate(losers)
+                losers = []
+                cursor = 0
+            b = min(max(1, int(n * growth)), num_samples - n)
+            chunk = stream[cursor:cursor + b * candidates]
+            cursor += len(chunk)
+            if(len(chunk) < candidates):
+                cands = chunk[None, :]
+            else:
+                b = len(chunk) // candidates
+                cands = chunk[:b * candidates].reshape(b, candidates)
+                losers.append(chunk[b * candidates:])
+            
+            d = np.empty(cands.shape, dtype=np.float32, )
+            flat = cands.reshape(-1)
+            df = d.reshape(-1)
+            for i in range(0, len(flat), query_size):
+                df[i:i + query_size] = self._nearest(vs[flat[i:i + query_size]])
+            
+            j = np.argmax(d, axis=1, )
+            r = np.arange(len(cands))
+            w = cands[r, j]
+            m = np.ones(cands.shape, dtype=bool, )
+            m[r, j] = False
+            losers.append(cands[m])
+            # winners of one batch are not tested against each other, keep only one per grid cell
+            _, u = np.unique(point_cell[w], return_index=True, )
+            if(len(u) < len(w)):
+                m = np.ones(len(w), dtype=bool, )
+                m[u] = False
+                losers.append(w[m])
+                w = w[u]
+            
+            insert(w)
+            accepted.append(w)
+            n += len(w)
+            prgs.step(len(w))
+        
+        self.indices = np.sort(np.concatenate(accepted))
+    
+    def _cell_size(self, sub, vmin, vmax, num_samples, ):
+        # cell that holds about one sample, point cloud dimension (1 to 3) is estimated from occupancy at two sizes
+        h = PCVVoxelSampler.size_estimate(vmin, vmax, num_samples, )
+        a = PCVVoxelSampler.count(PCVVoxelSampler.keys(sub, vmin, vmax, h, ))
+        b = PCVVoxelSampler.count(PCVVoxelSampler.keys(sub, vmin, vmax, h * 2, ))
+        dim = min(max(math.log2(max(a, 1) / max(b, 1)), 1.0), 3.0)
+        return h * (a / num_samples) ** (1 / dim)
+    
+    def _nearest(self, p, ):
+        # squared distance of points p to nearest stored sample in 2x2x2 cells around them, inf if none
+        base = PCVVoxelSampler.cells(p - self._h / 2, self._vmin, self._h, )
+        d = self._dims
+        k = np.empty((len(p), 8), dtype=np.int64, )
+        j = 0
+        for x in (0, 1):
+            for y in (0, 1):
+                for z in (0, 1):
+                    k[:, j] = ((base[:, 0] + x) * d[1] + base[:, 1] + y) * d[2] + base[:, 2] + z
+                    j += 1
+        if(self._lookup is not None):
+            i = np.take(self._lookup, k, )
+        else:
+            nc = len(self._cell_keys)
+            i = np.searchsorted(self._cell_keys, k, )
+            i = np.minimum(i, nc - 1, )
+            i[self._cell_keys[i] != k] = nc
+        r = None
+        for a in range(3):
+            g = np.take(self._grid[a], i, axis=0, ).reshape(len(p), -1)
+            g -= p[:, a, None]
+            g *= g
+            if(r is None):
+                r = g
+            else:
+                r += g
+        return r.min(axis=1)
+
+
+class PCVVoxelDownsampler():
+    """Downsample point cloud to one point per voxel
+    
+    Points are hashed to voxel grid chunk by chunk, per chunk sums of positions, normals and colors are reduced with one sort and partial sums of all chunks are merged, so memory is bounded by chunk size and number of occupied voxels. Representative point is voxel centroid or point nearest to it (second pass), colors are averaged and normals are normalized mean normals.
+    
+    Args:
+        vs: positions (n, 3)
+        ns: normals (n, 3)
+        cs: colors (n, 4)
+        size: voxel size
+        representative: 'CENTROID' or 'NEAREST'
+        chunk_size: number of points processed at once
+    
+    Attributes:
+        vs (np.ndarray): float32 positions (m, 3)
+        ns (np.ndarray): float32 normals (m, 3)
+        cs (np.ndarray): float32 colors (m, 4)
+        indices (np.ndarray): indices of representative points if representative is 'NEAREST', else None
+    
+    """
+    
+    def __init__(self, vs, ns, cs, size, representative='CENTROID', chunk_size=2 ** 22, ):
+        log("{}:".format(self.__class__.__name__), 0)
+        l = len(vs)
+        vmin, vmax = PCVVoxelSampler.bounds(vs)
+        # check grid fits into keys before anything else
+        PCVVoxelSampler.keys(vs[:1], vmin, vmax, size, )
+        
+        keys = None
+        acc = None
+        pending = []
+        pending_len = 0
+        log("aggregating..", 1)
+        prgs = Progress(l, indent=2, prefix="> ")
+        for i in range(0, l, chunk_size):
+            k = PCVVoxelSampler.keys(vs[i:i + chunk_size], vmin, vmax, size, )
+            a = np.concatenate((np.ones((len(k), 1), ), vs[i:i + chunk_size], ns[i:i + chunk_size], cs[i:i + chunk_size], ), axis=1, )
+            pending.append(self._reduce(k, a, ))
+            pending_len += len(pending[-1][0])
+            if(pending_len > chunk_size):
+                keys, acc = self._merge(pending, keys, acc, )
+                pending = []
+                pending_len = 0
+            prgs.step(len(k))
+        keys, acc = self._merge(pending, keys, acc, )
+        log("voxels: {}".format(len(keys)), 1)
+        
+        count = acc[:, 0:1]
+        centroids = acc[:, 1:4] / count
+        n = acc[:, 4:7]
+        nl = np.linalg.norm(n, axis=1, )
+        ok = nl > 0
+        n[ok] /= nl[ok, None]
+        n[~ok] = (0.0, 0.0, 1.0, )
+        self.ns = n.astype(np.float32)
+        self.cs = (acc[:, 7:11] / count).astype(np.float32)
+        self.indices = None
+        
+        if(representative == 'NEAREST'):
+            log("nearest points..", 1)
+            best = np.full(len(keys), np.inf, )
+            index = np.zeros(len(keys), dtype=np.int64, )
+            for i in range(0, l, chunk_size):
+                v = vs[i:i + chunk_size]
+                j = np.searchsorted(keys, PCVVoxelSampler.keys(v, vmin, vmax, size, ), )
+                d = np.sum((v - centroids[j]) ** 2, axis=1, )
+                # nearest point of each voxel in chunk
+                o = np.lexsort((d, j, ))
+                j = j[o]
+                first = np.ones(len(j), dtype=bool, )
+                first[1:] = j[1:] != j[:-1]
+                o = o[first]
+                j = j[first]
+                better = d[o] < best[j]
+                best[j[better]] = d[o[better]]
+                index[j[better]] = o[better] + i
+            self.indices = index
+            self.vs = np.take(vs, index, axis=0, ).astype(np.float32)
+        else:
+            self.vs = centroids.astype(np.float32)
+    
+    @staticmethod
+    def _reduce(keys, a, ):
+        # sum rows of a with equal keys, returns sorted unique keys and sums
+        o = np.argsort(keys, kind='stable', )
+        keys = keys[o]
+        start = np.ones(len(keys), dtype=bool, )
+        start[1:] = keys[1:] != keys[:-1]
+        start = np.flatnonzero(start)
+        return keys[start], np.add.reduceat(a[o], start, axis=0, )
+    
+    @classmethod
+    def _merge(cls, partials, keys, acc, ):
+        if(keys is not None):
+            partials = [(keys, acc, )] + partials
+        if(len(partials) == 1):
+            return partials[0]
+        return cls._reduce(np.concatenate([p[0] for p in partials]), np.concatenate([p[1] for p in partials]), )
+
+
+class PCVMeshTarget():
+    """Evaluated and triangulated mesh of object with BVHTree built over it, no object is added to scene
+    
+    Args:
+        o: mesh, curve, surface or font object
+        depsgraph: evaluated depsgraph
+        matrix: matrix applied after object world matrix, i.e. inverted point cloud matrix to get mesh in point cloud space, None to keep world space
+    
+    Attributes:
+        bm (bmesh.types.BMesh): triangulated mesh, face indices match tree, free with free()
+        tree (BVHTree): tree of bm faces
+        vmin (np.ndarray): bounding box minimum
+        vmax (np.ndarray): bounding box maximum
+    
+    """
+    
+    def __init__(self, o, depsgraph, matrix=None, ):
+        owner = o.evaluated_get(depsgraph)
+        me = owner.to_mesh(preserve_all_data_layers=True, depsgraph=depsgraph, )
+        bm = bmesh.new()
+        bm.from_mesh(me)
+        owner.to_mesh_clear()
+        
+        m = o.matrix_world.copy()
+        if(matrix is not None):
+            m = matrix @ m
+        bm.transform(m)
+        bmesh.ops.triangulate(bm, faces=bm.faces)
+        bm.verts.ensure_lookup_table()
+        bm.faces.ensure_lookup_table()
+        if(len(bm.faces) == 0):
+            bm.free()
+            raise Exception("Mesh has no faces")
+        
+        self.bm = bm
+        self.tree = BVHTree.FromBMesh(bm)
+        co = np.array([v.co.to_tuple() for v in bm.verts], dtype=np.float64, ).reshape(-1, 3)
+        self.vmin = co.min(axis=0)
+        self.vmax = co.max(axis=0)
+    
+    def free(self):
+        self.bm.free()
+        self.bm = None
+
+
+class PCVMeshContainment():
+    """Inside/outside test of points against closed mesh
+    
+    Points outside of mesh bounding box are outside. Points inside are binned to grid, cell without surface within half of its diagonal from its center is entirely inside or outside and is classified by its center. Cells crossed by surface holding more than leaf_size points are split in 2x2x2 and classified again, up to levels times, only points in small or finest cells crossed by surface are tested one by one. Test is ray parity, odd number of surface crossings along fixed direction is inside.
+    
+    Args:
+        target: PCVMeshTarget in space of points
+        vs: positions (n, 3)
+        resolution: number of grid cells along longest side of mesh bounding box, None to size it from number of points in bounding box
+        leaf_size: cells crossed by surface with at most this many points are not split
+        levels: maximum number of cell splits
+        chunk_size: number of points processed at once by bounding box test
+    
+    Attributes:
+        inside (np.ndarray): bool mask (n, ), True for points inside of mesh
+        slow (int): number of points tested one by one
+    
+    """
+    
+    # skewed, so rays do not run along axis aligned faces and edges
+    direction = (0.0123, 0.0234, 1.0, )
+    
+    def __init__(self, target, vs, resolution=None, leaf_size=16, levels=4, chunk_size=2 ** 20, ):
+        log("{}:".format(self.__class__.__name__), 0)
+        l = len(vs)
+        vmin = target.vmin
+        vmax = target.vmax
+        extent = max(float((vmax - vmin).max()), 1e-9)
+        self.tree = target.tree
+        self.d = Vector(self.direction).normalized()
+        # step over hit face, bvh is single precision
+        self.eps = extent * 1e-5
+        
+        inside = np.zeros(l, dtype=bool, )
+        candidates = []
+        for i in range(0, l, chunk_size):
+            v = vs[i:i + chunk_size]
+            candidates.append(np.flatnonzero(np.all((v > vmin) & (v < vmax), axis=1, )) + i)
+        candidates = np.concatenate(candidates) if(len(candidates)) else np.zeros(0, dtype=np.int64, )
+        log("in bounding box: {}".format(len(candidates)), 1)
+        
+        mixed = np.zeros(0, dtype=np.int64, )
+        if(len(candidates)):
+            if(resolution is None):
+                # about 64 points per cell, cells at surface are refined anyway
+                resolution = int(np.clip(round((len(candidates) / 64) ** (1 / 3)), 16, 128, ))
+            h = extent / resolution
+            idx = candidates
+            mixed = []
+            for level in range(levels + 1):
+                v = vs[idx]
+                k = PCVVoxelSampler.keys(v, vmin, vmax, h, )
+                _, first, inverse, counts = np.unique(k, return_index=True, return_inverse=True, return_counts=True, )
+                centers = vmin + (PCVVoxelSampler.cells(v[first], vmin, h, ) - 0.5) * h
+                del v, k
+                
+                log("classifying {} cells of size {:.6g}..".format(len(centers), h), 1)
+                state = self._classify(centers, h, )
+                # cells crossed by surface with few points are cheaper to test point by point than to split
+                split = (state == 2) & (counts > leaf_size)
+                if(level == levels):
+                    split[:] = False
+                
+                state = state[inverse]
+                split = split[inverse]
+                inside[idx[state == 1]] = True
+                mixed.append(idx[(state == 2) & ~split])
+                idx = idx[split]
+                if(len(idx) == 0):
+                    break
+                h /= 2
+            mixed = np.concatenate(mixed)
+            
+            log("testing {} points near surface..".format(len(mixed)), 1)
+            prgs = Progress(len(mixed), indent=2, prefix="> ")
+            for i in mixed:
+                prgs.step()
+                inside[i] = self.parity(Vector(vs[i]))
+        
+        self.inside = inside
+        self.slow = len(mixed)
+        log("tested one by one: {} of {} points".format(self.slow, l), 1)
+        log("inside: {}".format(np.count_nonzero(inside)), 1)
+    
+    def _classify(self, centers, h, ):
+        # 0 outside, 1 inside, 2 crossed by surface
+        r = h * math.sqrt(3) / 2
+        state = np.zeros(len(centers), dtype=np.int8, )
+        prgs = Progress(len(centers), indent=2, prefix="> ")
+        for i, p in enumerate(centers):
+            prgs.step()
+            p = Vector(p)
+            if(self.tree.find_nearest(p, r, )[0] is not None):
+                state[i] = 2
+            elif(self.parity(p)):
+                state[i] = 1
+        return state
+    
+    def parity(self, p, max_hits=1000, ):
+        d = self.d
+        n = 0
+        for i in range(max_hits):
+            loc, _, _, _ = self.tree.ray_cast(p, d, )
+            if(loc is None):
+                break
+            n += 1
+            p = loc + d * self.eps
+        return (n % 2 == 1)
+
+
+class PCVMeshProjector():
+    """Project points along their normals onto mesh surface
+    
+    Points are processed in chunks, each point is one BVHTree.ray_cast per searched direction, ray directions, choice of nearer hit and results are handled with numpy for whole chunk. mathutils holds GIL during ray casting and BVHTree cannot be passed to other processes, so chunks run one after another.
+    
+    Args:
+        target: PCVMeshTarget in space of points
+        vs: positions (n, 3)
+        ns: normals (n, 3)
+        search_distance: maximum ray length
+        positive: search forwards along normal
+        negative: search backwards along normal
+        chunk_size: number of points processed at once
+    
+    Attributes:
+        hit (np.ndarray): bool mask (n, ), True for projected points
+        locations (np.ndarray): float64 positions (n, 3), projected where hit, original elsewhere
+        faces (np.ndarray): int64 indices of hit faces in target.bm (n, ), -1 where nothing was hit
+    
+    """
+    
+    def __init__(self, target, vs, ns, search_distance, positive=True, negative=True, chunk_size=2 ** 16, ):
+        log("{}:".format(self.__class__.__name__), 0)
+        l = len(vs)
+        self.tree = target.tree
+        self.search_distance = search_distance
+        self.hit = np.zeros(l, dtype=bool, )
+        self.locations = np.array(vs, dtype=np.float64, ).reshape(-1, 3)
+        self.faces = np.full(l, -1, dtype=np.int64, )
+        
+        prgs = Progress(l, indent=1, prefix="> ")
+        for i in range(0, l, chunk_size):
+            v = self.locations[i:i + chunk_size]
+            n = np.asarray(ns[i:i + chunk_size], dtype=np.float64, )
+            d = np.linalg.norm(n, axis=1, )
+            # zero normal has no direction to search in
+            ok = d > 0
+            n = n / np.where(ok, d, 1.0, )[:, None]
+            
+            best = np.full(len(v), np.inf, )
+            if(positive):
+                self._cast(v, n, ok, best, i, )
+            if(negative):
+                # backward hit wins ties, as it always did
+                self._cast(v, -n, ok, best, i, ties=True, )
+            prgs.step(len(v))
+        
+        log("projected: {} of {}".format(np.count_nonzero(self.hit), l), 1)
+    
+    def _cast(self, v, n, ok, best, offset, ties=False, ):
+        rc = self.tree.ray_cast
+        sd = self.search_distance
+        m = len(v)
+        locs = np.zeros((m, 3), dtype=np.float64, )
+        dist = np.full(m, np.inf, )
+        face = np.full(m, -1, dtype=np.int64, )
+        for k, p, d in zip(np.flatnonzero(ok), v[ok].tolist(), n[ok].tolist(), ):
+            loc, _, idx, di = rc(Vector(p), Vector(d), sd, )
+            if(loc is not None):
+                locs[k] = loc
+                dist[k] = di
+                face[k] = idx
+        
+        if(ties):
+            u = (dist <= best) & (face != -1)
+        else:
+            u = (dist < best)
+        best[u] = dist[u]
+        w = np.flatnonzero(u) + offset
+        self.hit[w] = True
+        self.locations[w] = locs[u]
+        self.faces[w] = face[u]
+
+
 class PCV_OT_init(Operator):
     bl_idname = "point_cloud_visualizer.init"
     bl_label = "init"
@@ -5482,7 +6858,7 @@ class PCV_OT_load(Operator):
     bl_description = "Load PLY file"
     
     filename_ext = ".ply"
-    filter_glob: StringProperty(default="*.ply", options={'HIDDEN'}, )
+    filter_glob: StringProperty(default="*.ply;*.pcv", options={'HIDDEN'}, )
     filepath: StringProperty(name="File Path", default="", description="", maxlen=1024, subtype='FILE_PATH', )
     order = ["filepath", ]
     
@@ -5505,7 +6881,7 @@ class PCV_OT_load(Operator):
         ok = True
         h, t = os.path.split(self.filepath)
         n, e = os.path.splitext(t)
-        if(e != '.ply'):
+        if(e.lower() not in ('.ply', '.pcv', )):
             ok = False
         if(not ok):
             self.report({'ERROR'}, "File at '{}' seems not to be a PLY file.".format(self.filepath))
@@ -5530,6 +6906,30 @@ class PCV_OT_render(Operator):
     bl_label = "Render"
     bl_description = "Render displayed point cloud from active camera view to image"
     
+    # uuid: (key, vertices, order), depth order is valid while camera and object matrices are unchanged and vertices are the same array, it is referenced so its id can't be reused by another array
+    depth_order_cache = {}
+    
+    @classmethod
+    def depth_order(cls, pcv, cloud, cam, o, l, use_cache=True, ):
+        # camera view depth as in world_to_camera_view, i.e. -z in camera space
+        m = np.array(cam.matrix_world.normalized().inverted() @ o.matrix_world, dtype=np.float64, )
+        key = (tuple(m.ravel()), l, )
+        if(use_cache):
+            c = cls.depth_order_cache.get(pcv.uuid)
+            if(c is not None and c[0] == key and c[1] is cloud['vertices']):
+                return c[2]
+        
+        vs = cloud['vertices'][:l]
+        depth = -(np.dot(vs, m[2, :3]) + m[2, 3])
+        # stable ascending sort, reversed, same as sorting (depth, vertex) tuples
+        order = np.argsort(depth, kind='stable')[::-1]
+        
+        if(use_cache):
+            cls.depth_order_cache[pcv.uuid] = (key, cloud['vertices'], order, )
+        else:
+            cls.depth_order_cache.pop(pcv.uuid, None)
+        return order
+    
     @classmethod
     def poll(cls, context):
         if(context.object is None):
@@ -5678,49 +7078,46 @@ class PCV_OT_render(Operator):
                 # if(not pcv.illumination and not pcv.override_default_shader):
                 if(not pcv.override_default_shader):
                     use_smoothstep = True
-                    # sort by depth
-                    mw = o.matrix_world
-                    depth = []
-                    for i, v in enumerate(vs):
-                        vw = mw @ Vector(v)
-                        depth.append(world_to_camera_view(scene, cam, vw)[2])
-                    zps = zip(depth, vs, cs, ns)
-                    sps = sorted(zps, key=lambda a: a[0])
-                    # split and reverse
-                    vs = [a for _, a, b, c in sps][::-1]
-                    cs = [b for _, a, b, c in sps][::-1]
-                    ns = [c for _, a, b, c in sps][::-1]
-            
+                    # sort by depth, far to near
+                    order = self.depth_order(pcv, cloud, cam, o, l, pcv.render_smoothstep_cache, )
+                    vs = vs[order]
+                    cs = cs[order]
+                    ns = ns[order]
+            
+            # only default shaders have display_length uniform
+            use_display_length = False
             if(pcv.dev_depth_enabled):
                 if(pcv.illumination):
-                    shader = GPUShader(PCVShaders.depth_vertex_shader_illumination, PCVShaders.depth_fragment_shader_illumination, )
+                    shader = PCVShaderRegistry.get(PCVShaders.depth_vertex_shader_illumination, PCVShaders.depth_fragment_shader_illumination, )
                     batch = batch_for_shader(shader, 'POINTS', {"position": vs, "normal": ns, })
                 elif(pcv.dev_depth_false_colors):
-                    shader = GPUShader(PCVShaders.depth_vertex_shader_false_colors, PCVShaders.depth_fragment_shader_false_colors, )
+                    shader = PCVShaderRegistry.get(PCVShaders.depth_vertex_shader_false_colors, PCVShaders.depth_fragment_shader_false_colors, )
                     batch = batch_for_shader(shader, 'POINTS', {"position": vs, })
                 else:
-                    shader = GPUShader(PCVShaders.depth_vertex_shader_simple, PCVShaders.depth_fragment_shader_simple, )
+                    shader = PCVShaderRegistry.get(PCVShaders.depth_vertex_shader_simple, PCVShaders.depth_fragment_shader_simple, )
                     batch = batch_for_shader(shader, 'POINTS', {"position": vs, })
             elif(pcv.dev_normal_colors_enabled):
-                shader = GPUShader(PCVShaders.normal_colors_vertex_shader, PCVShaders.normal_colors_fragment_shader, )
+                shader = PCVShaderRegistry.get(PCVShaders.normal_colors_vertex_shader, PCVShaders.normal_colors_fragment_shader, )
                 batch = batch_for_shader(shader, 'POINTS', {"position": vs, "normal": ns, })
             elif(pcv.dev_position_colors_enabled):
-                shader = GPUShader(PCVShaders.position_colors_vertex_shader, PCVShaders.position_colors_fragment_shader, )
+                shader = PCVShaderRegistry.get(PCVShaders.position_colors_vertex_shader, PCVShaders.position_colors_fragment_shader, )
                 batch = batch_for_shader(shader, 'POINTS', {"position": vs, })
             elif(pcv.illumination):
                 if(use_smoothstep):
-                    shader = GPUShader(PCVShaders.vertex_shader_illumination_render_smooth, PCVShaders.fragment_shader_illumination_render_smooth)
+                    shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_illumination_render_smooth, PCVShaders.fragment_shader_illumination_render_smooth)
                     batch = batch_for_shader(shader, 'POINTS', {"position": vs, "color": cs, "normal": ns, })
                 else:
-                    shader = GPUShader(PCVShaders.vertex_shader_illumination, PCVShaders.fragment_shader_illumination)
+                    shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_illumination, PCVShaders.fragment_shader_illumination)
                     batch = batch_for_shader(shader, 'POINTS', {"position": vs, "color": cs, "normal": ns, })
+                    use_display_length = True
             else:
                 if(use_smoothstep):
-                    shader = GPUShader(PCVShaders.vertex_shader_simple_render_smooth, PCVShaders.fragment_shader_simple_render_smooth)
+                    shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_simple_render_smooth, PCVShaders.fragment_shader_simple_render_smooth)
                     batch = batch_for_shader(shader, 'POINTS', {"position": vs, "color": cs, })
                 else:
-                    shader = GPUShader(PCVShaders.vertex_shader_simple, PCVShaders.fragment_shader_simple)
+                    shader = PCVShaderRegistry.get(PCVShaders.vertex_shader_simple, PCVShaders.fragment_shader_simple)
                     batch = batch_for_shader(shader, 'POINTS', {"position": vs, "color": cs, })
+                    use_display_length = True
             
             shader.bind()
             
@@ -5737,6 +7134,9 @@ class PCV_OT_render(Operator):
                 shader.uniform_float("point_size", pcv.render_point_size)
             shader.uniform_float("alpha_radius", pcv.alpha_radius)
             shader.uniform_float("global_alpha", pcv.global_alpha)
+            if(use_display_length):
+                # data are already cut to display length
+                shader.uniform_int("display_length", len(vs))
             
             if(pcv.dev_depth_enabled):
                 # pm = bpy.context.region_data.perspective_matrix
@@ -5832,63 +7232,36 @@ class PCV_OT_render(Operator):
             offscreen.unbind()
             offscreen.free()
         
-        # image from buffer
-        image_name = "pcv_output"
-        if(image_name not in bpy.data.images):
-            bpy.data.images.new(image_name, width, height)
-        image = bpy.data.images[image_name]
-        image.pixels = [v / 255 for v in buffer]
-        # image.scale(width, height)
+        # image from buffer, view of the buffer memory if possible, copy otherwise
+        try:
+            pixels = np.frombuffer(buffer, dtype=np.uint8, )
+        except (TypeError, ValueError, ):
+            pixels = np.array(buffer.to_list(), dtype=np.int8, ).view(np.uint8)
+        pixels = pixels.reshape(height, width, 4)
         
         if(pcv.render_supersampling > 1):
-            width = int(width / pcv.render_supersampling)
-            height = int(height / pcv.render_supersampling)
-            image.scale(width, height)
-        
-        # save as image file
-        def save_render(operator, scene, image, output_path, ):
-            rs = scene.render
-            s = rs.image_settings
-            ff = s.file_format
-            cm = s.color_mode
-            cd = s.color_depth
-            
-            vs = scene.view_settings
-            vsvt = vs.view_transform
-            vsl = vs.look
-            vs.view_transform = 'Standard'
-            vs.look = 'None'
-            
-            s.file_format = 'PNG'
-            s.color_mode = 'RGBA'
-            s.color_depth = '8'
-            
+            # box filter down to requested resolution
+            ss = pcv.render_supersampling
+            width = int(width / ss)
+            height = int(height / ss)
+            pixels = pixels[:height * ss, :width * ss].reshape(height, ss, width, ss, 4)
+            pixels = (pixels.mean(axis=(1, 3), ) + 0.5).astype(np.uint8)
+        
+        # save as image file, 8bit rgba png written directly from pixels, no image datablock needed
+        compress_level = int(round(image_settings.compression / 100 * 9))
+        if(PNGWriterPool.active is not None):
+            # encode in background, pixels might still view gl buffer memory, buffer is kept alive by array
+            PNGWriterPool.active.submit(output_path, pixels, compress_level, flip=True, )
+        else:
             try:
-                image.save_render(output_path)
+                PNGWriter(output_path, pixels, compress_level, flip=True, )
                 log("image '{}' saved".format(output_path))
             except Exception as e:
-                s.file_format = ff
-                s.color_mode = cm
-                s.color_depth = cd
-                vs.view_transform = vsvt
-                vs.look = vsl
-                
                 log("error: {}".format(e))
-                operator.report({'ERROR'}, "Unable to save render image, see console for details.")
-                return
-            
-            s.file_format = ff
-            s.color_mode = cm
-            s.color_depth = cd
-            vs.view_transform = vsvt
-            vs.look = vsl
-        
-        save_render(self, scene, image, output_path, )
+                self.report({'ERROR'}, "Unable to save render image, see console for details.")
         
         # restore
         image_settings.color_depth = original_depth
-        # cleanup
-        bpy.data.images.remove(image)
         
         _d = datetime.timedelta(seconds=time.time() - _t)
         print("PCV: Frame completed in {}.".format(_d))
@@ -5928,23 +7301,38 @@ class PCV_OT_render_animation(Operator):
         user_frame = scene.frame_current
         
         _t = time.time()
-        log_format = 'PCV: Frame: {} ({}/{}) | Time: {} | Remaining: {}'
+        log_format = 'PCV: Frame: {} ({}/{}) | Time: {} | Remaining: {} | Encode backlog: {} | Encode: {}'
         frames = [i for i in range(scene.frame_start, scene.frame_end + 1, 1)]
         num_frames = len(frames)
         times = []
         
-        for i, n in enumerate(frames):
-            t = time.time()
-            
-            scene.frame_set(n)
-            bpy.ops.point_cloud_visualizer.render()
-            
-            d = time.time() - t
-            times.append(d)
-            print(log_format.format(scene.frame_current, i + 1, num_frames,
-                                    rm_ms(datetime.timedelta(seconds=d)),
-                                    rm_ms(datetime.timedelta(seconds=(sum(times) / len(times)) * (num_frames - i - 1)), ), ))
-            
+        pcv = context.object.point_cloud_visualizer
+        writer = PNGWriterPool(workers=pcv.render_writer_threads, max_in_flight=pcv.render_writer_backlog, )
+        PNGWriterPool.active = writer
+        try:
+            for i, n in enumerate(frames):
+                t = time.time()
+                
+                scene.frame_set(n)
+                bpy.ops.point_cloud_visualizer.render()
+                
+                # render time only, encoding runs in background and is reported separately
+                d = time.time() - t
+                times.append(d)
+                print(log_format.format(scene.frame_current, i + 1, num_frames,
+                                        rm_ms(datetime.timedelta(seconds=d)),
+                                        rm_ms(datetime.timedelta(seconds=(sum(times) / len(times)) * (num_frames - i - 1)), ),
+                                        writer.backlog,
+                                        datetime.timedelta(seconds=round(writer.average_encode_time(), 3)), ))
+        finally:
+            PNGWriterPool.active = None
+            if(writer.backlog):
+                print("PCV: Waiting for {} frames to be written..".format(writer.backlog))
+            writer.close()
+        
+        if(len(writer.errors)):
+            self.report({'ERROR'}, "Unable to save {} render images, see console for details.".format(len(writer.errors)))
+        
         scene.frame_set(user_frame)
         
         _d = datetime.timedelta(seconds=time.time() - _t)
@@ -6134,11 +7522,10 @@ class PCV_OT_export(Operator, ExportHelper):
         c.prop(pcv, 'export_apply_transformation')
         c.prop(pcv, 'export_convert_axes')
         c.prop(pcv, 'export_visible_only')
+        c.prop(pcv, 'export_chunk_size')
     
-    def execute(self, context):
-        log("Export:", 0)
-        _t = time.time()
-        
+    def source(self, context, ):
+        """Points to export, returns (count, normals, colors, color dtype, chunks), chunks(step) yields transformed (vs, ns, cs) arrays"""
         pcv = context.object.point_cloud_visualizer
         c = PCVManager.cache[pcv.uuid]
         
@@ -6161,11 +7548,17 @@ class PCV_OT_export(Operator, ExportHelper):
             # TODO: viewport points have always some normals and colors, should i keep it how it was loaded or should i include also generic data created for viewing?
             normals = True
             colors = True
+            # viewport colors are in float32, back to uint8 colors
+            color_dtype = np.dtype(np.uint8)
+            
+            def chunk(a, b, ):
+                return vs[a:b], ns[a:b], cs[a:b, :3] * 255
             
         else:
             log("using original loaded points..", 1)
             # get original loaded points
             points = c['points']
+            vs = points
             # check for normals
             normals = True
             if(not set(('nx', 'ny', 'nz')).issubset(points.dtype.names)):
@@ -6174,89 +7567,128 @@ class PCV_OT_export(Operator, ExportHelper):
             colors = True
             if(not set(('red', 'green', 'blue')).issubset(points.dtype.names)):
                 colors = False
-            # make vertices, normals, colors arrays, use None if data is not available, colors leave as they are
-            vs = np.column_stack((points['x'], points['y'], points['z'], ))
-            ns = None
-            if(normals):
-                ns = np.column_stack((points['nx'], points['ny'], points['nz'], ))
-            cs = None
-            if(colors):
-                cs = np.column_stack((points['red'], points['green'], points['blue'], ))
-        
-        def apply_matrix(m, vs, ns=None, ):
-            vs.shape = (-1, 3)
-            vs = np.c_[vs, np.ones(vs.shape[0])]
-            vs = np.dot(m, vs.T)[0:3].T.reshape((-1))
-            vs.shape = (-1, 3)
-            if(ns is not None):
-                _, rot, _ = m.decompose()
-                rmat = rot.to_matrix().to_4x4()
-                ns.shape = (-1, 3)
-                ns = np.c_[ns, np.ones(ns.shape[0])]
-                ns = np.dot(rmat, ns.T)[0:3].T.reshape((-1))
-                ns.shape = (-1, 3)
-            return vs, ns
-        
-        # fabricate matrix
+            # loaded data should be in uint8 (or uint16), leave colors as they are
+            color_dtype = points['red'].dtype if colors else None
+            
+            def chunk(a, b, ):
+                p = points[a:b]
+                v = np.column_stack((p['x'], p['y'], p['z'], ))
+                n = None
+                if(normals):
+                    n = np.column_stack((p['nx'], p['ny'], p['nz'], ))
+                k = None
+                if(colors):
+                    k = np.column_stack((p['red'], p['green'], p['blue'], ))
+                return v, n, k
+        
+        # fabricate matrix, transformation and axis conversion are combined to single matrix applied to each chunk
         m = Matrix.Identity(4)
         if(pcv.export_apply_transformation):
             if(o.matrix_world != Matrix.Identity(4)):
                 log("apply transformation..", 1)
-                vs, ns = apply_matrix(o.matrix_world.copy(), vs, ns, )
+                m = o.matrix_world.copy()
         if(pcv.export_convert_axes):
             log("convert axes..", 1)
             axis_forward = '-Z'
             axis_up = 'Y'
             cm = axis_conversion(to_forward=axis_forward, to_up=axis_up).to_4x4()
-            vs, ns = apply_matrix(cm, vs, ns, )
+            m = cm @ m
+        transform = (m != Matrix.Identity(4))
+        _, rot, _ = m.decompose()
+        mm = np.array(m, dtype=np.float64, )
+        rm = np.array(rot.to_matrix(), dtype=np.float64, )
+        
+        l = len(vs)
+        
+        def chunks(step, ):
+            for i in range(0, l, step):
+                v, n, k = chunk(i, i + step)
+                if(transform):
+                    v = np.dot(v, mm[:3, :3].T) + mm[:3, 3]
+                    if(normals):
+                        n = np.dot(n, rm.T)
+                yield v, n, k
+        
+        return l, normals, colors, color_dtype, chunks
+    
+    def execute(self, context):
+        log("Export:", 0)
+        _t = time.time()
+        
+        pcv = context.object.point_cloud_visualizer
+        l, normals, colors, color_dtype, chunks = self.source(context)
         
         # TODO: make whole PCV data type agnostic, load anything, keep original, convert to what is needed for display (float32), use original for export if not set to use viewport/edited data. now i am forcing float32 for x, y, z, nx, ny, nz and uint8 for red, green, blue. 99% of ply files i've seen is like that, but specification is not that strict (read again the best resource: http://paulbourke.net/dataformats/ply/ )
         
-        # somehow along the way i am getting double dtype, so correct that
-        vs = vs.astype(np.float32)
+        dt = [('x', '<f4', ), ('y', '<f4', ), ('z', '<f4', ), ]
         if(normals):
-            ns = ns.astype(np.float32)
+            dt += [('nx', '<f4', ), ('ny', '<f4', ), ('nz', '<f4', ), ]
         if(colors):
-            # cs = cs.astype(np.float32)
-            
-            if(pcv.export_use_viewport):
-                # viewport colors are in float32 now, back to uint8 colors, loaded data should be in uint8, so no need for conversion
-                cs = cs.astype(np.float32)
-                cs = cs * 255
-                cs = cs.astype(np.uint8)
+            dt += [('red', color_dtype.str, ), ('green', color_dtype.str, ), ('blue', color_dtype.str, ), ]
+        log("dtype: {}".format(dt), 1)
         
         log("write..", 1)
         
-        # combine back to points, using original dtype
-        dt = (('x', vs[0].dtype.str, ),
-              ('y', vs[1].dtype.str, ),
-              ('z', vs[2].dtype.str, ), )
-        if(normals):
-            dt += (('nx', ns[0].dtype.str, ),
-                   ('ny', ns[1].dtype.str, ),
-                   ('nz', ns[2].dtype.str, ), )
-        if(colors):
-            dt += (('red', cs[0].dtype.str, ),
-                   ('green', cs[1].dtype.str, ),
-                   ('blue', cs[2].dtype.str, ), )
-        log("dtype: {}".format(dt), 1)
+        step = pcv.export_chunk_size
+        with BinPlyPointCloudStreamWriter(self.filepath, dt, l, ) as w:
+            a = np.empty(min(step, l), dtype=dt, )
+            for v, n, k in chunks(step):
+                b = a[:len(v)]
+                b['x'] = v[:, 0]
+                b['y'] = v[:, 1]
+                b['z'] = v[:, 2]
+                if(normals):
+                    b['nx'] = n[:, 0]
+                    b['ny'] = n[:, 1]
+                    b['nz'] = n[:, 2]
+                if(colors):
+                    b['red'] = k[:, 0]
+                    b['green'] = k[:, 1]
+                    b['blue'] = k[:, 2]
+                w.write(b)
         
-        l = len(vs)
-        dt = list(dt)
-        a = np.empty(l, dtype=dt, )
-        a['x'] = vs[:, 0]
-        a['y'] = vs[:, 1]
-        a['z'] = vs[:, 2]
-        if(normals):
-            a['nx'] = ns[:, 0]
-            a['ny'] = ns[:, 1]
-            a['nz'] = ns[:, 2]
-        if(colors):
-            a['red'] = cs[:, 0]
-            a['green'] = cs[:, 1]
-            a['blue'] = cs[:, 2]
+        _d = datetime.timedelta(seconds=time.time() - _t)
+        log("completed in {}.".format(_d), 1)
         
-        w = BinPlyPointCloudWriter(self.filepath, a, )
+        return {'FINISHED'}
+
+
+class PCV_OT_export_compact(PCV_OT_export):
+    bl_idname = "point_cloud_visualizer.export_compact"
+    bl_label = "Export PCV"
+    bl_description = "Export point cloud to compact pcv file with quantized positions, normals and colors"
+    
+    filename_ext = ".pcv"
+    filter_glob: StringProperty(default="*.pcv", options={'HIDDEN'}, )
+    check_extension = True
+    
+    def execute(self, context):
+        log("Export Compact:", 0)
+        _t = time.time()
+        
+        pcv = context.object.point_cloud_visualizer
+        l, normals, colors, color_dtype, chunks = self.source(context)
+        step = pcv.export_chunk_size
+        
+        # first pass for bounding box of transformed points, quantization is relative to it
+        log("bounding box..", 1)
+        vmin = np.full(3, np.inf, )
+        vmax = np.full(3, -np.inf, )
+        for v, n, k in chunks(step):
+            if(len(v)):
+                vmin = np.minimum(vmin, v.min(axis=0), )
+                vmax = np.maximum(vmax, v.max(axis=0), )
+        if(l == 0):
+            vmin = vmax = np.zeros(3)
+        
+        log("write..", 1)
+        with PCVCompactStreamWriter(self.filepath, l, vmin, vmax, normals, colors, ) as w:
+            for v, n, k in chunks(step):
+                if(colors):
+                    if(color_dtype == np.uint16):
+                        k = k >> 8
+                    k = np.clip(np.round(k), 0, 255, ).astype(np.uint8)
+                w.write(v, n, k, )
         
         _d = datetime.timedelta(seconds=time.time() - _t)
         log("completed in {}.".format(_d), 1)
@@ -6289,94 +7721,19 @@ class PCV_OT_filter_simplify(Operator):
         
         c = PCVManager.cache[pcv.uuid]
         vs = c['vertices']
-        ns = c['normals']
-        cs = c['colors']
         
         num_samples = pcv.filter_simplify_num_samples
         if(num_samples >= len(vs)):
             self.report({'ERROR'}, "Number of samples must be < number of points.")
             return False, []
         candidates = pcv.filter_simplify_num_candidates
-        log("num_samples: {}, candidates: {}".format(num_samples, candidates), 1)
-        
-        l = len(vs)
-        dt = [('x', '<f8'), ('y', '<f8'), ('z', '<f8'), ('nx', '<f8'), ('ny', '<f8'), ('nz', '<f8'), ('red', '<f8'), ('green', '<f8'), ('blue', '<f8'), ('alpha', '<f8'), ('index', '<i8')]
-        pool = np.empty(l, dtype=dt, )
-        pool['x'] = vs[:, 0]
-        pool['y'] = vs[:, 1]
-        pool['z'] = vs[:, 2]
-        pool['nx'] = ns[:, 0]
-        pool['ny'] = ns[:, 1]
-        pool['nz'] = ns[:, 2]
-        pool['red'] = cs[:, 0]
-        pool['green'] = cs[:, 1]
-        pool['blue'] = cs[:, 2]
-        pool['alpha'] = cs[:, 3]
-        pool['index'] = np.indices((l, ), dtype='<i8', )
-        
-        # to get random points, shuffle pool if not shuffled upon loading
-        preferences = bpy.context.preferences
-        addon_prefs = preferences.addons[__name__].preferences
-        if(not addon_prefs.shuffle_points):
-            np.random.shuffle(pool)
-            # and set indexes again
-            pool['index'] = np.indices((l, ), dtype='<i8', )
+        log("num_samples: {}, candidates: {}, method: {}".format(num_samples, candidates, pcv.filter_simplify_method), 1)
         
-        tree = KDTree(len(pool))
-        samples = np.array(pool[0])
-        last_used = 0
-        # unused_pool = np.empty(0, dtype=dt, )
-        unused_pool = []
-        
-        tree.insert([pool[0]['x'], pool[0]['y'], pool[0]['z']], 0)
-        tree.balance()
-        
-        log("sampling:", 1)
-        use_unused = False
-        prgs = Progress(num_samples - 1, indent=2, prefix="> ")
-        for i in range(num_samples - 1):
-            prgs.step()
-            # choose candidates
-            cands = pool[last_used + 1:last_used + 1 + candidates]
-            
-            if(len(cands) <= 0):
-                # lets pretend that last set of candidates was filled full..
-                use_unused = True
-                cands = unused_pool[:candidates]
-                unused_pool = unused_pool[candidates:]
-            
-            if(len(cands) == 0):
-                # out of candidates, nothing to do here now.. number of desired samples was too close to total of points
-                return True, samples
-            
-            # get the most distant candidate
-            dists = []
-            inds = []
-            for cl in cands:
-                vec, ci, cd = tree.find((cl['x'], cl['y'], cl['z']))
-                inds.append(ci)
-                dists.append(cd)
-            maxd = 0.0
-            maxi = 0
-            for j, d in enumerate(dists):
-                if(d > maxd):
-                    maxd = d
-                    maxi = j
-            # chosen candidate
-            ncp = cands[maxi]
-            # get unused candidates to recycle
-            uncands = np.delete(cands, maxi)
-            # unused_pool = np.append(unused_pool, uncands)
-            unused_pool.extend(uncands)
-            # store accepted sample
-            samples = np.append(samples, ncp)
-            # update kdtree
-            tree.insert([ncp['x'], ncp['y'], ncp['z']], ncp['index'])
-            tree.balance()
-            # use next points
-            last_used += 1 + candidates
-        
-        return True, samples
+        if(pcv.filter_simplify_method == 'VOXEL'):
+            sampler = PCVVoxelSampler(vs, num_samples, )
+        else:
+            sampler = PCVBestCandidateSampler(vs, num_samples, candidates, )
+        return True, sampler.indices
     
     def execute(self, context):
         log("Simplify:", 0)
@@ -6389,7 +7746,7 @@ class PCV_OT_filter_simplify(Operator):
         #     pr = cProfile.Profile()
         #     pr.enable()
         
-        ok, a = self.resample(context)
+        ok, indices = self.resample(context)
         if(not ok):
             return {'CANCELLED'}
         
@@ -6401,15 +7758,13 @@ class PCV_OT_filter_simplify(Operator):
         #     ps.print_stats()
         #     print(s.getvalue())
         
-        vs = np.column_stack((a['x'], a['y'], a['z'], ))
-        ns = np.column_stack((a['nx'], a['ny'], a['nz'], ))
-        cs = np.column_stack((a['red'], a['green'], a['blue'], a['alpha'], ))
-        vs = vs.astype(np.float32)
-        ns = ns.astype(np.float32)
-        cs = cs.astype(np.float32)
+        pcv = context.object.point_cloud_visualizer
+        c = PCVManager.cache[pcv.uuid]
+        vs = np.take(c['vertices'], indices, axis=0, ).astype(np.float32)
+        ns = np.take(c['normals'], indices, axis=0, ).astype(np.float32)
+        cs = np.take(c['colors'], indices, axis=0, ).astype(np.float32)
         
         # put to cache
-        pcv = context.object.point_cloud_visualizer
         PCVManager.update(pcv.uuid, vs, ns, cs, )
         
         _d = datetime.timedelta(seconds=time.time() - _t)
@@ -6418,6 +7773,48 @@ class PCV_OT_filter_simplify(Operator):
         return {'FINISHED'}
 
 
+class PCV_OT_filter_voxel_downsample(Operator):
+    bl_idname = "point_cloud_visualizer.filter_voxel_downsample"
+    bl_label = "Voxel Downsample"
+    bl_description = "Downsample point cloud to one point per voxel of given size with averaged colors and normals, all loaded points are processed"
+    
+    @classmethod
+    def poll(cls, context):
+        if(context.object is None):
+            return False
+        
+        pcv = context.object.point_cloud_visualizer
+        ok = False
+        for k, v in PCVManager.cache.items():
+            if(v['uuid'] == pcv.uuid):
+                if(v['ready']):
+                    if(v['draw']):
+                        ok = True
+        return ok
+    
+    def execute(self, context):
+        log("Voxel Downsample:", 0)
+        _t = time.time()
+        
+        pcv = context.object.point_cloud_visualizer
+        c = PCVManager.cache[pcv.uuid]
+        
+        try:
+            d = PCVVoxelDownsampler(c['vertices'], c['normals'], c['colors'], pcv.filter_voxel_size, pcv.filter_voxel_representative, )
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        log("{} points to {} points".format(len(c['vertices']), len(d.vs)), 1)
+        
+        # put to cache
+        PCVManager.update(pcv.uuid, d.vs, d.ns, d.cs, )
+        
+        _d = datetime.timedelta(seconds=time.time() - _t)
+        log("completed in {}.".format(_d), 1)
+        
+        return {'FINISHED'}
+
+
 class PCV_OT_filter_project(Operator):
     bl_idname = "point_cloud_visualizer.filter_project"
     bl_label = "Project"
@@ -6444,13 +7841,6 @@ class PCV_OT_filter_project(Operator):
         log("Project:", 0)
         _t = time.time()
         
-        # if(debug_mode()):
-        #     import cProfile
-        #     import pstats
-        #     import io
-        #     pr = cProfile.Profile()
-        #     pr.enable()
-        
         log("preprocessing..", 1)
         
         pcv = context.object.point_cloud_visualizer
@@ -6464,96 +7854,43 @@ class PCV_OT_filter_project(Operator):
         ns = c['normals']
         cs = c['colors']
         
-        # apply parent matrix to points
-        def apply_matrix(m, vs, ns=None, ):
-            vs.shape = (-1, 3)
-            vs = np.c_[vs, np.ones(vs.shape[0])]
-            vs = np.dot(m, vs.T)[0:3].T.reshape((-1))
-            vs.shape = (-1, 3)
-            if(ns is not None):
-                _, rot, _ = m.decompose()
-                rmat = rot.to_matrix().to_4x4()
-                ns.shape = (-1, 3)
-                ns = np.c_[ns, np.ones(ns.shape[0])]
-                ns = np.dot(rmat, ns.T)[0:3].T.reshape((-1))
-                ns.shape = (-1, 3)
+        # apply parent matrix to points, normals are only rotated
+        def apply_matrix(m, vs, ns, ):
+            _, rot, _ = m.decompose()
+            mat = np.array(m, dtype=np.float64, )
+            rmat = np.array(rot.to_matrix(), dtype=np.float64, )
+            vs = np.asarray(vs, dtype=np.float64, ) @ mat[:3, :3].T + mat[:3, 3]
+            ns = np.asarray(ns, dtype=np.float64, ) @ rmat.T
             return vs, ns
         
         m = c['object'].matrix_world.copy()
         vs, ns = apply_matrix(m, vs, ns, )
-        vs = vs.astype(np.float32)
-        ns = ns.astype(np.float32)
-        
-        # combine
-        l = len(vs)
-        dt = [('x', '<f8'), ('y', '<f8'), ('z', '<f8'), ('nx', '<f8'), ('ny', '<f8'), ('nz', '<f8'), ('red', '<f8'), ('green', '<f8'), ('blue', '<f8'), ('alpha', '<f8'), ('index', '<i8'), ('delete', '?')]
-        points = np.empty(l, dtype=dt, )
-        points['x'] = vs[:, 0]
-        points['y'] = vs[:, 1]
-        points['z'] = vs[:, 2]
-        points['nx'] = ns[:, 0]
-        points['ny'] = ns[:, 1]
-        points['nz'] = ns[:, 2]
-        points['red'] = cs[:, 0]
-        points['green'] = cs[:, 1]
-        points['blue'] = cs[:, 2]
-        points['alpha'] = cs[:, 3]
-        points['index'] = np.indices((l, ), dtype='<i8', )
-        points['delete'] = np.zeros((l, ), dtype='?', )
         
         search_distance = pcv.filter_project_search_distance
         negative = pcv.filter_project_negative
         positive = pcv.filter_project_positive
         discard = pcv.filter_project_discard
         shift = pcv.filter_project_shift
+        colorize = pcv.filter_project_colorize
+        colorize_from = pcv.filter_project_colorize_from
         
-        sc = context.scene
-        depsgraph = bpy.context.evaluated_depsgraph_get()
+        # target in world space, without adding anything to scene
+        depsgraph = context.evaluated_depsgraph_get()
+        target = PCVMeshTarget(o, depsgraph, )
+        bm = target.bm
         
-        # make target
-        tmp_mesh = o.to_mesh(preserve_all_data_layers=True, depsgraph=depsgraph, )
-        target_mesh = tmp_mesh.copy()
-        target_mesh.name = 'target_mesh_{}'.format(pcv.uuid)
-        target_mesh.transform(o.matrix_world.copy())
-        view_layer = context.view_layer
-        collection = view_layer.active_layer_collection.collection
-        target = bpy.data.objects.new('target_mesh_{}'.format(pcv.uuid), target_mesh)
-        collection.objects.link(target)
-        # TODO use BVHTree for ray_cast without need to add object to scene
-        # still no idea, have to read about it..
-        depsgraph.update()
-        depsgraph = bpy.context.evaluated_depsgraph_get()
-        
-        # this should be None if not available
-        vcols = o.data.vertex_colors.active
-        uvtex = o.data.uv_layers.active
-        vgroup = o.vertex_groups.active
         # now check if color source is available, if not, cancel
-        if(pcv.filter_project_colorize):
-            
-            # depsgraph = context.evaluated_depsgraph_get()
-            # if(o.modifiers):
-            #     owner = o.evaluated_get(depsgraph)
-            #     me = owner.to_mesh(preserve_all_data_layers=True, depsgraph=depsgraph, )
-            # else:
-            #     owner = o
-            #     me = owner.to_mesh(preserve_all_data_layers=True, depsgraph=depsgraph, )
-            
-            bm = bmesh.new()
-            bm.from_mesh(target_mesh)
-            bmesh.ops.triangulate(bm, faces=bm.faces)
-            bm.verts.ensure_lookup_table()
-            bm.faces.ensure_lookup_table()
-            
-            if(pcv.filter_project_colorize_from == 'VCOLS'):
+        if(colorize):
+            if(colorize_from == 'VCOLS'):
                 try:
                     col_layer = bm.loops.layers.color.active
                     if(col_layer is None):
                         raise Exception()
                 except Exception:
+                    target.free()
                     self.report({'ERROR'}, "Cannot find active vertex colors", )
                     return {'CANCELLED'}
-            elif(pcv.filter_project_colorize_from == 'UVTEX'):
+            elif(colorize_from == 'UVTEX'):
                 try:
                     if(o.active_material is None):
                         raise Exception("Cannot find active material")
@@ -6572,222 +7909,102 @@ class PCV_OT_filter_project(Operator):
                     if(uvlayer is None):
                         raise Exception("Cannot find active UV layout")
                 except Exception as e:
+                    target.free()
                     self.report({'ERROR'}, str(e), )
                     return {'CANCELLED'}
-            elif(pcv.filter_project_colorize_from in ['GROUP_MONO', 'GROUP_COLOR', ]):
+            elif(colorize_from in ['GROUP_MONO', 'GROUP_COLOR', ]):
                 try:
                     group_layer = bm.verts.layers.deform.active
                     if(group_layer is None):
                         raise Exception()
                     group_layer_index = o.vertex_groups.active.index
                 except Exception:
+                    target.free()
                     self.report({'ERROR'}, "Cannot find active vertex group", )
                     return {'CANCELLED'}
             else:
+                target.free()
                 self.report({'ERROR'}, "Unsupported color source", )
                 return {'CANCELLED'}
         
-        def distance(a, b, ):
-            return ((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2) ** 0.5
-        
-        def shift_vert_along_normal(co, no, v):
-            c = Vector(co)
-            n = Vector(no)
-            return c + (n.normalized() * v)
-        
-        def remap(v, min1, max1, min2, max2, ):
-            def clamp(v, vmin, vmax):
-                if(vmax <= vmin):
-                    raise ValueError("Maximum value is smaller than or equal to minimum.")
-                if(v <= vmin):
-                    return vmin
-                if(v >= vmax):
-                    return vmax
-                return v
-            
-            def normalize(v, vmin, vmax):
-                return (v - vmin) / (vmax - vmin)
-            
-            def interpolate(nv, vmin, vmax):
-                return vmin + (vmax - vmin) * nv
-            
-            if(max1 - min1 == 0):
-                # handle zero division when min1 = max1
-                return min2
-            
-            r = interpolate(normalize(v, min1, max1), min2, max2)
-            return r
-        
-        def gen_color(bm, result, location, normal, index, distance, ):
-            col = (0.0, 0.0, 0.0, )
-            
-            poly = bm.faces[index]
-            v = location
-            
-            if(pcv.filter_project_colorize_from == 'VCOLS'):
-                ws = poly_3d_calc([poly.verts[0].co, poly.verts[1].co, poly.verts[2].co, ], v)
-                ac = poly.loops[0][col_layer][:3]
-                bc = poly.loops[1][col_layer][:3]
-                cc = poly.loops[2][col_layer][:3]
-                r = ac[0] * ws[0] + bc[0] * ws[1] + cc[0] * ws[2]
-                g = ac[1] * ws[0] + bc[1] * ws[1] + cc[1] * ws[2]
-                b = ac[2] * ws[0] + bc[2] * ws[1] + cc[2] * ws[2]
-                col = (r, g, b, )
-            elif(pcv.filter_project_colorize_from == 'UVTEX'):
-                uvtriangle = []
-                for l in poly.loops:
-                    uvtriangle.append(Vector(l[uvlayer].uv.to_tuple() + (0.0, )))
-                uvpoint = barycentric_transform(v, poly.verts[0].co, poly.verts[1].co, poly.verts[2].co, *uvtriangle, )
+        def barycentric(tris, ps, ):
+            # weights of points in triangles (n, 3, 3), same as poly_3d_calc for points on triangle
+            a = tris[:, 0]
+            v0 = tris[:, 1] - a
+            v1 = tris[:, 2] - a
+            v2 = ps - a
+            d00 = np.einsum('ij,ij->i', v0, v0, )
+            d01 = np.einsum('ij,ij->i', v0, v1, )
+            d11 = np.einsum('ij,ij->i', v1, v1, )
+            d20 = np.einsum('ij,ij->i', v2, v0, )
+            d21 = np.einsum('ij,ij->i', v2, v1, )
+            denom = d00 * d11 - d01 * d01
+            denom[denom == 0.0] = 1.0
+            wb = (d11 * d20 - d01 * d21) / denom
+            wc = (d00 * d21 - d01 * d20) / denom
+            return np.column_stack((1.0 - wb - wc, wb, wc, ))
+        
+        def gen_colors(faces, locations, ):
+            # per face values are collected once, then looked up and interpolated for all points at once
+            tris = np.array([[v.co.to_tuple() for v in f.verts] for f in bm.faces], dtype=np.float64, )
+            ws = barycentric(tris[faces], locations, )
+            if(colorize_from == 'VCOLS'):
+                fc = np.array([[l[col_layer][:3] for l in f.loops] for f in bm.faces], dtype=np.float64, )
+                return np.einsum('ij,ijk->ik', ws, fc[faces], )
+            elif(colorize_from == 'UVTEX'):
+                fuv = np.array([[l[uvlayer].uv[:] for l in f.loops] for f in bm.faces], dtype=np.float64, )
+                uv = np.einsum('ij,ijk->ik', ws, fuv[faces], )
                 w, h = uvimage.size
                 # x,y % 1.0 to wrap around if uv coordinate is outside 0.0-1.0 range
-                x = int(round(remap(uvpoint.x % 1.0, 0.0, 1.0, 0, w - 1)))
-                y = int(round(remap(uvpoint.y % 1.0, 0.0, 1.0, 0, h - 1)))
-                col = tuple(uvarray[y][x][:3].tolist())
-            elif(pcv.filter_project_colorize_from == 'GROUP_MONO'):
-                ws = poly_3d_calc([poly.verts[0].co, poly.verts[1].co, poly.verts[2].co, ], v)
-                aw = poly.verts[0][group_layer].get(group_layer_index, 0.0)
-                bw = poly.verts[1][group_layer].get(group_layer_index, 0.0)
-                cw = poly.verts[2][group_layer].get(group_layer_index, 0.0)
-                m = aw * ws[0] + bw * ws[1] + cw * ws[2]
-                col = (m, m, m, )
-            elif(pcv.filter_project_colorize_from == 'GROUP_COLOR'):
-                ws = poly_3d_calc([poly.verts[0].co, poly.verts[1].co, poly.verts[2].co, ], v)
-                aw = poly.verts[0][group_layer].get(group_layer_index, 0.0)
-                bw = poly.verts[1][group_layer].get(group_layer_index, 0.0)
-                cw = poly.verts[2][group_layer].get(group_layer_index, 0.0)
-                m = aw * ws[0] + bw * ws[1] + cw * ws[2]
-                hue = remap(1.0 - m, 0.0, 1.0, 0.0, 1 / 1.5)
-                c = Color()
-                c.hsv = (hue, 1.0, 1.0, )
-                col = (c.r, c.g, c.b, )
-            
-            return col
-        
-        a = np.empty(l, dtype=dt, )
+                x = np.round((uv[:, 0] % 1.0) * (w - 1)).astype(np.int64)
+                y = np.round((uv[:, 1] % 1.0) * (h - 1)).astype(np.int64)
+                return uvarray[y, x, :3]
+            fw = np.array([[v[group_layer].get(group_layer_index, 0.0) for v in f.verts] for f in bm.faces], dtype=np.float64, )
+            m = np.einsum('ij,ij->i', ws, fw[faces], )
+            if(colorize_from == 'GROUP_MONO'):
+                return np.column_stack((m, m, m, ))
+            # hue from red (1.0) to blue (0.0), full saturation and value
+            hue = (1.0 - m) / 1.5
+            h6 = hue[:, None] * 6.0
+            return np.clip(np.column_stack((np.abs(h6 - 3.0) - 1.0, 2.0 - np.abs(h6 - 2.0), 2.0 - np.abs(h6 - 4.0), )), 0.0, 1.0, )
         
         log("projecting:", 1)
-        prgr = Progress(len(points), 2)
-        for i, p in enumerate(points):
-            prgr.step()
-            
-            v = Vector((p['x'], p['y'], p['z'], ))
-            n = Vector((p['nx'], p['ny'], p['nz'], ))
-            
-            if(positive):
-                p_result, p_location, p_normal, p_index = target.ray_cast(v, n, distance=search_distance, depsgraph=depsgraph, )
-                p_distance = None
-                if(p_result):
-                    p_distance = distance(p_location, v[:])
-            else:
-                p_result = False
-            
-            nn = shift_vert_along_normal(v, n, -search_distance)
-            ndir = Vector(nn - v).normalized()
-            
-            if(negative):
-                n_result, n_location, n_normal, n_index = target.ray_cast(v, ndir, distance=search_distance, depsgraph=depsgraph, )
-                n_distance = None
-                if(n_result):
-                    n_distance = distance(n_location, v[:])
-            else:
-                n_result = False
-            
-            rp = np.copy(p)
-            
-            # store ray_cast results which was used for current point and pass them to gen_color
-            used = None
-            
-            if(p_result and n_result):
-                if(p_distance < n_distance):
-                    rp['x'] = p_location[0]
-                    rp['y'] = p_location[1]
-                    rp['z'] = p_location[2]
-                    used = (p_result, p_location, p_normal, p_index, p_distance)
-                else:
-                    rp['x'] = n_location[0]
-                    rp['y'] = n_location[1]
-                    rp['z'] = n_location[2]
-                    used = (n_result, n_location, n_normal, n_index, n_distance)
-            elif(p_result):
-                rp['x'] = p_location[0]
-                rp['y'] = p_location[1]
-                rp['z'] = p_location[2]
-                used = (p_result, p_location, p_normal, p_index, p_distance)
-            elif(n_result):
-                rp['x'] = n_location[0]
-                rp['y'] = n_location[1]
-                rp['z'] = n_location[2]
-                used = (n_result, n_location, n_normal, n_index, n_distance)
-            else:
-                rp['delete'] = 1
-            
-            if(pcv.filter_project_colorize):
-                if(used is not None):
-                    col = gen_color(bm, *used)
-                    rp['red'] = col[0]
-                    rp['green'] = col[1]
-                    rp['blue'] = col[2]
+        try:
+            r = PCVMeshProjector(target, vs, ns, search_distance, positive, negative, )
+            vs = r.locations
+            hit = r.hit
             
-            a[i] = rp
+            cs = np.array(cs, dtype=np.float32, )
+            if(colorize and np.any(hit)):
+                cs[hit, :3] = gen_colors(r.faces[hit], vs[hit], )
+        finally:
+            target.free()
         
         if(discard):
-            log("discarding:", 1)
-            prgr = Progress(len(a), 2)
-            indexes = []
-            for i in a:
-                prgr.step()
-                if(i['delete']):
-                    indexes.append(i['index'])
-            a = np.delete(a, indexes)
+            log("discarding: {} points".format(np.count_nonzero(~hit)), 1)
+            vs = vs[hit]
+            ns = ns[hit]
+            cs = cs[hit]
         
         if(shift != 0.0):
-            log("shifting:", 1)
-            prgr = Progress(len(a), 2)
-            for i in a:
-                prgr.step()
-                l = shift_vert_along_normal((i['x'], i['y'], i['z'], ), (i['nx'], i['ny'], i['nz'], ), shift, )
-                i['x'] = l[0]
-                i['y'] = l[1]
-                i['z'] = l[2]
+            log("shifting..", 1)
+            d = np.linalg.norm(ns, axis=1, )
+            d[d == 0.0] = 1.0
+            vs = vs + ns / d[:, None] * shift
         
         log("postprocessing..", 1)
-        # split back
-        vs = np.column_stack((a['x'], a['y'], a['z'], ))
-        ns = np.column_stack((a['nx'], a['ny'], a['nz'], ))
-        cs = np.column_stack((a['red'], a['green'], a['blue'], a['alpha'], ))
-        vs = vs.astype(np.float32)
-        ns = ns.astype(np.float32)
-        cs = cs.astype(np.float32)
-        
         # unapply parent matrix to points
         m = c['object'].matrix_world.copy()
         m = m.inverted()
-        vs, ns = apply_matrix(m, vs, ns, )
-        vs = vs.astype(np.float32)
-        ns = ns.astype(np.float32)
-        
-        # cleanup
-        if(pcv.filter_project_colorize):
-            bm.free()
-            # owner.to_mesh_clear()
-        
-        collection.objects.unlink(target)
-        bpy.data.objects.remove(target)
-        bpy.data.meshes.remove(target_mesh)
-        o.to_mesh_clear()
+        vs, ns = apply_matrix(m, vs, ns, )
+        vs = vs.astype(np.float32)
+        ns = ns.astype(np.float32)
+        cs = cs.astype(np.float32)
         
         # put to cache..
         pcv = context.object.point_cloud_visualizer
         PCVManager.update(pcv.uuid, vs, ns, cs, )
         
-        # if(debug_mode()):
-        #     pr.disable()
-        #     s = io.StringIO()
-        #     sortby = 'cumulative'
-        #     ps = pstats.Stats(pr, stream=s).sort_stats(sortby)
-        #     ps.print_stats()
-        #     print(s.getvalue())
-        
         _d = datetime.timedelta(seconds=time.time() - _t)
         log("completed in {}.".format(_d), 1)
         
@@ -6813,6 +8030,51 @@ class PCV_OT_filter_remove_color(Operator):
                         ok = True
         return ok
     
+    @staticmethod
+    def rgb_to_hsv(rgb, ):
+        """Vectorized rgb to hsv, rgb is float array (n, 3), returns h, s, v arrays, hue in 0.0-1.0"""
+        r = rgb[:, 0]
+        g = rgb[:, 1]
+        b = rgb[:, 2]
+        v = np.max(rgb, axis=1, )
+        chroma = v - np.min(rgb, axis=1, )
+        s = np.where(v > 0, chroma / np.where(v > 0, v, 1.0, ), 0.0, )
+        c = np.where(chroma > 0, chroma, 1.0, )
+        # hue sextant by channel with maximum value, gray has zero hue
+        h = np.where(v == r, ((g - b) / c) % 6, np.where(v == g, (b - r) / c + 2, (r - g) / c + 4, ), )
+        h = np.where(chroma > 0, h / 6, 0.0, )
+        return h, s, v
+    
+    @classmethod
+    def select(cls, cs, color, dh, ds, dv, uh, us, uv, chunk_size=2 ** 20, ):
+        """Indices of points with color same as color (rounded to 5 decimals) or within enabled hue (circular), saturation and value windows, evaluated in chunks"""
+        rm = np.array(color, dtype=np.float64, ).reshape(1, 3)
+        rh, rs, rv = (a[0] for a in cls.rgb_to_hsv(rm))
+        rm = np.round(rm, 5, )
+        
+        indexes = []
+        prgr = Progress(len(cs), 1)
+        for i in range(0, len(cs), chunk_size):
+            rgb = np.asarray(cs[i:i + chunk_size, :3], dtype=np.float64, )
+            # check for more or less same color, a few decimals should be more than enough, ply should have 8bit colors
+            m = np.all(np.round(rgb, 5, ) == rm, axis=1, )
+            if(uh or us or uv):
+                h, s, v = cls.rgb_to_hsv(rgb)
+                w = np.ones(len(rgb), dtype=bool, )
+                if(uh):
+                    d = np.abs(rh - h)
+                    w &= np.minimum(d, 1.0 - d, ) <= dh
+                if(us):
+                    w &= (rs - ds < s) & (s < rs + ds)
+                if(uv):
+                    w &= (rv - dv < v) & (v < rv + dv)
+                m |= w
+            indexes.append(np.flatnonzero(m) + i)
+            prgr.step(len(rgb))
+        if(not len(indexes)):
+            return np.zeros(0, dtype=np.int64, )
+        return np.concatenate(indexes)
+    
     def execute(self, context):
         log("Remove Color:", 0)
         _t = time.time()
@@ -6820,33 +8082,12 @@ class PCV_OT_filter_remove_color(Operator):
         pcv = context.object.point_cloud_visualizer
         # cache item
         c = PCVManager.cache[pcv.uuid]
-        vs = c['vertices']
-        ns = c['normals']
         cs = c['colors']
-        # join to indexed points
-        l = len(vs)
-        dt = [('x', '<f8'), ('y', '<f8'), ('z', '<f8'), ('nx', '<f8'), ('ny', '<f8'), ('nz', '<f8'), ('red', '<f8'), ('green', '<f8'), ('blue', '<f8'), ('alpha', '<f8'), ('index', '<i8')]
-        points = np.empty(l, dtype=dt, )
-        points['x'] = vs[:, 0]
-        points['y'] = vs[:, 1]
-        points['z'] = vs[:, 2]
-        points['nx'] = ns[:, 0]
-        points['ny'] = ns[:, 1]
-        points['nz'] = ns[:, 2]
-        points['red'] = cs[:, 0]
-        points['green'] = cs[:, 1]
-        points['blue'] = cs[:, 2]
-        points['alpha'] = cs[:, 3]
-        points['index'] = np.indices((l, ), dtype='<i8', )
-        
-        # evaluate
-        indexes = []
         
         # black magic..
-        c = [c ** (1 / 2.2) for c in pcv.filter_remove_color]
-        c = [int(i * 256) for i in c]
-        c = [i / 256 for i in c]
-        rmcolor = Color(c)
+        rmcolor = [c ** (1 / 2.2) for c in pcv.filter_remove_color]
+        rmcolor = [int(i * 256) for i in rmcolor]
+        rmcolor = [i / 256 for i in rmcolor]
         
         # take half of the value because 1/2 <- v -> 1/2, plus and minus => full range
         dh = pcv.filter_remove_color_delta_hue / 2
@@ -6857,62 +8098,7 @@ class PCV_OT_filter_remove_color(Operator):
         us = pcv.filter_remove_color_delta_saturation_use
         uv = pcv.filter_remove_color_delta_value_use
         
-        prgr = Progress(len(points), 1)
-        for p in points:
-            prgr.step()
-            # get point color
-            c = Color((p['red'], p['green'], p['blue']))
-            # check for more or less same color, a few decimals should be more than enough, ply should have 8bit colors
-            fpr = 5
-            same = (round(c.r, fpr) == round(rmcolor.r, fpr),
-                    round(c.g, fpr) == round(rmcolor.g, fpr),
-                    round(c.b, fpr) == round(rmcolor.b, fpr))
-            if(all(same)):
-                indexes.append(p['index'])
-                continue
-            
-            # check
-            h = False
-            s = False
-            v = False
-            if(uh):
-                rm_hue = rmcolor.h
-                hd = min(abs(rm_hue - c.h), 1.0 - abs(rm_hue - c.h))
-                if(hd <= dh):
-                    h = True
-            if(us):
-                if(rmcolor.s - ds < c.s < rmcolor.s + ds):
-                    s = True
-            if(uv):
-                if(rmcolor.v - dv < c.v < rmcolor.v + dv):
-                    v = True
-            
-            a = False
-            if(uh and not us and not uv):
-                if(h):
-                    a = True
-            elif(not uh and us and not uv):
-                if(s):
-                    a = True
-            elif(not uh and not us and uv):
-                if(v):
-                    a = True
-            elif(uh and us and not uv):
-                if(h and s):
-                    a = True
-            elif(not uh and us and uv):
-                if(s and v):
-                    a = True
-            elif(uh and not us and uv):
-                if(h and v):
-                    a = True
-            elif(uh and us and uv):
-                if(h and s and v):
-                    a = True
-            else:
-                pass
-            if(a):
-                indexes.append(p['index'])
+        indexes = self.select(cs, rmcolor, dh, ds, dv, uh, us, uv, )
         
         log("selected: {} points".format(len(indexes)), 1)
         
@@ -6922,6 +8108,7 @@ class PCV_OT_filter_remove_color(Operator):
         else:
             pcv.filter_remove_color_selection = True
             c = PCVManager.cache[pcv.uuid]
+            # sorted index array
             c['selection_indexes'] = indexes
         
         context.area.tag_redraw()
@@ -7232,7 +8419,7 @@ class PCV_OT_filter_merge(Operator):
     bl_description = "Merge with other ply file"
     
     filename_ext = ".ply"
-    filter_glob: StringProperty(default="*.ply", options={'HIDDEN'}, )
+    filter_glob: StringProperty(default="*.ply;*.pcv", options={'HIDDEN'}, )
     filepath: StringProperty(name="File Path", default="", description="", maxlen=1024, subtype='FILE_PATH', )
     order = ["filepath", ]
     
@@ -7260,13 +8447,13 @@ class PCV_OT_filter_merge(Operator):
         filepath = self.filepath
         h, t = os.path.split(filepath)
         n, e = os.path.splitext(t)
-        if(e != '.ply'):
+        if(e.lower() not in ('.ply', '.pcv', )):
             self.report({'ERROR'}, "File at '{}' seems not to be a PLY file.".format(filepath))
             return {'CANCELLED'}
         
         points = []
         try:
-            points = PlyPointCloudReader(filepath).points
+            points = read_points(filepath)
         except Exception as e:
             self.report({'ERROR'}, str(e))
             return {'CANCELLED'}
@@ -7485,194 +8672,42 @@ class PCV_OT_filter_boolean_intersect(Operator):
                                 ok = True
         return ok
     
-    def execute(self, context):
-        log("Intersect:", 0)
-        _t = time.time()
-        
+    def inside(self, context, ):
         pcv = context.object.point_cloud_visualizer
         o = pcv.filter_boolean_object
         if(o is None):
             raise Exception()
         
-        def apply_matrix(vs, ns, matrix, ):
-            matrot = matrix.decompose()[1].to_matrix().to_4x4()
-            dtv = vs.dtype
-            dtn = ns.dtype
-            rvs = np.zeros(vs.shape, dtv)
-            rns = np.zeros(ns.shape, dtn)
-            for i in range(len(vs)):
-                co = matrix @ Vector(vs[i])
-                no = matrot @ Vector(ns[i])
-                rvs[i] = np.array(co.to_tuple(), dtv)
-                rns[i] = np.array(no.to_tuple(), dtn)
-            return rvs, rns
-        
         c = PCVManager.cache[pcv.uuid]
-        vs = c['vertices']
-        ns = c['normals']
-        cs = c['colors']
-        
-        # apply parent matrix to points
+        # target mesh in point cloud space, so points can stay as they are
         m = c['object'].matrix_world.copy()
-        # vs, ns = apply_matrix(vs, ns, m)
-        
-        sc = context.scene
-        depsgraph = bpy.context.evaluated_depsgraph_get()
-        # make target
-        tmp_mesh = o.to_mesh(preserve_all_data_layers=True, depsgraph=depsgraph, )
-        target_mesh = tmp_mesh.copy()
-        target_mesh.name = 'target_mesh_{}'.format(pcv.uuid)
-        target_mesh.transform(o.matrix_world.copy())
-        target_mesh.transform(m.inverted())
-        view_layer = context.view_layer
-        collection = view_layer.active_layer_collection.collection
-        target = bpy.data.objects.new('target_mesh_{}'.format(pcv.uuid), target_mesh)
-        collection.objects.link(target)
-        # still no idea, have to read about it..
-        depsgraph.update()
-        depsgraph = bpy.context.evaluated_depsgraph_get()
-        
-        # use object bounding box for fast check if point can even be inside/outside of mesh and then use ray casting etc..
-        bounds = [bv[:] for bv in target.bound_box]
-        xmin = min([v[0] for v in bounds])
-        xmax = max([v[0] for v in bounds])
-        ymin = min([v[1] for v in bounds])
-        ymax = max([v[1] for v in bounds])
-        zmin = min([v[2] for v in bounds])
-        zmax = max([v[2] for v in bounds])
-        
-        def is_in_bound_box(v):
-            x = False
-            if(xmin < v[0] < xmax):
-                x = True
-            y = False
-            if(ymin < v[1] < ymax):
-                y = True
-            z = False
-            if(zmin < v[2] < zmax):
-                z = True
-            if(x and y and z):
-                return True
-            return False
-        
-        # v1 raycasting in three axes and counting hits
-        def is_point_inside_mesh_v1(p, o, ):
-            axes = [Vector((1.0, 0.0, 0.0)), Vector((0.0, 1.0, 0.0)), Vector((0.0, 0.0, 1.0)), ]
-            r = False
-            for a in axes:
-                v = p
-                c = 0
-                while True:
-                    _, l, n, i = o.ray_cast(v, v + a * 10000.0)
-                    if(i == -1):
-                        break
-                    c += 1
-                    v = l + a * 0.00001
-                if(c % 2 == 0):
-                    r = True
-                    break
-            return not r
-        
-        # v2 raycasting and counting hits
-        def is_point_inside_mesh_v2(p, o, shift=0.000001, search_distance=10000.0, ):
-            p = Vector(p)
-            path = []
-            hits = 0
-            direction = Vector((0.0, 0.0, 1.0))
-            opposite_direction = direction.copy()
-            opposite_direction.negate()
-            path.append(p)
-            loc = p
-            ok = True
-            
-            def shift_vector(co, no, v):
-                return co + (no.normalized() * v)
-            
-            while(ok):
-                end = shift_vector(loc, direction, search_distance)
-                loc = shift_vector(loc, direction, shift)
-                _, loc, nor, ind = o.ray_cast(loc, end)
-                if(ind != -1):
-                    a = shift_vector(loc, opposite_direction, shift)
-                    path.append(a)
-                    hits += 1
-                else:
-                    ok = False
-            if(hits % 2 == 1):
-                return True
-            return False
-        
-        # v3 closest point on mesh normal checking
-        def is_point_inside_mesh_v3(p, o, ):
-            _, loc, nor, ind = o.closest_point_on_mesh(p)
-            if(ind != -1):
-                v = loc - p
-                d = v.dot(nor)
-                if(d >= 0):
-                    return True
-            return False
-        
-        # if(debug_mode()):
-        #     import cProfile
-        #     import pstats
-        #     import io
-        #     pr = cProfile.Profile()
-        #     pr.enable()
-        
-        indexes = []
-        prgs = Progress(len(vs), indent=1, prefix="> ")
-        for i, v in enumerate(vs):
-            prgs.step()
-            vv = Vector(v)
-            '''
-            inside1 = is_point_inside_mesh_v1(vv, target, )
-            inside2 = is_point_inside_mesh_v2(vv, target, )
-            inside3 = is_point_inside_mesh_v3(vv, target, )
-            # intersect
-            if(not inside1 and not inside2 and not inside3):
-                indexes.append(i)
-            # # exclude
-            # if(inside1 and inside2 and inside3):
-            #     indexes.append(i)
-            '''
-            
-            in_bb = is_in_bound_box(v)
-            if(not in_bb):
-                # is not in bounds i can skip completely
-                indexes.append(i)
-                continue
-            
-            inside3 = is_point_inside_mesh_v3(vv, target, )
-            if(not inside3):
-                indexes.append(i)
-        
-        # if(debug_mode()):
-        #     pr.disable()
-        #     s = io.StringIO()
-        #     sortby = 'cumulative'
-        #     ps = pstats.Stats(pr, stream=s).sort_stats(sortby)
-        #     ps.print_stats()
-        #     print(s.getvalue())
-        
+        depsgraph = context.evaluated_depsgraph_get()
+        target = PCVMeshTarget(o, depsgraph, m.inverted(), )
+        try:
+            r = PCVMeshContainment(target, c['vertices'], )
+        finally:
+            target.free()
+        return r.inside
+    
+    def remove(self, context, mask, ):
+        pcv = context.object.point_cloud_visualizer
         c = PCVManager.cache[pcv.uuid]
-        vs = c['vertices']
-        ns = c['normals']
-        cs = c['colors']
-        vs = np.delete(vs, indexes, axis=0, )
-        ns = np.delete(ns, indexes, axis=0, )
-        cs = np.delete(cs, indexes, axis=0, )
-        
-        log("removed: {} points".format(len(indexes)), 1)
+        keep = ~mask
+        vs = c['vertices'][keep]
+        ns = c['normals'][keep]
+        cs = c['colors'][keep]
         
-        # cleanup
-        collection.objects.unlink(target)
-        bpy.data.objects.remove(target)
-        bpy.data.meshes.remove(target_mesh)
-        o.to_mesh_clear()
+        log("removed: {} points".format(np.count_nonzero(mask)), 1)
         
         # put to cache..
-        pcv = context.object.point_cloud_visualizer
         PCVManager.update(pcv.uuid, vs, ns, cs, )
+    
+    def execute(self, context):
+        log("Intersect:", 0)
+        _t = time.time()
+        
+        inside = self.inside(context)
+        self.remove(context, ~inside, )
         
         _d = datetime.timedelta(seconds=time.time() - _t)
         log("completed in {}.".format(_d), 1)
@@ -7680,205 +8715,17 @@ class PCV_OT_filter_boolean_intersect(Operator):
         return {'FINISHED'}
 
 
-class PCV_OT_filter_boolean_exclude(Operator):
+class PCV_OT_filter_boolean_exclude(PCV_OT_filter_boolean_intersect):
     bl_idname = "point_cloud_visualizer.filter_boolean_exclude"
     bl_label = "Exclude"
     bl_description = ""
     
-    @classmethod
-    def poll(cls, context):
-        if(context.object is None):
-            return False
-        
-        pcv = context.object.point_cloud_visualizer
-        ok = False
-        for k, v in PCVManager.cache.items():
-            if(v['uuid'] == pcv.uuid):
-                if(v['ready']):
-                    if(v['draw']):
-                        o = pcv.filter_boolean_object
-                        if(o is not None):
-                            if(o.type in ('MESH', 'CURVE', 'SURFACE', 'FONT', )):
-                                ok = True
-        return ok
-    
     def execute(self, context):
         log("Exclude:", 0)
         _t = time.time()
         
-        pcv = context.object.point_cloud_visualizer
-        o = pcv.filter_boolean_object
-        if(o is None):
-            raise Exception()
-        
-        def apply_matrix(vs, ns, matrix, ):
-            matrot = matrix.decompose()[1].to_matrix().to_4x4()
-            dtv = vs.dtype
-            dtn = ns.dtype
-            rvs = np.zeros(vs.shape, dtv)
-            rns = np.zeros(ns.shape, dtn)
-            for i in range(len(vs)):
-                co = matrix @ Vector(vs[i])
-                no = matrot @ Vector(ns[i])
-                rvs[i] = np.array(co.to_tuple(), dtv)
-                rns[i] = np.array(no.to_tuple(), dtn)
-            return rvs, rns
-        
-        c = PCVManager.cache[pcv.uuid]
-        vs = c['vertices']
-        ns = c['normals']
-        cs = c['colors']
-        
-        # apply parent matrix to points
-        m = c['object'].matrix_world.copy()
-        # vs, ns = apply_matrix(vs, ns, m)
-        
-        sc = context.scene
-        depsgraph = bpy.context.evaluated_depsgraph_get()
-        # make target
-        tmp_mesh = o.to_mesh(preserve_all_data_layers=True, depsgraph=depsgraph, )
-        target_mesh = tmp_mesh.copy()
-        target_mesh.name = 'target_mesh_{}'.format(pcv.uuid)
-        target_mesh.transform(o.matrix_world.copy())
-        target_mesh.transform(m.inverted())
-        view_layer = context.view_layer
-        collection = view_layer.active_layer_collection.collection
-        target = bpy.data.objects.new('target_mesh_{}'.format(pcv.uuid), target_mesh)
-        collection.objects.link(target)
-        # still no idea, have to read about it..
-        depsgraph.update()
-        depsgraph = bpy.context.evaluated_depsgraph_get()
-        
-        # use object bounding box for fast check if point can even be inside/outside of mesh and then use ray casting etc..
-        bounds = [bv[:] for bv in target.bound_box]
-        xmin = min([v[0] for v in bounds])
-        xmax = max([v[0] for v in bounds])
-        ymin = min([v[1] for v in bounds])
-        ymax = max([v[1] for v in bounds])
-        zmin = min([v[2] for v in bounds])
-        zmax = max([v[2] for v in bounds])
-        
-        def is_in_bound_box(v):
-            x = False
-            if(xmin < v[0] < xmax):
-                x = True
-            y = False
-            if(ymin < v[1] < ymax):
-                y = True
-            z = False
-            if(zmin < v[2] < zmax):
-                z = True
-            if(x and y and z):
-                return True
-            return False
-        
-        # v1 raycasting in three axes and counting hits
-        def is_point_inside_mesh_v1(p, o, ):
-            axes = [Vector((1.0, 0.0, 0.0)), Vector((0.0, 1.0, 0.0)), Vector((0.0, 0.0, 1.0)), ]
-            r = False
-            for a in axes:
-                v = p
-                c = 0
-                while True:
-                    _, l, n, i = o.ray_cast(v, v + a * 10000.0)
-                    if(i == -1):
-                        break
-                    c += 1
-                    v = l + a * 0.00001
-                if(c % 2 == 0):
-                    r = True
-                    break
-            return not r
-        
-        # v2 raycasting and counting hits
-        def is_point_inside_mesh_v2(p, o, shift=0.000001, search_distance=10000.0, ):
-            p = Vector(p)
-            path = []
-            hits = 0
-            direction = Vector((0.0, 0.0, 1.0))
-            opposite_direction = direction.copy()
-            opposite_direction.negate()
-            path.append(p)
-            loc = p
-            ok = True
-            
-            def shift_vector(co, no, v):
-                return co + (no.normalized() * v)
-            
-            while(ok):
-                end = shift_vector(loc, direction, search_distance)
-                loc = shift_vector(loc, direction, shift)
-                _, loc, nor, ind = o.ray_cast(loc, end)
-                if(ind != -1):
-                    a = shift_vector(loc, opposite_direction, shift)
-                    path.append(a)
-                    hits += 1
-                else:
-                    ok = False
-            if(hits % 2 == 1):
-                return True
-            return False
-        
-        # v3 closest point on mesh normal checking
-        def is_point_inside_mesh_v3(p, o, ):
-            _, loc, nor, ind = o.closest_point_on_mesh(p)
-            if(ind != -1):
-                v = loc - p
-                d = v.dot(nor)
-                if(d >= 0):
-                    return True
-            return False
-        
-        indexes = []
-        prgs = Progress(len(vs), indent=1, prefix="> ")
-        for i, v in enumerate(vs):
-            prgs.step()
-            vv = Vector(v)
-            '''
-            inside1 = is_point_inside_mesh_v1(vv, target, )
-            inside2 = is_point_inside_mesh_v2(vv, target, )
-            inside3 = is_point_inside_mesh_v3(vv, target, )
-            # # intersect
-            # if(not inside1 and not inside2 and not inside3):
-            #     indexes.append(i)
-            # exclude
-            if(inside1 and inside2 and inside3):
-                indexes.append(i)
-            '''
-            
-            in_bb = is_in_bound_box(v)
-            if(in_bb):
-                # indexes.append(i)
-                # continue
-                
-                # is in bound so i can check further
-                inside3 = is_point_inside_mesh_v3(vv, target, )
-                if(inside3):
-                    indexes.append(i)
-            
-            # inside3 = is_point_inside_mesh_v3(vv, target, )
-            # if(inside3):
-            #     indexes.append(i)
-        
-        c = PCVManager.cache[pcv.uuid]
-        vs = c['vertices']
-        ns = c['normals']
-        cs = c['colors']
-        vs = np.delete(vs, indexes, axis=0, )
-        ns = np.delete(ns, indexes, axis=0, )
-        cs = np.delete(cs, indexes, axis=0, )
-        
-        log("removed: {} points".format(len(indexes)), 1)
-        
-        # cleanup
-        collection.objects.unlink(target)
-        bpy.data.objects.remove(target)
-        bpy.data.meshes.remove(target_mesh)
-        o.to_mesh_clear()
-        
-        # put to cache..
-        pcv = context.object.point_cloud_visualizer
-        PCVManager.update(pcv.uuid, vs, ns, cs, )
+        inside = self.inside(context)
+        self.remove(context, inside, )
         
         _d = datetime.timedelta(seconds=time.time() - _t)
         log("completed in {}.".format(_d), 1)
@@ -7932,7 +8779,7 @@ class PCV_OT_reload(Operator):
 class PCV_OT_sequence_preload(Operator):
     bl_idname = "point_cloud_visualizer.sequence_preload"
     bl_label = "Preload Sequence"
-    bl_description = "Preload sequence of PLY files. Files should be numbered starting at 1. Missing files in sequence will be skipped."
+    bl_description = "Preload sequence of PLY files. Files should be numbered starting at 1. Missing files in sequence will be skipped. Frames are loaded on demand during playback and kept within cache size."
     
     @classmethod
     def poll(cls, context):
@@ -7962,7 +8809,7 @@ class PCV_OT_sequence_preload(Operator):
             files.extend(fs)
             break
         
-        fs = [f for f in files if f.lower().endswith('.ply')]
+        fs = [f for f in files if f.lower().endswith(('.ply', '.pcv', ))]
         f = os.path.split(pcv.filepath)[1]
         
         pattern = re.compile(r'(\d+)(?!.*(\d+))')
@@ -8010,45 +8857,15 @@ class PCV_OT_sequence_preload(Operator):
         for i, n in sequence:
             log('{}: {}'.format(i, n), 2)
         
-        log('preloading..', 1)
-        # this is our sequence with matching filenames, sorted by numbers with missing as None, now load it all..
+        log('indexing..', 1)
+        # this is our sequence with matching filenames, sorted by numbers with missing as None, frames are loaded on demand during playback..
         cache = []
         for i, n in sequence:
             if(n is not None):
                 p = os.path.join(dirpath, n)
-                points = []
-                try:
-                    points = PlyPointCloudReader(p).points
-                except Exception as e:
-                    self.report({'ERROR'}, str(e))
-                if(len(points) == 0):
-                    self.report({'ERROR'}, "No vertices loaded from file at {}".format(p))
-                else:
-                    if(not set(('x', 'y', 'z')).issubset(points.dtype.names)):
-                        self.report({'ERROR'}, "Loaded data seems to miss vertex locations.")
-                        return {'CANCELLED'}
-                    
-                    vs = np.column_stack((points['x'], points['y'], points['z'], ))
-                    vs = vs.astype(np.float32)
-                    
-                    if(not set(('nx', 'ny', 'nz')).issubset(points.dtype.names)):
-                        ns = None
-                    else:
-                        ns = np.column_stack((points['nx'], points['ny'], points['nz'], ))
-                        ns = ns.astype(np.float32)
-                    if(not set(('red', 'green', 'blue')).issubset(points.dtype.names)):
-                        cs = None
-                    else:
-                        cs = np.column_stack((points['red'] / 255, points['green'] / 255, points['blue'] / 255, np.ones(len(points), dtype=float, ), ))
-                        cs = cs.astype(np.float32)
-                    
-                    cache.append({'index': i,
-                                  'name': n,
-                                  'path': p,
-                                  'vs': vs,
-                                  'ns': ns,
-                                  'cs': cs,
-                                  'points': points, })
+                cache.append({'index': i,
+                              'name': n,
+                              'path': p, })
         
         log('...', 1)
         log('loaded {} item(s)'.format(len(cache)), 1)
@@ -8056,7 +8873,10 @@ class PCV_OT_sequence_preload(Operator):
         
         PCVSequence.init()
         
+        frames = PCVSequenceFrameCache(cache, pcv.sequence_cache_size * 1024 * 1024, pcv.sequence_prefetch, PCVManager.default_color(), )
         ci = {'data': cache,
+              'frames': frames,
+              'current': 0,
               'uuid': pcv.uuid,
               'pcv': pcv, }
         PCVSequence.cache[pcv.uuid] = ci
@@ -8095,6 +8915,7 @@ class PCV_OT_sequence_clear(Operator):
     def execute(self, context):
         pcv = context.object.point_cloud_visualizer
         
+        PCVSequence.cache[pcv.uuid]['frames'].close()
         del PCVSequence.cache[pcv.uuid]
         if(len(PCVSequence.cache.items()) == 0):
             PCVSequence.deinit()
@@ -8998,6 +9819,9 @@ class PCV_PT_render(Panel):
         if(not pcv.override_default_shader):
             ok = True
         r.enabled = ok
+        r = c.row()
+        r.prop(pcv, 'render_smoothstep_cache')
+        r.enabled = ok and pcv.render_smoothstep
         
         c = sub.column()
         
@@ -9027,6 +9851,10 @@ class PCV_PT_render(Panel):
             c1.prop(pcv, 'render_resolution_y')
             c1.prop(pcv, 'render_resolution_percentage')
         
+        c = sub.column(align=True)
+        c.prop(pcv, 'render_writer_threads')
+        c.prop(pcv, 'render_writer_backlog')
+        
         r = sub.row(align=True)
         r.operator('point_cloud_visualizer.render')
         r.operator('point_cloud_visualizer.render_animation')
@@ -9155,12 +9983,21 @@ class PCV_PT_filter_simplify(Panel):
         l = self.layout
         c = l.column()
         
+        c.prop(pcv, 'filter_simplify_method')
         a = c.column(align=True)
         a.prop(pcv, 'filter_simplify_num_samples')
-        a.prop(pcv, 'filter_simplify_num_candidates')
+        r = a.row(align=True)
+        r.prop(pcv, 'filter_simplify_num_candidates')
+        r.enabled = (pcv.filter_simplify_method == 'BEST_CANDIDATE')
         
         c.operator('point_cloud_visualizer.filter_simplify')
         
+        c.separator()
+        a = c.column(align=True)
+        a.prop(pcv, 'filter_voxel_size')
+        a.prop(pcv, 'filter_voxel_representative')
+        c.operator('point_cloud_visualizer.filter_voxel_downsample')
+        
         c.enabled = PCV_OT_filter_simplify.poll(context)
 
 
@@ -9561,6 +10398,7 @@ class PCV_PT_export(Panel):
         c.prop(pcv, 'export_apply_transformation')
         c.prop(pcv, 'export_convert_axes')
         c.operator('point_cloud_visualizer.export')
+        c.operator('point_cloud_visualizer.export_compact')
         
         c.enabled = PCV_OT_export.poll(context)
 
@@ -9617,6 +10455,8 @@ class PCV_PT_sequence(Panel):
         # c.prop(pcv, 'sequence_frame_start')
         # c.prop(pcv, 'sequence_frame_offset')
         c.prop(pcv, 'sequence_use_cyclic')
+        c.prop(pcv, 'sequence_cache_size')
+        c.prop(pcv, 'sequence_prefetch')
         # c.enabled = False
         # if(pcv.sequence_enabled):
         #     c.enabled = True
@@ -9993,6 +10833,7 @@ class PCV_PT_debug(Panel):
             c.label(text="cache: {} item(s)".format(len(PCVManager.cache.items())))
             c.label(text="handle: {}".format(PCVManager.handle))
             c.label(text="initialized: {}".format(PCVManager.initialized))
+            c.label(text="shaders: {} compiled, {} hits, {} misses".format(len(PCVShaderRegistry.shaders), PCVShaderRegistry.hits, PCVShaderRegistry.misses))
             c.scale_y = 0.5
             
             if(len(PCVManager.cache)):
@@ -10040,6 +10881,9 @@ class PCV_PT_debug(Panel):
                     c.label(text="{}: {}".format('uuid', v['uuid']))
                     c.label(text="{}: {}".format('pcv', v['pcv']))
                     c.label(text="{}: {}".format('data', '{} item(s)'.format(len(v['data']))))
+                    f = v['frames']
+                    c.label(text="{}: {}".format('frames', '{} item(s), {:.1f} MB'.format(len(f), f.nbytes / (1024 * 1024))))
+                    c.label(text="{}: {}".format('hits/misses', '{}/{}'.format(f.hits, f.misses)))
 
 
 class PCV_properties(PropertyGroup):
@@ -10147,6 +10991,9 @@ class PCV_properties(PropertyGroup):
     render_resolution_y: IntProperty(name="Resolution Y", default=1080, min=4, max=65536, description="Number of vertical pixels in rendered image", subtype='PIXEL', )
     render_resolution_percentage: IntProperty(name="Resolution %", default=100, min=1, max=100, description="Percentage scale for render resolution", subtype='PERCENTAGE', )
     render_smoothstep: BoolProperty(name="Smooth Circles", default=False, description="Currently works only for basic shader with/without illumination and generally is much slower than Supersampling, use only when Supersampling fails", )
+    render_writer_threads: IntProperty(name="Writer Threads", default=2, min=1, max=64, description="Number of background threads encoding rendered animation frames", )
+    render_writer_backlog: IntProperty(name="Writer Backlog", default=4, min=1, max=256, description="Maximum number of rendered animation frames waiting for encoding, rendering waits when backlog is full", )
+    render_smoothstep_cache: BoolProperty(name="Cache Depth Order", default=True, description="Reuse depth sorting of points for Smooth Circles while camera and object matrices are unchanged", )
     render_supersampling: IntProperty(name="Supersampling", default=1, soft_min=1, soft_max=4, min=1, max=10, description="Render larger image and then resize back, 1 - disabled, 2 - render 200%, 3 - render 300%, ...", )
     
     def _render_resolution_linked_update(self, context, ):
@@ -10189,8 +11036,14 @@ class PCV_properties(PropertyGroup):
     export_apply_transformation: BoolProperty(name="Apply Transformation", default=False, description="Apply parent object transformation to points", )
     export_convert_axes: BoolProperty(name="Convert Axes", default=False, description="Convert from blender (y forward, z up) to forward -z, up y axes", )
     export_visible_only: BoolProperty(name="Visible Points Only", default=False, description="Export currently visible points only (controlled by 'Display' on main panel)", )
+    export_chunk_size: IntProperty(name="Chunk Size", default=1000000, min=1000, max=100000000, description="Number of points transformed, converted and written at once, lower to reduce memory usage when exporting large point clouds", )
     
     filter_simplify_num_samples: IntProperty(name="Samples", default=10000, min=1, subtype='NONE', description="Number of points in simplified point cloud, best result when set to less than 20% of points, when samples has value close to total expect less points in result", )
+    filter_simplify_method: EnumProperty(name="Method", items=[('BEST_CANDIDATE', "Best Candidate", "Evenly distributed samples, each sample is the most distant of a set of candidates"),
+                                                               ('VOXEL', "Voxel", "Fast, one random point per voxel of grid sized to number of samples"), ], default='BEST_CANDIDATE', description="Simplification method", )
+    filter_voxel_size: FloatProperty(name="Voxel Size", default=0.1, min=0.000001, precision=6, subtype='DISTANCE', description="Edge length of voxel, points in voxel are replaced by one representative", )
+    filter_voxel_representative: EnumProperty(name="Representative", items=[('CENTROID', "Centroid", "Mean position of points in voxel"),
+                                                                             ('NEAREST', "Nearest", "Point nearest to mean position of points in voxel"), ], default='CENTROID', description="Point that represents voxel", )
     filter_simplify_num_candidates: IntProperty(name="Candidates", default=10, min=3, max=100, subtype='NONE', description="Number of candidates used during resampling, the higher value, the slower calculation, but more even", )
     
     filter_remove_color: FloatVectorProperty(name="Color", default=(1.0, 1.0, 1.0, ), min=0, max=1, subtype='COLOR', size=3, description="Color to remove from point cloud", )
@@ -10278,6 +11131,8 @@ class PCV_properties(PropertyGroup):
     # sequence_frame_start: IntProperty(name="Start Frame", default=1, description="", )
     # sequence_frame_offset: IntProperty(name="Offset", default=0, description="", )
     sequence_use_cyclic: BoolProperty(name="Cycle Forever", default=True, description="Cycle preloaded point clouds (ply_index = (current_frame % len(ply_files)) - 1)", )
+    sequence_cache_size: IntProperty(name="Cache Size", default=2048, min=64, max=1048576, subtype='NONE', description="Memory budget in MB of loaded sequence frames, least recently displayed frames are released when exceeded", )
+    sequence_prefetch: IntProperty(name="Prefetch", default=4, min=0, max=64, description="Number of frames loaded ahead in background in playback direction", )
     
     generate_source: EnumProperty(name="Source", items=[('VERTICES', "Vertices", "Use mesh vertices"),
                                                         ('SURFACE', "Surface", "Use triangulated mesh surface"),
@@ -10786,6 +11641,7 @@ class PCV_preferences(AddonPreferences):
     convert_16bit_colors: BoolProperty(name="Convert 16bit Colors", description="Convert 16bit colors to 8bit, applied when Red channel has 'uint16' dtype", default=True, )
     gamma_correct_16bit_colors: BoolProperty(name="Gamma Correct 16bit Colors", description="When 16bit colors are encountered apply gamma as 'c ** (1 / 2.2)'", default=False, )
     shuffle_points: BoolProperty(name="Shuffle Points", description="Shuffle points upon loading, display percentage is more useable if points are shuffled", default=True, )
+    mmap_ply: BoolProperty(name="Memory Map PLY", description="Map binary PLY files to memory instead of reading them, points are read from disk only when used. Shuffle Points then shuffles only display data, mapped points keep file order", default=False, )
     category: EnumProperty(name="Tab Name", items=[('POINT_CLOUD_VISUALIZER', "Point Cloud Visualizer", ""),
                                                    ('PCV', "PCV", ""), ], default='POINT_CLOUD_VISUALIZER', description="To have PCV in its own separate tab, choose one", update=_update_panel_bl_category, )
     category_custom: BoolProperty(name="Custom Tab Name", default=False, description="Check if you want to have PCV in custom named tab or in existing tab", update=_update_panel_bl_category, )
@@ -10799,6 +11655,7 @@ class PCV_preferences(AddonPreferences):
         r.prop(self, "selection_color")
         r = l.row()
         r.prop(self, "shuffle_points")
+        r.prop(self, "mmap_ply")
         r.prop(self, "convert_16bit_colors")
         c = r.column()
         c.prop(self, "gamma_correct_16bit_colors")
@@ -10841,8 +11698,8 @@ classes = (
     PCV_PT_filter_join, PCV_PT_filter_color_adjustment,
     PCV_PT_render, PCV_PT_convert, PCV_PT_generate, PCV_PT_export, PCV_PT_sequence,
     
-    PCV_OT_load, PCV_OT_draw, PCV_OT_erase, PCV_OT_render, PCV_OT_render_animation, PCV_OT_convert, PCV_OT_reload, PCV_OT_export,
-    PCV_OT_filter_simplify, PCV_OT_filter_remove_color, PCV_OT_filter_remove_color_delete_selected, PCV_OT_filter_remove_color_deselect,
+    PCV_OT_load, PCV_OT_draw, PCV_OT_erase, PCV_OT_render, PCV_OT_render_animation, PCV_OT_convert, PCV_OT_reload, PCV_OT_export, PCV_OT_export_compact,
+    PCV_OT_filter_simplify, PCV_OT_filter_voxel_downsample, PCV_OT_filter_remove_color, PCV_OT_filter_remove_color_delete_selected, PCV_OT_filter_remove_color_deselect,
     PCV_OT_filter_project, PCV_OT_filter_merge, PCV_OT_filter_boolean_intersect, PCV_OT_filter_boolean_exclude,
     PCV_OT_edit_start, PCV_OT_edit_update, PCV_OT_edit_end, PCV_OT_edit_cancel,
     PCV_OT_sequence_preload, PCV_OT_sequence_clear, PCV_OT_generate_point_cloud, PCV_OT_reset_runtime,
@@ -10868,6 +11725,7 @@ def register():
 def unregister():
     PCVSequence.deinit()
     PCVManager.deinit()
+    PCVShaderRegistry.clear()
     
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
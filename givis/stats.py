@@ -0,0 +1,211 @@
+"""
+Global normalization statistics
+
+A single streaming pass over the whole (N, T) variable array collects the
+min/max and a fine log-histogram of the variable. Percentiles, clamp limits
+and color bin edges are derived from those and stored in a small JSON
+sidecar next to the data, so every frame and every worker uses the same
+normalization and no per-frame histogram has to be computed.
+"""
+import os
+import json
+
+import numpy as np
+
+from .normalize import log_normalize
+
+
+# scalar applied to the raw data before normalizing, temperature is in eV
+SCALARS = {"T": 11604.0, "P": 1.0}
+
+
+class VariableStats:
+    """
+    Statistics of a simulation variable
+    """
+
+    def __init__(
+        self,
+        v_min: float,
+        v_max: float,
+        counts,
+        log_range: tuple,
+        count: int,
+        nonpositive: int = 0,
+        scalar: float = 1.0,
+        clamp: tuple = None,
+        percentiles: dict = None,
+    ):
+        """
+        Args:
+            v_min: minimum of the scaled variable
+            v_max: maximum of the scaled variable
+            counts: histogram of log10 of the positive scaled values
+            log_range: (low, high) range of the log-histogram
+            count: total number of values
+            nonpositive: number of values <= 0, not in the log-histogram
+            scalar: scalar applied to the raw data
+            clamp: (min, max) clamp limits used for normalization, the 1st and
+                99th percentiles if None
+            percentiles: percentiles of the scaled variable
+        """
+        self.v_min = v_min
+        self.v_max = v_max
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.log_range = tuple(log_range)
+        self.count = count
+        self.nonpositive = nonpositive
+        self.scalar = scalar
+        self.percentiles = percentiles or {
+            q: self.percentile(q) for q in (0.1, 1, 5, 25, 50, 75, 95, 99, 99.9)
+        }
+        self.clamp = tuple(clamp or (self.percentile(1), self.percentile(99)))
+
+    @property
+    def log_edges(self):
+        return np.linspace(
+            self.log_range[0], self.log_range[1], self.counts.shape[0] + 1
+        )
+
+    def percentile(self, q):
+        """
+        Percentile of the scaled variable, resolved to one log-histogram bin
+
+        Args:
+            q: percentile in [0, 100]
+        """
+        target = q / 100.0 * self.count - self.nonpositive
+        if target <= 0:
+            # percentiles that fall on values <= 0 map to the smallest positive
+            # value, so they can be used as log clamp limits
+            nonzero = np.nonzero(self.counts)[0]
+            if nonzero.size == 0:
+                return self.v_min
+            return float(10 ** self.log_edges[nonzero[0]])
+        cdf = np.cumsum(self.counts)
+        j = min(np.searchsorted(cdf, target), self.counts.shape[0] - 1)
+        # interpolate within the bin
+        below = cdf[j - 1] if j > 0 else 0
+        frac = (target - below) / max(self.counts[j], 1)
+        edges = self.log_edges
+        value = 10 ** (edges[j] + frac * (edges[j + 1] - edges[j]))
+        return float(np.clip(value, self.v_min, self.v_max))
+
+    def normalize(self, values, out=None):
+        """
+        Log-normalize raw values with the global clamp limits
+        """
+        return log_normalize(
+            values, self.clamp[0], self.clamp[1], scalar=self.scalar, out=out
+        )
+
+    def bin_edges(self, color_bins):
+        """
+        Color bin edges of the normalized variable shared by every frame
+
+        Args:
+            color_bins: number of color bins
+        """
+        lo, hi = self.normalize(np.array([self.v_min, self.v_max]) / self.scalar)
+        return np.linspace(lo, hi, color_bins + 1)
+
+    def to_dict(self):
+        """ """
+        return {
+            "v_min": self.v_min,
+            "v_max": self.v_max,
+            "counts": self.counts.tolist(),
+            "log_range": list(self.log_range),
+            "count": self.count,
+            "nonpositive": self.nonpositive,
+            "scalar": self.scalar,
+            "clamp": list(self.clamp),
+            "percentiles": {str(float(q)): v for q, v in self.percentiles.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        """ """
+        d = dict(d)
+        d["percentiles"] = {float(q): v for q, v in d["percentiles"].items()}
+        return cls(**d)
+
+    def save(self, path):
+        """ """
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        """ """
+        with open(path, "r") as f:
+            return cls.from_dict(json.load(f))
+
+
+def compute_stats(
+    values,
+    scalar: float = 1.0,
+    chunk_size: int = 1 << 22,
+    log_range: tuple = (-30.0, 30.0),
+    resolution: float = 0.01,
+    clamp: tuple = None,
+):
+    """
+    Streaming statistics over a whole variable array
+
+    Args:
+        values: (N, T), (N, T, 1) or (T, N) array of the variable, typically
+            memory-mapped. It is read in blocks along the first axis
+        scalar: scalar applied to the raw data (e.g. eV to K)
+        chunk_size: approximate number of values read at a time
+        log_range: range of the log10 histogram, values outside are counted
+            in the first/last bin
+        resolution: width of a log-histogram bin in dex
+        clamp: clamp limits, derived from the percentiles if None
+
+    Returns:
+        stats: VariableStats
+    """
+    n_bins = int(round((log_range[1] - log_range[0]) / resolution))
+    counts = np.zeros(n_bins, dtype=np.int64)
+    v_min, v_max = np.inf, -np.inf
+    count = 0
+    nonpositive = 0
+
+    rows = max(1, chunk_size // max(1, int(np.prod(values.shape[1:]))))
+
+    for start in range(0, values.shape[0], rows):
+        block = np.asarray(values[start : start + rows], dtype=np.float64)
+        block = block.ravel() * scalar
+        if block.size == 0:
+            continue
+
+        v_min = min(v_min, float(block.min()))
+        v_max = max(v_max, float(block.max()))
+        count += block.size
+
+        positive = block[block > 0]
+        nonpositive += block.size - positive.size
+        np.log10(positive, out=positive)
+        positive -= log_range[0]
+        positive *= 1.0 / resolution
+        j = np.clip(positive.astype(np.int64), 0, n_bins - 1)
+        counts += np.bincount(j, minlength=n_bins)
+
+    return VariableStats(
+        v_min,
+        v_max,
+        counts,
+        log_range,
+        count,
+        nonpositive=nonpositive,
+        scalar=scalar,
+        clamp=clamp,
+    )
+
+
+def stats_path(path):
+    """
+    Sidecar path of the statistics of a variable file
+    """
+    return os.path.splitext(path)[0] + "_stats.json"
@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pytest
+
+from givis.__main__ import FrameScheduler, FrameStore, Visualization
+
+
+def _simulation(path, n=10, frames=4):
+    rng = np.random.default_rng(0)
+    positions = rng.normal(0, 1, (n, frames, 4))
+    temp = rng.lognormal(-1, 1, (n, frames, 1))
+    np.save(os.path.join(path, "run_pos.npy"), positions)
+    np.save(os.path.join(path, "run_T.npy"), temp)
+    return positions, temp
+
+
+def test_frame_store_convert(tmp_path):
+    positions, temp = _simulation(str(tmp_path))
+    # chunks smaller than the particle count, variables that are missing are skipped
+    output = FrameStore.convert(str(tmp_path), chunk_size=3)
+    assert output == str(tmp_path / "run_frames.npy")
+    assert not os.path.exists(output + ".part")
+
+    store = FrameStore(output)
+    assert len(store) == 4
+    assert store.variables == ["T"]
+    assert store.field_name("temperature") == "T"
+    with pytest.raises(KeyError):
+        store.field_name("pressure")
+
+    for i in range(4):
+        pos, var = store.read(i, "T")
+        np.testing.assert_array_equal(pos, positions[:, i, :3])
+        np.testing.assert_array_equal(var, temp[:, i, 0])
+
+
+def test_frame_scheduler_pending(tmp_path):
+    for name in ("0001.png", "0003.png"):
+        open(str(tmp_path / name), "w").close()
+    scheduler = FrameScheduler(str(tmp_path), cores=2)
+    assert scheduler.pending(range(5)) == [0, 2, 4]
+    assert scheduler.pending(np.arange(2)) == [0]
+    assert scheduler.split([0, 2, 4]) == [[0, 4], [2]]
+    assert FrameScheduler(str(tmp_path), cores=4).split([0, 2]) == [[0], [2]]
+
+
+def _visualization(path, bins=4, edges=None):
+    _simulation(path)
+    return Visualization(
+        os.path.join(path, "run_pos.npy"),
+        os.path.join(path, "run_T.npy"),
+        path,
+        color_bins=bins,
+        bin_edges=edges,
+    )
+
+
+def test_bin_data_keeps_particle_order(tmp_path):
+    vis = _visualization(str(tmp_path))
+    temp = np.array([100.0, 5e3, 150.0, 4e3, 120.0, 6e3]) / 11604.0
+    pos = np.arange(18, dtype=np.float64).reshape(6, 3)
+    edges = np.array([0.0, 0.25, 0.5, 0.75, 1.0])
+
+    particle_sets, idx = vis.bin_data(pos, temp, edges=edges)
+    norm = vis.log_normalize(temp)
+    dig = np.clip(np.digitize(norm, edges) - 1, 0, 3)
+    assert idx.tolist() == sorted(set(dig.tolist()))
+    for s, j in zip(particle_sets, idx):
+        # particles of a bin keep their original order
+        np.testing.assert_array_equal(s, pos[dig == j])
+    assert sum(len(s) for s in particle_sets) == len(pos)
+
+
+def test_bin_data_rejects_mismatched_edges(tmp_path):
+    temp = np.array([100.0, 5e3]) / 11604.0
+    pos = np.zeros((2, 3))
+
+    vis = _visualization(str(tmp_path))
+    with pytest.raises(ValueError):
+        vis.bin_data(pos, temp, edges=np.linspace(0, 1, 4))
+
+    vis = _visualization(str(tmp_path), edges=np.linspace(0, 1, 6))
+    with pytest.raises(ValueError):
+        vis.bin_data(pos, temp)
@@ -0,0 +1,54 @@
+import numpy as np
+
+from givis.normalize import LogNormalizer, log_normalize
+
+
+def test_limits_map_to_unit_range():
+    out = log_normalize(np.array([1e2, 1e3, 1e4]), 1e2, 1e4)
+    np.testing.assert_allclose(out, [0.0, 0.5, 1.0])
+
+
+def test_values_outside_limits_are_clamped():
+    out = log_normalize(np.array([0.0, -5.0, 1.0, 1e9]), 10.0, 1e3)
+    np.testing.assert_allclose(out, [0.0, 0.0, 0.0, 1.0])
+
+
+def test_scalar_is_applied_before_clamping():
+    v_min, v_max, scalar = 100.0, 6e3, 11604.0
+    # eV values that scale exactly to the limits in K
+    values = np.array([v_min, v_max]) / scalar
+    out = log_normalize(values, v_min, v_max, scalar=scalar)
+    np.testing.assert_allclose(out, [0.0, 1.0])
+
+
+def test_out_buffer_is_filled_in_place():
+    values = np.geomspace(1e8, 5e12, 11)
+    out = np.empty(11)
+    r = log_normalize(values, 1e8, 5e12, out=out)
+    assert r is out
+    np.testing.assert_allclose(out, np.linspace(0, 1, 11))
+
+
+def test_normalizer_chunks_match_single_pass():
+    values = np.random.default_rng(0).lognormal(20, 3, 1000)
+    expected = log_normalize(values, 1e8, 5e12)
+
+    n = LogNormalizer(1e8, 5e12, chunk_size=64)
+    np.testing.assert_allclose(n(values), expected)
+
+    chunks = np.empty_like(expected)
+    for start, out in n.iter_chunks(values):
+        assert len(out) <= 64
+        chunks[start : start + len(out)] = out
+    np.testing.assert_allclose(chunks, expected)
+
+
+def test_normalizer_reuses_buffer():
+    n = LogNormalizer(1.0, 100.0)
+    a = n(np.full(10, 10.0))
+    assert np.shares_memory(a, n.buffer)
+    b = n(np.full(5, 100.0))
+    # smaller frames reuse the buffer of the largest frame seen
+    assert n.buffer.shape[0] == 10
+    np.testing.assert_allclose(b, 1.0)
+    np.testing.assert_allclose(a[:5], 1.0)
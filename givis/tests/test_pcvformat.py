@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from givis import pcvformat
+
+
+def test_header_round_trip():
+    data = pcvformat.pack_header(pcvformat.COLORS, 7, (1.0, 2.0, 3.0), (0.5, 0.5, 1.0))
+    assert len(data) == 64
+    flags, count, v_min, scale = pcvformat.unpack_header(data)
+    assert (flags, count) == (pcvformat.COLORS, 7)
+    np.testing.assert_array_equal(v_min, [1, 2, 3])
+    np.testing.assert_array_equal(scale, [0.5, 0.5, 1])
+
+
+def test_unpack_header_rejects_other_files():
+    data = bytearray(pcvformat.pack_header(0, 0, np.zeros(3), np.ones(3)))
+    data[:4] = b"ply\n"
+    with pytest.raises(TypeError):
+        pcvformat.unpack_header(bytes(data))
+
+
+def test_offsets():
+    assert pcvformat.offsets(10, 0) == (64, 124, 124)
+    assert pcvformat.offsets(10, pcvformat.NORMALS | pcvformat.COLORS) == (64, 124, 164)
+
+
+def test_quantization_round_trip():
+    rng = np.random.default_rng(0)
+    vs = rng.normal(0, 3, (1000, 3))
+    vs[:, 2] = 1.5
+    v_min, scale = pcvformat.bounds(vs.min(axis=0), vs.max(axis=0))
+    assert scale[2] == 1.0
+
+    q = pcvformat.quantize(vs, v_min, scale)
+    assert q.dtype == np.dtype("<u2")
+    out = np.empty(q.shape, dtype=np.float32)
+    decoded = pcvformat.dequantize(q, v_min, scale, out=out)
+    assert decoded is out
+    assert (np.abs(decoded - vs) <= scale / 2 + 1e-5).all()
+
+
+def test_oct_normals_round_trip():
+    rng = np.random.default_rng(0)
+    ns = rng.normal(0, 1, (1000, 3))
+    ns /= np.linalg.norm(ns, axis=1)[:, None]
+    e = pcvformat.oct_encode(ns)
+    assert e.shape == (1000, 2)
+    decoded = pcvformat.oct_decode(e)
+    assert decoded.dtype == np.float32
+    assert np.abs(decoded - ns).max() < 1e-3
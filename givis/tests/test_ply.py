@@ -0,0 +1,128 @@
+import os
+
+import numpy as np
+import pytest
+
+from givis import pcvformat, ply
+
+
+def _points(n=500):
+    rng = np.random.default_rng(0)
+    points = np.empty(n, dtype=ply.PLY_DTYPE)
+    for k in "xyz":
+        points[k] = rng.normal(0, 3, n)
+    for k in ("red", "green", "blue"):
+        points[k] = rng.integers(0, 256, n)
+    return points
+
+
+def _read_ply(path):
+    data = open(path, "rb").read()
+    end = data.index(b"end_header\n") + len(b"end_header\n")
+    return data[:end].decode("ascii"), np.frombuffer(data[end:], dtype=ply.PLY_DTYPE)
+
+
+def _read_pcv(path):
+    data = open(path, "rb").read()
+    magic, version, flags, count, *box = pcvformat.HEADER.unpack_from(data)
+    v_min, scale = np.array(box[:3]), np.array(box[3:])
+    o = pcvformat.HEADER.size
+    q = np.frombuffer(data, dtype="<u2", count=count * 3, offset=o).reshape(-1, 3)
+    cs = np.frombuffer(data, dtype=np.uint8, count=count * 3, offset=o + q.nbytes)
+    return magic, version, flags, q * scale + v_min, cs.reshape(-1, 3), scale
+
+
+def test_write_ply(tmp_path):
+    points = _points()
+    path = str(tmp_path / "a.ply")
+    ply.write_ply(path, points)
+    header, data = _read_ply(path)
+    assert "format binary_little_endian 1.0\n" in header
+    assert "element vertex 500\n" in header
+    assert "property uchar red\n" in header
+    np.testing.assert_array_equal(data, points)
+    assert os.listdir(str(tmp_path)) == ["a.ply"]
+
+
+def test_write_pcv_quantization_round_trip(tmp_path):
+    points = _points()
+    path = str(tmp_path / "a.pcv")
+    ply.write_pcv(path, points)
+    magic, version, flags, vs, cs, scale = _read_pcv(path)
+    assert (magic, version, flags) == (b"PCVC", 1, 2)
+    assert os.path.getsize(path) == pcvformat.HEADER.size + 9 * len(points)
+
+    expected = np.column_stack((points["x"], points["y"], points["z"]))
+    # positions are within half a quantization step
+    assert (np.abs(vs - expected) <= scale / 2 + 1e-6).all()
+    np.testing.assert_array_equal(
+        cs, np.column_stack((points["red"], points["green"], points["blue"]))
+    )
+
+
+def test_write_pcv_flat_and_empty(tmp_path):
+    points = _points(4)
+    points["z"] = 1.5
+    ply.write_pcv(str(tmp_path / "a.pcv"), points)
+    vs = _read_pcv(str(tmp_path / "a.pcv"))[3]
+    np.testing.assert_allclose(vs[:, 2], 1.5)
+
+    ply.write_pcv(str(tmp_path / "b.pcv"), _points(0))
+    assert _read_pcv(str(tmp_path / "b.pcv"))[3].shape == (0, 3)
+
+
+def test_ply_filename():
+    assert ply.ply_filename("snapshot", 0) == "snapshot_0001.ply"
+    assert ply.ply_filename("s", 41, "pcv") == "s_0042.pcv"
+
+
+@pytest.mark.parametrize("fmt", sorted(ply.WRITERS))
+def test_convert_to_ply(tmp_path, fmt):
+    rng = np.random.default_rng(0)
+    positions = rng.normal(0, 7.5e7, (50, 2, 3))
+    np.save(str(tmp_path / "run_pos.npy"), positions)
+    np.save(str(tmp_path / "run_T.npy"), rng.lognormal(-1, 1, (50, 2, 1)))
+
+    output = str(tmp_path / "out")
+    paths = ply.convert_to_ply(
+        output,
+        str(tmp_path / "run_T.npy"),
+        positions=str(tmp_path / "run_pos.npy"),
+        var="T",
+        cores=1,
+        fmt=fmt,
+    )
+    names = ["snapshot_0001." + fmt, "snapshot_0002." + fmt]
+    assert [os.path.basename(p) for p in paths] == names
+    assert sorted(os.listdir(output)) == names
+
+    if fmt == "ply":
+        data = _read_ply(paths[1])[1]
+    else:
+        data = _read_pcv(paths[1])[3]
+        data = {k: data[:, i] for i, k in enumerate("xyz")}
+    np.testing.assert_allclose(data["x"], positions[:, 1, 0] / 7.5e7, atol=1e-3)
+
+
+def test_pcv_codec_of_visualizer(tmp_path):
+    # the reader and writer of the add-on need Blender
+    pytest.importorskip("bpy")
+    from givis import space_view3d_point_cloud_visualizer as pcv
+
+    rng = np.random.default_rng(0)
+    vs = rng.normal(0, 3, (300, 3)).astype(np.float32)
+    ns = rng.normal(0, 1, (300, 3))
+    ns /= np.linalg.norm(ns, axis=1)[:, None]
+    cs = rng.random((300, 4)).astype(np.float32)
+    path = str(tmp_path / "a.pcv")
+    pcv.PCVCompactWriter(path, vs, ns, cs)
+    r = pcv.PCVCompactReader(path)
+    assert np.abs(r.vertices() - vs).max() <= (vs.max() - vs.min()) / 65535
+    assert np.abs(r.normals() - ns).max() < 1e-3
+    assert np.abs(r.colors()[:, :3] - cs[:, :3]).max() <= 1 / 255
+
+    points = _points()
+    ply.write_pcv(path, points)
+    r = pcv.PCVCompactReader(path)
+    assert r.normals() is None
+    np.testing.assert_allclose(r.colors()[:, 0], points["red"] / 255, atol=1e-6)
@@ -0,0 +1,64 @@
+import os
+import zlib
+import struct
+
+import numpy as np
+import pytest
+
+from givis import pngfile
+
+
+def _read_png(path):
+    data = open(path, "rb").read()
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    w, h = struct.unpack(">II", data[16:24])
+    i = data.index(b"IDAT")
+    n = struct.unpack(">I", data[i - 4 : i])[0]
+    raw = np.frombuffer(zlib.decompress(data[i + 4 : i + 4 + n]), dtype=np.uint8)
+    return raw.reshape(h, w * 4 + 1)[:, 1:].reshape(h, w, 4)
+
+
+def test_write_png(tmp_path):
+    image = np.random.default_rng(0).integers(0, 256, (5, 7, 4), dtype=np.uint8)
+    path = str(tmp_path / "a.png")
+    pngfile.write_png(path, image)
+    np.testing.assert_array_equal(_read_png(path), image)
+
+    pngfile.write_png(path, image, flip=True)
+    np.testing.assert_array_equal(_read_png(path), image[::-1])
+    assert os.listdir(str(tmp_path)) == ["a.png"]
+
+
+def test_write_png_leaves_no_partial_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "a.png")
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    # fails after the signature and header are written
+    monkeypatch.setattr(pngfile.zlib, "compress", fail)
+    with pytest.raises(OSError):
+        pngfile.write_png(path, np.zeros((2, 2, 4), dtype=np.uint8))
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_writer_pool(tmp_path):
+    rng = np.random.default_rng(0)
+    images = rng.integers(0, 256, (6, 3, 4, 4), dtype=np.uint8)
+    reported = []
+
+    class Pool(pngfile.PNGWriterPool):
+        def report(self, path, error):
+            reported.append((path, error))
+
+    pool = Pool(workers=2, max_in_flight=2)
+    for i, image in enumerate(images):
+        pool.submit(str(tmp_path / "{}.png".format(i)), image)
+    pool.submit(str(tmp_path / "missing" / "x.png"), images[0])
+    pool.close()
+
+    for i, image in enumerate(images):
+        np.testing.assert_array_equal(_read_png(str(tmp_path / "{}.png".format(i))), image)
+    assert (pool.written, pool.backlog, len(reported)) == (7, 0, 7)
+    assert [p for p, e in pool.errors] == [str(tmp_path / "missing" / "x.png")]
+    assert sum(e is not None for p, e in reported) == 1
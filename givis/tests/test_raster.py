@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+
+from givis import raster, snapshots
+
+
+def _camera():
+    # looking down -z from above the origin
+    return raster.Camera(location=(0, 0, 10), rotation=(0, 0, 0))
+
+
+def test_project_center_and_clipping():
+    cam = _camera()
+    x, y, depth, visible = cam.project(np.array([[0, 0, 0], [0, 0, 20]]), 64, 32)
+    assert (x[0], y[0]) == (32.0, 16.0)
+    assert depth[0] == 10.0
+    assert visible.tolist() == [True, False]
+
+
+def test_point_footprint_and_color():
+    r = raster.PointRasterizer(16, 16, point_size=3, alpha_radius=0.5, camera=_camera())
+    image = r.render(np.zeros((1, 3)), np.array([[1.0, 0.0, 0.0]]))
+    assert image.shape == (16, 16, 4)
+    hit = image[:, :, 3] > 0
+    # 3x3 point without the corners, centered on the image center
+    assert hit.sum() == 5
+    assert hit[8, 8]
+    assert (image[hit] == [255, 0, 0, 255]).all()
+
+
+def test_nearest_point_wins_across_chunks():
+    points = np.array([[0, 0, 0], [0, 0, 5], [0, 0, 1]])
+    colors = np.eye(3)
+    for chunk_size in (1, 3):
+        r = raster.PointRasterizer(
+            8, 8, point_size=1, camera=_camera(), chunk_size=chunk_size
+        )
+        image = r.render(points, colors)
+        assert image[4, 4].tolist() == [0, 255, 0, 255]
+
+
+def test_render_sequence(tmp_path):
+    rng = np.random.default_rng(0)
+    positions = rng.normal(0, 7.5e7, (100, 3, 3))
+    variable = rng.lognormal(20, 2, (100, 3, 1))
+    np.save(str(tmp_path / "run_pos.npy"), positions)
+    np.save(str(tmp_path / "run_P.npy"), variable)
+    assert snapshots.frame_count(positions=str(tmp_path / "run_pos.npy")) == 3
+    assert snapshots.find(str(tmp_path), "_frames.npy") is None
+
+    output = str(tmp_path / "render")
+    os.makedirs(output)
+    paths = raster.render_sequence(
+        output,
+        snapshots.find(str(tmp_path), "_P.npy"),
+        positions=snapshots.find(str(tmp_path), "_pos.npy"),
+        cores=1,
+        width=32,
+        height=16,
+    )
+    assert [os.path.basename(p) for p in paths] == ["0000.png", "0001.png", "0002.png"]
+    assert all(os.path.getsize(p) > 0 for p in paths)
+
+    # existing frames are skipped
+    mtime = os.path.getmtime(paths[0])
+    raster.render_sequence(
+        output,
+        snapshots.find(str(tmp_path), "_P.npy"),
+        positions=snapshots.find(str(tmp_path), "_pos.npy"),
+        frame_list=[0],
+        cores=1,
+    )
+    assert os.path.getmtime(paths[0]) == mtime
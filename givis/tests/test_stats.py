@@ -0,0 +1,68 @@
+import numpy as np
+
+from givis.stats import VariableStats, compute_stats, stats_path
+
+
+def _values(shape=(200, 30)):
+    return np.random.default_rng(1).lognormal(20, 2, shape)
+
+
+def test_min_max_and_counts():
+    values = _values()
+    values[0, :5] = 0.0
+    values[1, :3] = -1.0
+    stats = compute_stats(values)
+    assert stats.v_min == values.min()
+    assert stats.v_max == values.max()
+    assert stats.count == values.size
+    assert stats.nonpositive == 8
+    assert stats.counts.sum() == values.size - 8
+
+
+def test_scalar_is_applied():
+    values = _values()
+    stats = compute_stats(values, scalar=10.0)
+    assert stats.v_max == values.max() * 10.0
+    assert stats.scalar == 10.0
+
+
+def test_percentiles_within_one_bin():
+    values = _values()
+    stats = compute_stats(values, resolution=0.01)
+    for q in (1, 50, 99):
+        expected = np.percentile(values, q)
+        # one log-histogram bin is 0.01 dex wide
+        assert abs(np.log10(stats.percentile(q)) - np.log10(expected)) <= 0.01
+    assert stats.clamp == (stats.percentile(1), stats.percentile(99))
+
+
+def test_chunking_does_not_change_result():
+    values = _values((300, 7, 1))
+    a = compute_stats(values, chunk_size=7)
+    b = compute_stats(values, chunk_size=1 << 22)
+    np.testing.assert_array_equal(a.counts, b.counts)
+    assert a.to_dict() == b.to_dict()
+
+
+def test_normalize_uses_clamp_limits():
+    stats = compute_stats(_values(), clamp=(1e8, 1e10))
+    np.testing.assert_allclose(
+        stats.normalize(np.array([1.0, 1e8, 1e9, 1e10, 1e12])),
+        [0.0, 0.0, 0.5, 1.0, 1.0],
+    )
+    edges = stats.bin_edges(10)
+    assert edges.shape == (11,)
+    assert edges[0] == 0.0 and edges[-1] == 1.0
+
+
+def test_sidecar_round_trip(tmp_path):
+    path = str(tmp_path / "run_P.npy")
+    assert stats_path(path) == str(tmp_path / "run_P_stats.json")
+
+    stats = compute_stats(_values(), scalar=2.0)
+    stats.save(stats_path(path))
+    loaded = VariableStats.load(stats_path(path))
+    assert loaded.to_dict() == stats.to_dict()
+    assert loaded.clamp == stats.clamp
+    assert loaded.percentiles == stats.percentiles
+    np.testing.assert_array_equal(loaded.counts, stats.counts)